@@ -10,12 +10,12 @@ import sys
 import logging
 import threading
 import traceback
-from time import sleep
 from path import Path
 import binascii
 import cherrypy
 import yaml
 from flask import Response, jsonify, request
+from flexget.utils import log_index, metrics
 from flexget.utils.tools import get_latest_flexget_version_number
 from pyparsing import (
     Word,
@@ -34,6 +34,8 @@ from pyparsing import nums, alphanums, printables
 from yaml.error import YAMLError
 
 from flexget._version import __version__
+from flexget import logger
+from flexget.logger import get_level_no
 from flexget.api import api, APIResource
 from flexget.api.app import (
     __version__ as __api_version__,
@@ -291,44 +293,35 @@ class ServerDumpThreads(APIResource):
         return jsonify(threads=threads)
 
 
+@server_api.route('/metrics/')
+class ServerMetricsAPI(APIResource):
+    @api.response(200, description='Metrics in the Prometheus text exposition format')
+    def get(self, session=None):
+        """ Get server metrics for Prometheus """
+        metrics.task_queue_depth.set(len(self.manager.task_queue))
+        return Response(metrics.registry.render(), mimetype='text/plain; version=0.0.4')
+
+
 server_log_parser = api.parser()
 server_log_parser.add_argument(
     'lines', type=int, default=200, help='How many lines to find before streaming'
 )
 server_log_parser.add_argument('search', help='Search filter support google like syntax')
-
-
-def reverse_readline(fh, start_byte=0, buf_size=8192):
-    """a generator that returns the lines of a file in reverse order"""
-    segment = None
-    offset = 0
-    if start_byte:
-        fh.seek(start_byte)
-    else:
-        fh.seek(0, os.SEEK_END)
-    total_size = remaining_size = fh.tell()
-    while remaining_size > 0:
-        offset = min(total_size, offset + buf_size)
-        fh.seek(-offset, os.SEEK_END)
-        buf = fh.read(min(remaining_size, buf_size))
-        remaining_size -= buf_size
-        lines = buf.decode(sys.getfilesystemencoding()).split('\n')
-        # the first line of the buffer is probably not a complete line so
-        # we'll save it and append it to the last line of the next buffer
-        # we read
-        if segment is not None:
-            # if the previous chunk starts right from the beginning of line
-            # do not concact the segment to the last line of new chunk
-            # instead, yield the segment first
-            if buf[-1] is not '\n':
-                lines[-1] += segment
-            else:
-                yield segment
-        segment = lines[0]
-        for index in range(len(lines) - 1, 0, -1):
-            if len(lines[index]):
-                yield lines[index]
-    yield segment
+server_log_parser.add_argument('task', help='Only lines logged by this task')
+server_log_parser.add_argument(
+    'plugin', help='Only lines logged by this plugin, or by the logger of this name'
+)
+server_log_parser.add_argument(
+    'level',
+    choices=('critical', 'error', 'warning', 'info', 'verbose', 'debug', 'trace'),
+    help='Only lines of this log level or above',
+)
+server_log_parser.add_argument(
+    'session_id', help='Only lines logged by this logging session, needs the json log format'
+)
+server_log_parser.add_argument(
+    'since', help='Only lines logged at or after this time, formatted as YYYY-MM-DD HH:MM:SS'
+)
 
 
 def file_inode(filename):
@@ -352,10 +345,14 @@ class ServerLogAPI(APIResource):
         args = server_log_parser.parse_args()
 
         def follow(lines, search):
-            log_parser = LogParser(search)
-            stream_from_byte = 0
-
-            lines_found = []
+            log_parser = LogParser(
+                search,
+                task=args['task'],
+                plugin=args['plugin'],
+                level=args['level'],
+                session_id=args['session_id'],
+                since=args['since'],
+            )
 
             if os.path.isabs(self.manager.options.logfile):
                 base_log_file = self.manager.options.logfile
@@ -366,33 +363,13 @@ class ServerLogAPI(APIResource):
 
             yield '{"stream": ['  # Start of the json stream
 
-            # Read back in the logs until we find enough lines
-            for i in range(0, 9):
-                log_file = ('%s.%s' % (base_log_file, i)).rstrip(
-                    '.0'
-                )  # 1st log file has no number
-
-                if not os.path.isfile(log_file):
-                    break
-
-                with open(log_file, 'rb') as fh:
-                    fh.seek(0, 2)  # Seek to bottom of file
-                    end_byte = fh.tell()
-                    if i == 0:
-                        stream_from_byte = end_byte  # Stream from this point later on
-
-                    if len(lines_found) >= lines:
-                        break
-
-                    # Read in reverse for efficiency
-                    for line in reverse_readline(fh, start_byte=end_byte):
-                        if len(lines_found) >= lines:
-                            break
-                        if log_parser.matches(line):
-                            lines_found.append(log_parser.json_string(line))
-
-                    for l in reversed(lines_found):
-                        yield l + ',\n'
+            # Only reads the parts of the logs the index can't rule out
+            writes = logger.log_writes()
+            lines_found, stream_from_byte = log_index.get_index(base_log_file).search(
+                log_parser, lines
+            )
+            for line in reversed(lines_found):
+                yield log_parser.json_string(line) + ',\n'
 
             # We need to track the inode in case the log file is rotated
             current_inode = file_inode(base_log_file)
@@ -411,20 +388,23 @@ class ServerLogAPI(APIResource):
                 try:
                     with open(base_log_file, 'rb') as fh:
                         fh.seek(stream_from_byte)
-                        line = fh.readline().decode(sys.getfilesystemencoding())
-                        stream_from_byte = fh.tell()
+                        data = fh.read()
                 except IOError:
-                    yield '{}'
-                    continue
-
-                # If a valid line is found and does not pass the filter then set it to none
-                line = log_parser.json_string(line) if log_parser.matches(line) else '{}'
-
-                if line == '{}':
-                    # If no match then delay to prevent many read hits on the file
-                    sleep(2)
-
-                yield line + ',\n'
+                    data = b''
+                # Leave out a line which is still being written
+                data = data[: data.rfind(b'\n') + 1]
+                stream_from_byte += len(data)
+
+                matched = False
+                for line in data.decode(sys.getfilesystemencoding(), 'replace').split('\n'):
+                    if log_parser.matches(line):
+                        matched = True
+                        yield log_parser.json_string(line) + ',\n'
+
+                if not matched:
+                    # Keeps the connection alive while waiting for lines to be logged
+                    yield '{},\n'
+                    writes = logger.wait_for_log(writes, timeout=2)
 
             yield '{}]}'  # End of stream
 
@@ -439,9 +419,12 @@ class LogParser(object):
       * 'and', 'or' and implicit 'and' operators;
       * parentheses;
       * quoted strings;
+
+    Lines can also be filtered on their task, plugin, minimum log level and time in both the text and JSON log format,
+    and on their logging session in the JSON log format.
     """
 
-    def __init__(self, query):
+    def __init__(self, query, task=None, plugin=None, level=None, session_id=None, since=None):
         self._methods = {
             'and': self.evaluate_and,
             'or': self.evaluate_or,
@@ -453,6 +436,11 @@ class LogParser(object):
 
         self.line = ''
         self.query = query.lower() if query else ''
+        self.task = task.lower() if task else None
+        self.plugin = plugin.lower() if plugin else None
+        self.level = get_level_no(level) if level else None
+        self.session_id = session_id or None
+        self.since = since or None
 
         if self.query:
             # TODO: Cleanup
@@ -545,10 +533,80 @@ class LogParser(object):
     def evaluate(self, argument):
         return self._methods[argument.getName()](argument)
 
+    def parse(self, line):
+        """Returns the fields of a line in the text or JSON log format, None if it can't be parsed."""
+        if line.lstrip().startswith('{'):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                pass
+            else:
+                # The logger name takes the place of the plugin for lines logged outside of plugins
+                record['plugin'] = record.get('plugin') or record.get('logger', '')
+                return record
+        try:
+            return self._log_parser().parseString(line).asDict()
+        except ParseException:
+            return None
+
+    def query_may_match(self, contains):
+        """
+        Whether the search query can match a line containing the words for which `contains` returns True.
+
+        Used to rule out parts of the logs, negated terms can't do that and are assumed to match.
+        """
+        if not self._query_parser:
+            return True
+        return self._may_match(self._query_parser, contains)
+
+    def _may_match(self, argument, contains):
+        name = argument.getName()
+        if name == 'word':
+            return contains(argument[0])
+        elif name == 'quotes':
+            return all(contains(term[0]) for term in argument)
+        elif name == 'parenthesis':
+            return self._may_match(argument[0], contains)
+        elif name == 'and':
+            return self._may_match(argument[0], contains) and self._may_match(
+                argument[1], contains
+            )
+        elif name == 'or':
+            return self._may_match(argument[0], contains) or self._may_match(
+                argument[1], contains
+            )
+        return True
+
+    def matches_fields(self, record):
+        if self.task and record.get('task', '').lower() != self.task:
+            return False
+        if self.session_id and record.get('session_id') != self.session_id:
+            return False
+        timestamp = record.get('timestamp', '')
+        if self.since and timestamp < self.since[: len(timestamp)]:
+            return False
+        if self.plugin and self.plugin not in (
+            record.get('plugin', '').lower(),
+            record.get('logger', '').lower(),
+        ):
+            return False
+        if self.level:
+            try:
+                if get_level_no(record.get('log_level', '')) < self.level:
+                    return False
+            except AttributeError:
+                return False
+        return True
+
     def matches(self, line):
         if not line:
             return False
 
+        if self.task or self.plugin or self.level or self.session_id or self.since:
+            record = self.parse(line)
+            if record is None or not self.matches_fields(record):
+                return False
+
         self.line = line.lower()
 
         if not self._query_parser:
@@ -557,10 +615,8 @@ class LogParser(object):
             return self.evaluate(self._query_parser)
 
     def json_string(self, line):
-        try:
-            return json.dumps(self._log_parser().parseString(line).asDict())
-        except ParseException:
-            return '{}'
+        record = self.parse(line)
+        return json.dumps(record) if record is not None else '{}'
 
 
 @server_api.route('/crash_logs/')
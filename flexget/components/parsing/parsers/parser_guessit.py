@@ -3,8 +3,10 @@ from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 from future.utils import native
 
 import logging
+import multiprocessing
 import re
 import sys
+import threading
 import time
 
 from guessit.api import GuessItApi, GuessitException
@@ -64,6 +66,65 @@ try:
 except AttributeError:
     preferred_clock = time.clock
 
+# Batches of at least this many titles are parsed by a pool of worker processes
+POOL_MIN_BATCH = 200
+# Titles sent to a worker at once
+POOL_CHUNK_SIZE = 50
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def pool_context():
+    """
+    Returns the multiprocessing context to start workers with, or None if processes can't be started safely.
+
+    By the time a batch is parsed, the daemon runs logging, ipc, scheduler and web server threads. Forking a process
+    with threads can deadlock the child on locks those threads held, so workers are started from a fresh forkserver
+    process instead, which imports this module once so that workers start with the guessit rules built.
+    """
+    if not hasattr(multiprocessing, 'get_context'):
+        # Python 2 can only fork
+        return None
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+def get_pool():
+    """Returns the shared pool of worker processes, or None if it would not run in parallel."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            try:
+                processes = multiprocessing.cpu_count()
+            except NotImplementedError:
+                processes = 1
+            context = pool_context()
+            if processes < 2 or context is None:
+                return None
+            log.debug('Starting %s guessit worker processes', processes)
+            _pool = context.Pool(processes)
+        return _pool
+
+
+@event('manager.shutdown')
+def close_pool(manager):
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.terminate()
+            _pool.join()
+            _pool = None
+
+
+def _parse_many_worker(args):
+    """Parses a chunk of titles in a worker process."""
+    method, titles, kwargs = args
+    return getattr(ParserGuessit(), method)(titles, **kwargs)
+
 
 class ParserGuessit(object):
     SOURCE_MAP = {
@@ -179,12 +240,53 @@ class ParserGuessit(object):
 
         return qualities.Quality(' '.join(flattened_qualities))
 
+    def _parse_many(self, method, data, kwargs):
+        """
+        Parses a batch of titles with `method` in the worker pool, or in this process if the batch is small.
+
+        :return: List of parse results, or None if the batch should be parsed in this process
+        """
+        if len(data) < POOL_MIN_BATCH:
+            return None
+        pool = get_pool()
+        if pool is None:
+            return None
+        chunks = [
+            (method, data[i : i + POOL_CHUNK_SIZE], kwargs)
+            for i in range(0, len(data), POOL_CHUNK_SIZE)
+        ]
+        log.debug('Parsing %s titles in %s chunks with worker processes', len(data), len(chunks))
+        return [result for chunk in pool.map(_parse_many_worker, chunks) for result in chunk]
+
     # movie_parser API
     def parse_movie(self, data, **kwargs):
         log.debug('Parsing movie: `%s` [options: %s]', data, kwargs)
-        start = preferred_clock()
+        return self._parse_movie(data, self._movie_options(kwargs))
+
+    def parse_movie_many(self, data, **kwargs):
+        """
+        Parses many movie titles with the same options, in worker processes when there are enough of them.
+
+        :param list data: Titles to parse
+        :return: List of :class:`MovieParseResult`, in order of `data`
+        """
+        data = list(data)
+        results = self._parse_many('_parse_movie_chunk', data, kwargs)
+        if results is None:
+            results = self._parse_movie_chunk(data, **kwargs)
+        return results
+
+    def _parse_movie_chunk(self, data, **kwargs):
+        guessit_options = self._movie_options(kwargs)
+        return [self._parse_movie(title, guessit_options) for title in data]
+
+    def _movie_options(self, kwargs):
         guessit_options = self._guessit_options(kwargs)
         guessit_options['type'] = 'movie'
+        return guessit_options
+
+    def _parse_movie(self, data, guessit_options):
+        start = preferred_clock()
         guess_result = guessit_api.guessit(data, options=guessit_options)
         # NOTE: Guessit expects str on PY3 and unicode on PY2 hence the use of future.utils.native
         parsed = MovieParseResult(
@@ -204,8 +306,27 @@ class ParserGuessit(object):
     # series_parser API
     def parse_series(self, data, **kwargs):
         log.debug('Parsing series: `%s` [options: %s]', data, kwargs)
+        return self._parse_series(data, kwargs, self._series_options(kwargs))
+
+    def parse_series_many(self, data, **kwargs):
+        """
+        Parses many series titles with the same options, in worker processes when there are enough of them.
+
+        :param list data: Titles to parse
+        :return: List of :class:`SeriesParseResult`, in order of `data`
+        """
+        data = list(data)
+        results = self._parse_many('_parse_series_chunk', data, kwargs)
+        if results is None:
+            results = self._parse_series_chunk(data, **kwargs)
+        return results
+
+    def _parse_series_chunk(self, data, **kwargs):
+        guessit_options = self._series_options(kwargs)
+        return [self._parse_series(title, kwargs, guessit_options) for title in data]
+
+    def _series_options(self, kwargs):
         guessit_options = self._guessit_options(kwargs)
-        valid = True
         if kwargs.get('name'):
             expected_titles = [kwargs['name']]
             if kwargs.get('alternate_names'):
@@ -217,12 +338,16 @@ class ParserGuessit(object):
             guessit_options['expected_title'] = ['re:' + title for title in expected_titles]
         if kwargs.get('id_regexps'):
             guessit_options['id_regexps'] = kwargs.get('id_regexps')
-        start = preferred_clock()
         # If no series name is provided, we don't tell guessit what kind of match we are looking for
         # This prevents guessit from determining that too general of matches are series
         parse_type = 'episode' if kwargs.get('name') else None
         if parse_type:
             guessit_options['type'] = parse_type
+        return guessit_options
+
+    def _parse_series(self, data, kwargs, guessit_options):
+        valid = True
+        start = preferred_clock()
 
         # NOTE: Guessit expects str on PY3 and unicode on PY2 hence the use of future.utils.native
         try:
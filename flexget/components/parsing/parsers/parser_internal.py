@@ -9,7 +9,7 @@ from flexget.event import event
 from flexget.utils.log import log_once
 from flexget.utils.parsers.generic import ParseWarning
 from flexget.utils.parsers.movie import MovieParser
-from flexget.utils.parsers.series import SeriesParser
+from flexget.utils.parsers.series import get_template
 
 from .parser_common import MovieParseResult, SeriesParseResult
 
@@ -51,7 +51,8 @@ class ParserInternal(object):
     def parse_series(self, data, **kwargs):
         log.debug('Parsing series: `%s` kwargs: %s', data, kwargs)
         start = preferred_clock()
-        parser = SeriesParser(**kwargs)
+        # Parsers for the same configuration share their compiled regexps
+        parser = get_template(**kwargs).new_parser()
         try:
             parser.parse(data)
         except ParseWarning as pw:
@@ -63,6 +63,10 @@ class PluginParsing(object):
 
     on_task_abort = on_task_exit
 
+    def parser_name(self, parser_type):
+        """Returns the name of the parser used for `parser_type` in the current task run."""
+        return selected_parsers.get(parser_type) or default_parsers.get(parser_type)
+
     def parse_series(self, data, name=None, **kwargs):
         """
         Use the selected series parser to parse series information from `data`
@@ -73,7 +77,7 @@ class PluginParsing(object):
 
         :returns: An object containing the parsed information. The `valid` attribute will be set depending on success.
         """
-        parser = parsers['series'][selected_parsers.get('series', default_parsers.get('series'))]
+        parser = parsers['series'][self.parser_name('series')]
         return parser.parse_series(data, name=name, **kwargs)
 
     def parse_movie(self, data, **kwargs):
@@ -84,9 +88,38 @@ class PluginParsing(object):
 
         :returns: An object containing the parsed information. The `valid` attribute will be set depending on success.
         """
-        parser = parsers['movie'][selected_parsers.get('movie') or default_parsers['movie']]
+        parser = parsers['movie'][self.parser_name('movie')]
         return parser.parse_movie(data, **kwargs)
 
+    def parse_series_many(self, data, name=None, **kwargs):
+        """
+        Use the selected series parser to parse series information from many titles with the same options. Parsers
+        supporting it may spread large batches over several processes.
+
+        :param data: List of raw strings to parse information from.
+        :param name: The series name to parse data for.
+
+        :returns: List of parse results, in order of `data`.
+        """
+        parser = parsers['series'][self.parser_name('series')]
+        if hasattr(parser, 'parse_series_many'):
+            return parser.parse_series_many(data, name=name, **kwargs)
+        return [parser.parse_series(title, name=name, **kwargs) for title in data]
+
+    def parse_movie_many(self, data, **kwargs):
+        """
+        Use the selected movie parser to parse movie information from many titles with the same options. Parsers
+        supporting it may spread large batches over several processes.
+
+        :param data: List of raw strings to parse information from.
+
+        :returns: List of parse results, in order of `data`.
+        """
+        parser = parsers['movie'][self.parser_name('movie')]
+        if hasattr(parser, 'parse_movie_many'):
+            return parser.parse_movie_many(data, **kwargs)
+        return [parser.parse_movie(title, **kwargs) for title in data]
+
 
 @event('plugin.register')
 def register_plugin():
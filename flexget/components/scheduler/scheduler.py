@@ -4,10 +4,12 @@ import hashlib
 import logging
 import os
 import struct
+from datetime import datetime
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
 import pytz
 import tzlocal
+from apscheduler.events import EVENT_JOB_SUBMITTED
 from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
@@ -15,7 +17,7 @@ from apscheduler.triggers.cron import CronTrigger
 from flexget.config_schema import register_config_key, format_checker, register_schema
 from flexget.event import event
 from flexget.manager import manager
-from flexget.utils import json
+from flexget.utils import json, metrics
 
 log = logging.getLogger('scheduler')
 
@@ -110,6 +112,15 @@ def run_job(tasks):
     log.debug('all tasks in schedule finished executing')
 
 
+def record_lag(job_event):
+    """Records how late a job was submitted compared to when it was scheduled to run."""
+    if not job_event.scheduled_run_times:
+        return
+    scheduled = max(job_event.scheduled_run_times)
+    lag = datetime.now(scheduled.tzinfo) - scheduled
+    metrics.scheduler_lag.observe(max(lag.total_seconds(), 0))
+
+
 @event('manager.daemon.started')
 def setup_scheduler(manager):
     """Configure and start apscheduler"""
@@ -147,6 +158,7 @@ def setup_scheduler(manager):
     scheduler = BackgroundScheduler(
         jobstores=jobstores, job_defaults=job_defaults, timezone=timezone
     )
+    scheduler.add_listener(record_lag, EVENT_JOB_SUBMITTED)
     setup_jobs(manager)
 
 
@@ -64,7 +64,7 @@ class FilterSeen(object):
         """Filter entries already accepted on previous runs."""
         config = self.prepare_config(config)
         if config is False:
-            log.debug('%s is disabled' % self.keyword)
+            log.debug('%s is disabled', self.keyword)
             return
 
         fields = config.get('fields')
@@ -79,15 +79,17 @@ class FilterSeen(object):
                 if entry[field] not in values and entry[field]:
                     values.append(str(entry[field]))
             if values:
-                log.trace('querying for: %s' % ', '.join(values))
+                log.trace('querying for: %s', ', '.join(values))
                 # check if SeenField.value is any of the values
                 found = db.search_by_field_values(
                     field_value_list=values, task_name=task.name, local=local, session=task.session
                 )
                 if found:
                     log.debug(
-                        "Rejecting '%s' '%s' because of seen '%s'"
-                        % (entry['url'], entry['title'], found.value)
+                        "Rejecting '%s' '%s' because of seen '%s'",
+                        entry['url'],
+                        entry['title'],
+                        found.value,
                     )
                     se = (
                         task.session.query(db.SeenEntry)
@@ -117,7 +119,7 @@ class FilterSeen(object):
             self.learn(task, entry, fields=fields, local=local)
             # verbose if in learning mode
             if task.options.learn:
-                log.info("Learned '%s' (will skip this in the future)" % (entry['title']))
+                log.info("Learned '%s' (will skip this in the future)", entry['title'])
 
     def learn(self, task, entry, fields=None, reason=None, local=False):
         """Marks entry as seen"""
@@ -135,7 +137,7 @@ class FilterSeen(object):
             remembered.append(entry[field])
             sf = db.SeenField(str(field), str(entry[field]))
             se.fields.append(sf)
-            log.debug("Learned '%s' (field: %s, local: %d)" % (entry[field], field, local))
+            log.debug("Learned '%s' (field: %s, local: %d)", entry[field], field, local)
         # Only add the entry to the session if it has one of the required fields
         if se.fields:
             task.session.add(se)
@@ -144,7 +146,7 @@ class FilterSeen(object):
         """Forget SeenEntry with :title:. Return True if forgotten."""
         se = task.session.query(db.SeenEntry).filter(db.SeenEntry.title == title).first()
         if se:
-            log.debug("Forgotten '%s' (%s fields)" % (title, len(se.fields)))
+            log.debug("Forgotten '%s' (%s fields)", title, len(se.fields))
             task.session.delete(se)
             return True
 
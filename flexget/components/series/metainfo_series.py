@@ -31,11 +31,19 @@ class MetainfoSeries(object):
         # Don't run if we are disabled
         if config is False:
             return
-        for entry in task.entries:
+        entries = [
+            entry
+            for entry in task.entries
             # If series plugin already parsed this, don't touch it.
-            if entry.get('id'):
-                continue
-            self.guess_entry(entry)
+            if not entry.get('id')
+            and not (entry.get('series_parser') and entry['series_parser'].valid)
+        ]
+        # Parse all titles at once, so that the parser can spread them over several processes
+        results = plugin.get('parsing', self).parse_series_many(
+            [entry['title'] for entry in entries], identified_by='auto', allow_seasonless=False
+        )
+        for entry, parsed in zip(entries, results):
+            self.populate_entry(entry, parsed)
 
     def guess_entry(self, entry, allow_seasonless=False, config=None):
         """
@@ -52,6 +60,10 @@ class MetainfoSeries(object):
         parsed = plugin.get('parsing', self).parse_series(
             data=entry['title'], identified_by=identified_by, allow_seasonless=allow_seasonless
         )
+        return self.populate_entry(entry, parsed, config)
+
+    def populate_entry(self, entry, parsed, config=None):
+        """Populates series_* fields of `entry` if `parsed` is valid, returns whether it was."""
         if parsed and parsed.valid:
             parsed.name = plugin_parser_common.normalize_name(
                 plugin_parser_common.remove_dirt(parsed.name)
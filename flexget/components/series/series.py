@@ -586,18 +586,22 @@ class FilterSeries(FilterSeriesBase):
         for id_type in plugin_parser_common.SERIES_ID_TYPES:
             params[id_type + '_regexps'] = get_config_as_array(config, id_type + '_regexp')
 
-        parser = plugin.get('parsing', self)
-        for entry in entries:
-            # skip processed entries
-            if (
+        # skip processed entries
+        entries = [
+            entry
+            for entry in entries
+            if not (
                 entry.get('series_parser')
                 and entry['series_parser'].valid
                 and entry['series_parser'].name.lower() != series_name.lower()
-            ):
-                continue
-
+            )
+        ]
+        parser = plugin.get('parsing', self)
+        results = parser.parse_series_many(
+            [entry['title'] for entry in entries], name=series_name, **params
+        )
+        for entry, parsed in zip(entries, results):
             # Quality field may have been manipulated by e.g. assume_quality. Use quality field from entry if available.
-            parsed = parser.parse_series(entry['title'], name=series_name, **params)
             if not parsed.valid:
                 continue
             parsed.field = 'title'
@@ -863,8 +867,9 @@ class FilterSeries(FilterSeriesBase):
         log.debug('quality req: %s', reqs)
         result = []
         # see if any of the eps match accepted qualities
-        for entry in entries:
-            if reqs.allows(entry['quality']):
+        allowed = reqs.allows_many([entry['quality'] for entry in entries])
+        for entry, allow in zip(entries, allowed):
+            if allow:
                 result.append(entry)
             else:
                 log.verbose(
@@ -52,12 +52,54 @@ class ObjectsContainer(object):
 
     task_status_list_schema = {'type': 'array', 'items': task_status_schema}
 
+    duration = {'type': ['number', 'null']}
+    rollup_summary_properties = {
+        'executions': {'type': 'integer'},
+        'aborted': {'type': 'integer'},
+        'abort_rate': {'type': 'number'},
+        'produced': {'type': 'integer'},
+        'accepted': {'type': 'integer'},
+        'rejected': {'type': 'integer'},
+        'failed': {'type': 'integer'},
+        'duration_avg': duration,
+        'duration_p50': duration,
+        'duration_p95': duration,
+        'duration_max': duration,
+    }
+
+    rollup_schema = {
+        'type': 'object',
+        'properties': dict(
+            rollup_summary_properties,
+            id={'type': 'integer'},
+            task_id={'type': 'integer'},
+            period={'type': 'string', 'enum': list(db.PERIODS)},
+            start={'type': 'string', 'format': 'date-time'},
+        ),
+        'additionalProperties': False,
+    }
+
+    rollups_schema = {
+        'type': 'object',
+        'properties': {
+            'period': {'type': 'string', 'enum': list(db.PERIODS)},
+            'summary': {
+                'type': 'object',
+                'properties': rollup_summary_properties,
+                'additionalProperties': False,
+            },
+            'rollups': {'type': 'array', 'items': rollup_schema},
+        },
+        'additionalProperties': False,
+    }
+
 
 task_status = api.schema_model('tasks.tasks_status', ObjectsContainer.task_status_schema)
 task_status_list = api.schema_model(
     'tasks.tasks_status_list', ObjectsContainer.task_status_list_schema
 )
 task_executions = api.schema_model('tasks.tasks_executions_list', ObjectsContainer.executions_list)
+task_rollups = api.schema_model('tasks.tasks_rollups', ObjectsContainer.rollups_schema)
 
 sort_choices = ('last_execution_time', 'name', 'id')
 tasks_parser = api.pagination_parser(sort_choices=sort_choices)
@@ -273,3 +315,51 @@ class TaskStatusExecutionsAPI(APIResource):
         # Add link header to response
         rsp.headers.extend(pagination)
         return rsp
+
+
+rollups_parser = api.parser()
+rollups_parser.add_argument(
+    'period', choices=list(db.PERIODS), default='day', help='Length of the rollup periods'
+)
+rollups_parser.add_argument(
+    'start_date',
+    type=inputs.datetime_from_iso8601,
+    help='Filter by minimal start date. Example: \'2012-01-01\'. Default is 1 week ago.',
+)
+rollups_parser.add_argument(
+    'end_date',
+    type=inputs.datetime_from_iso8601,
+    help='Filter by maximal start date. Example: \'2012-01-01\'',
+)
+
+
+@tasks_api.route('/status/<int:task_id>/rollups/')
+@status_api.route('/<int:task_id>/rollups/')
+@api.doc(parser=rollups_parser, params={'task_id': 'ID of the status task'})
+class TaskStatusRollupsAPI(APIResource):
+    @etag
+    @api.response(200, model=task_rollups)
+    @api.response(NotFoundError)
+    def get(self, task_id, session=None):
+        """Get hourly or daily rollups of task executions with duration percentiles"""
+        try:
+            session.query(db.StatusTask).filter(db.StatusTask.id == task_id).one()
+        except NoResultFound:
+            raise NotFoundError('task status with id %d not found' % task_id)
+
+        args = rollups_parser.parse_args()
+        rollups = db.get_rollups(
+            task_id,
+            period=args['period'],
+            start_date=args.get('start_date') or datetime.now() - timedelta(weeks=1),
+            end_date=args.get('end_date'),
+            session=session,
+        )
+        summary = db.summarize(rollups)
+        return jsonify(
+            {
+                'period': args['period'],
+                'summary': summary,
+                'rollups': [rollup.to_dict() for rollup in rollups],
+            }
+        )
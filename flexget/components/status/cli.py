@@ -18,7 +18,9 @@ from . import db
 def do_cli(manager, options):
     if options.table_type == 'porcelain':
         disable_all_colors()
-    if options.task:
+    if options.rollup:
+        do_cli_rollup(manager, options)
+    elif options.task:
         do_cli_task(manager, options)
     else:
         do_cli_summary(manager, options)
@@ -64,6 +66,60 @@ def do_cli_task(manager, options):
         console('ERROR: %s' % str(e))
 
 
+def format_duration(seconds):
+    return '%1.fs' % seconds if seconds is not None else '-'
+
+
+def rollup_row(first_column, summary):
+    return [
+        first_column,
+        summary['executions'],
+        '%.0f%%' % (summary['abort_rate'] * 100),
+        format_duration(summary['duration_p50']),
+        format_duration(summary['duration_p95']),
+        format_duration(summary['duration_max']),
+        summary['produced'],
+        summary['accepted'],
+        summary['failed'],
+    ]
+
+
+def do_cli_rollup(manager, options):
+    """Shows the latest hourly or daily rollups of a task, or the totals over them for each task."""
+    header = ['Executions', 'Aborted', 'p50', 'p95', 'Max', 'Produced', 'Accepted', 'Failed']
+    period = options.rollup
+    with Session() as session:
+        if options.task:
+            task = session.query(db.StatusTask).filter(db.StatusTask.name == options.task).first()
+            if not task:
+                console(
+                    'Task name `%s` does not exists or does not have any records' % options.task
+                )
+                return
+            table_data = [['Start'] + header]
+            rollups = (
+                task.rollups.filter(db.TaskRollup.period == period)
+                .order_by(desc(db.TaskRollup.start))[: options.limit]
+            )
+            for rollup in reversed(rollups):
+                start = rollup.start.strftime('%Y-%m-%d %H:%M' if period == 'hour' else '%Y-%m-%d')
+                table_data.append(rollup_row(start, db.summarize([rollup])))
+        else:
+            table_data = [['Task'] + header]
+            since = db.bucket_start(datetime.datetime.now(), period) - (
+                db.PERIODS[period] * (options.limit - 1)
+            )
+            for task in session.query(db.StatusTask).order_by(db.StatusTask.name):
+                rollups = db.get_rollups(task.id, period, start_date=since, session=session)
+                table_data.append(rollup_row(task.name, db.summarize(rollups)))
+
+    try:
+        table = TerminalTable(options.table_type, table_data)
+        console(table.output)
+    except TerminalTableError as e:
+        console('ERROR: %s' % str(e))
+
+
 def do_cli_summary(manager, options):
     header = [
         'Task',
@@ -143,3 +199,9 @@ def register_parser_arguments():
         default=50,
         help='Limit to %(metavar)s results',
     )
+    parser.add_argument(
+        '--rollup',
+        choices=list(db.PERIODS),
+        help='show the execution counts, abort rate and duration percentiles of each hour or day, '
+        'or their totals for each task over the last --limit hours or days',
+    )
@@ -1,11 +1,24 @@
 from __future__ import unicode_literals, division, absolute_import
+import bisect
 import logging
 import datetime
+from collections import OrderedDict
 from datetime import timedelta
 
-from flexget.utils.database import with_session
+from flexget.utils.database import json_synonym, with_session
 from flexget.utils.sqlalchemy_utils import create_index
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, select, func, Index
+from sqlalchemy import (
+    Column,
+    Integer,
+    Float,
+    String,
+    Unicode,
+    DateTime,
+    Boolean,
+    select,
+    func,
+    Index,
+)
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.schema import ForeignKey
 from sqlalchemy.orm import relation
@@ -14,7 +27,16 @@ from flexget import db_schema
 from flexget.event import event
 
 log = logging.getLogger('status.db')
-Base = db_schema.versioned_base('status', 2)
+Base = db_schema.versioned_base('status', 3)
+
+# Rollups are kept for buckets of these lengths
+PERIODS = OrderedDict([('hour', timedelta(hours=1)), ('day', timedelta(days=1))])
+# Upper bounds in seconds of the buckets of the duration histograms, from 0.1 seconds to 14 hours
+DURATION_BUCKETS = [0.1 * 1.25 ** i for i in range(60)]
+# Task executions are only kept in the rollups once they are older than this
+EXECUTION_HISTORY = timedelta(days=30)
+# Hourly rollups are removed once they are older than this, daily rollups are kept
+HOURLY_ROLLUP_HISTORY = timedelta(days=90)
 
 
 @db_schema.upgrade('status')
@@ -23,6 +45,18 @@ def upgrade(ver, session):
         # Creates the executions table index
         create_index('status_execution', session, 'task_id', 'start', 'end', 'succeeded')
         ver = 2
+    if ver < 3:
+        # Rollups are updated as tasks finish, the executions before have to be added once
+        rollups = {}
+        query = session.query(TaskExecution).filter(TaskExecution.end != None)
+        for execution in query.yield_per(1000):
+            for period in PERIODS:
+                key = (execution.task_id, period, bucket_start(execution.start, period))
+                if key not in rollups:
+                    rollups[key] = TaskRollup(task_id=key[0], period=period, start=key[2])
+                rollups[key].add(execution)
+        session.add_all(rollups.values())
+        ver = 3
     return ver
 
 
@@ -33,6 +67,9 @@ class StatusTask(Base):
     executions = relation(
         'TaskExecution', backref='task', cascade='all, delete, delete-orphan', lazy='dynamic'
     )
+    rollups = relation(
+        'TaskRollup', backref='task', cascade='all, delete, delete-orphan', lazy='dynamic'
+    )
 
     def __repr__(self):
         return '<StatusTask(id=%s,name=%s)>' % (self.id, self.name)
@@ -111,6 +148,143 @@ Index(
 )
 
 
+def bucket_start(time, period):
+    """Returns the start of the rollup bucket of `period` which `time` falls in."""
+    if period == 'hour':
+        return time.replace(minute=0, second=0, microsecond=0)
+    return time.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def duration_percentile(histogram, fraction, maximum):
+    """
+    Returns the duration below which `fraction` of the executions in a duration histogram took.
+
+    The result is the upper bound of the bucket it falls in, so it overestimates by up to a
+    quarter.
+    """
+    total = sum(histogram.values())
+    if not total:
+        return None
+    cumulative = 0
+    for index in sorted(histogram, key=int):
+        cumulative += histogram[index]
+        if cumulative >= fraction * total:
+            if int(index) >= len(DURATION_BUCKETS):
+                return maximum
+            return min(DURATION_BUCKETS[int(index)], maximum)
+    return maximum
+
+
+class TaskRollup(Base):
+    """Aggregates of the executions of a task which started in the same hour or day."""
+
+    __tablename__ = 'status_rollup'
+    id = Column(Integer, primary_key=True)
+    task_id = Column(Integer, ForeignKey('status_task.id'))
+    period = Column(String)
+    start = Column(DateTime)
+
+    executions = Column(Integer, default=0)
+    aborted = Column(Integer, default=0)
+    produced = Column(Integer, default=0)
+    accepted = Column(Integer, default=0)
+    rejected = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    duration_total = Column(Float, default=0)
+    duration_max = Column(Float, default=0)
+    # Amount of executions by the index of their bucket in DURATION_BUCKETS
+    _durations = Column('durations', Unicode)
+    durations = json_synonym('_durations')
+
+    def __init__(self, **kwargs):
+        super(TaskRollup, self).__init__(**kwargs)
+        for name in ('executions', 'aborted', 'produced', 'accepted', 'rejected', 'failed'):
+            setattr(self, name, getattr(self, name) or 0)
+        self.duration_total = self.duration_total or 0
+        self.duration_max = self.duration_max or 0
+        self.durations = {}
+
+    def __repr__(self):
+        return '<TaskRollup(task_id=%s,period=%s,start=%s,executions=%s)>' % (
+            self.task_id,
+            self.period,
+            self.start,
+            self.executions,
+        )
+
+    def add(self, execution):
+        """Adds a finished task execution."""
+        duration = max((execution.end - execution.start).total_seconds(), 0)
+        self.executions += 1
+        if execution.succeeded is False:
+            self.aborted += 1
+        for name in ('produced', 'accepted', 'rejected', 'failed'):
+            setattr(self, name, getattr(self, name) + (getattr(execution, name) or 0))
+        self.duration_total += duration
+        self.duration_max = max(self.duration_max, duration)
+        durations = self.durations
+        index = str(bisect.bisect_left(DURATION_BUCKETS, duration))
+        durations[index] = durations.get(index, 0) + 1
+        self.durations = durations
+
+    def to_dict(self):
+        data = summarize([self])
+        data.update(
+            {'id': self.id, 'task_id': self.task_id, 'period': self.period, 'start': self.start}
+        )
+        return data
+
+
+def summarize(rollups):
+    """Merges rollups into a summary of the executions they contain."""
+    executions = sum(r.executions for r in rollups)
+    aborted = sum(r.aborted for r in rollups)
+    durations = {}
+    for rollup in rollups:
+        for index, count in rollup.durations.items():
+            durations[index] = durations.get(index, 0) + count
+    duration_max = max([r.duration_max for r in rollups] or [0])
+    summary = {
+        'executions': executions,
+        'aborted': aborted,
+        'abort_rate': aborted / executions if executions else 0,
+        'duration_avg': (
+            sum(r.duration_total for r in rollups) / executions if executions else None
+        ),
+        'duration_p50': duration_percentile(durations, 0.5, duration_max),
+        'duration_p95': duration_percentile(durations, 0.95, duration_max),
+        'duration_max': duration_max if executions else None,
+    }
+    for name in ('produced', 'accepted', 'rejected', 'failed'):
+        summary[name] = sum(getattr(r, name) for r in rollups)
+    return summary
+
+
+Index(
+    'ix_status_rollup_task_id_period_start',
+    TaskRollup.task_id,
+    TaskRollup.period,
+    TaskRollup.start,
+)
+
+
+def add_execution(execution, session):
+    """Adds a finished task execution to the hourly and daily rollups of its task."""
+    for period in PERIODS:
+        start = bucket_start(execution.start, period)
+        rollup = (
+            session.query(TaskRollup)
+            .filter(TaskRollup.task_id == execution.task_id)
+            .filter(TaskRollup.period == period)
+            .filter(TaskRollup.start == start)
+            .first()
+        )
+        if rollup is None:
+            rollup = TaskRollup(task_id=execution.task_id, period=period, start=start)
+            session.add(rollup)
+        rollup.add(execution)
+
+
 @event('manager.db_cleanup')
 def db_cleanup(manager, session):
     # Purge all status data for non existing tasks
@@ -119,14 +293,27 @@ def db_cleanup(manager, session):
             log.verbose('Purging obsolete status data for task %s', status_task.name)
             session.delete(status_task)
 
-    # Purge task executions older than 1 year
+    # Old task executions are only kept in the rollups
+    now = datetime.datetime.now()
     result = (
         session.query(TaskExecution)
-        .filter(TaskExecution.start < datetime.datetime.now() - timedelta(days=365))
+        .filter(TaskExecution.start < now - EXECUTION_HISTORY)
         .delete()
     )
     if result:
-        log.verbose('Removed %s task executions from history older than 1 year', result)
+        log.verbose(
+            'Compacted %s task executions older than %s days into the daily rollups',
+            result,
+            EXECUTION_HISTORY.days,
+        )
+    result = (
+        session.query(TaskRollup)
+        .filter(TaskRollup.period == 'hour')
+        .filter(TaskRollup.start < now - HOURLY_ROLLUP_HISTORY)
+        .delete()
+    )
+    if result:
+        log.verbose('Removed %s hourly rollups of task executions', result)
 
 
 @with_session
@@ -188,3 +375,18 @@ def get_executions_by_task_id(
     else:
         query = query.order_by(getattr(TaskExecution, order_by))
     return query.slice(start, stop).all()
+
+
+@with_session
+def get_rollups(task_id, period='day', start_date=None, end_date=None, session=None):
+    """Returns the rollups of `period` of a task, oldest first."""
+    query = (
+        session.query(TaskRollup)
+        .filter(TaskRollup.task_id == task_id)
+        .filter(TaskRollup.period == period)
+    )
+    if start_date:
+        query = query.filter(TaskRollup.start >= bucket_start(start_date, period))
+    if end_date:
+        query = query.filter(TaskRollup.start <= end_date)
+    return query.order_by(TaskRollup.start).all()
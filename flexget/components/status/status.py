@@ -2,11 +2,11 @@ from __future__ import unicode_literals, division, absolute_import
 
 import datetime
 import logging
-from datetime import timedelta
 
 from flexget import plugin
 from flexget.event import event
 from flexget.manager import Session
+from flexget.utils import metrics
 from . import db
 
 log = logging.getLogger('status')
@@ -51,29 +51,23 @@ class Status(object):
                 self.execution.succeeded = False
                 self.execution.abort_reason = task.abort_reason
             self.execution.end = datetime.datetime.now()
-            session.merge(self.execution)
+            execution = session.merge(self.execution)
+            session.flush()
+            db.add_execution(execution, session)
+            self.update_metrics(task.name, self.execution)
+
+    @staticmethod
+    def update_metrics(name, execution):
+        duration = (execution.end - execution.start).total_seconds()
+        metrics.task_duration.observe(
+            duration, task=name, succeeded=str(execution.succeeded is not False).lower()
+        )
+        for state in ['produced', 'accepted', 'rejected', 'failed']:
+            metrics.task_entries.inc(getattr(execution, state) or 0, task=name, state=state)
 
     on_task_abort = on_task_exit
 
 
-@event('manager.db_cleanup')
-def db_cleanup(manager, session):
-    # Purge all status data for non existing tasks
-    for status_task in session.query(db.StatusTask).all():
-        if status_task.name not in manager.config['tasks']:
-            log.verbose('Purging obsolete status data for task %s', status_task.name)
-            session.delete(status_task)
-
-    # Purge task executions older than 1 year
-    result = (
-        session.query(db.TaskExecution)
-        .filter(db.TaskExecution.start < datetime.datetime.now() - timedelta(days=365))
-        .delete()
-    )
-    if result:
-        log.verbose('Removed %s task executions from history older than 1 year', result)
-
-
 @event('plugin.register')
 def register_plugin():
     plugin.register(Status, 'status', builtin=True, api_ver=2)
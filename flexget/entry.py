@@ -6,6 +6,7 @@ import copy
 import functools
 import logging
 
+from flexget.logger import TRACE
 from flexget.plugin import PluginError
 from flexget.utils.lazy_dict import LazyDict, LazyLookup
 from flexget.utils.template import render_from_entry, FlexGetTemplate
@@ -131,7 +132,7 @@ class Entry(LazyDict):
 
     def accept(self, reason=None, **kwargs):
         if self.rejected:
-            log.debug('tried to accept rejected %r' % self)
+            log.debug('tried to accept rejected %r', self)
         elif not self.accepted:
             self._state = 'accepted'
             self.trace(reason, operation='accept')
@@ -142,7 +143,7 @@ class Entry(LazyDict):
         # ignore rejections on immortal entries
         if self.get('immortal'):
             reason_str = '(%s)' % reason if reason else ''
-            log.info('Tried to reject immortal %s %s' % (self['title'], reason_str))
+            log.info('Tried to reject immortal %s %s', self['title'], reason_str)
             self.trace('Tried to reject immortal %s' % reason_str)
             return
         if not self.rejected:
@@ -152,11 +153,11 @@ class Entry(LazyDict):
             self.run_hooks('reject', reason=reason, **kwargs)
 
     def fail(self, reason=None, **kwargs):
-        log.debug('Marking entry \'%s\' as failed' % self['title'])
+        log.debug('Marking entry \'%s\' as failed', self['title'])
         if not self.failed:
             self._state = 'failed'
             self.trace(reason, operation='fail')
-            log.error('Failed %s (%s)' % (self['title'], reason))
+            log.error('Failed %s (%s)', self['title'], reason)
             # Run entry on_fail hooks
             self.run_hooks('fail', reason=reason, **kwargs)
 
@@ -214,10 +215,11 @@ class Entry(LazyDict):
                 raise PluginError('Tried to set title to %r' % value)
             self.setdefault('original_title', value)
 
-        try:
-            log.trace('ENTRY SET: %s = %r' % (key, value))
-        except Exception as e:
-            log.debug('trying to debug key `%s` value threw exception: %s' % (key, e))
+        if log.isEnabledFor(TRACE):
+            try:
+                log.trace('ENTRY SET: %s = %r' % (key, value))
+            except Exception as e:
+                log.debug('trying to debug key `%s` value threw exception: %s', key, e)
 
         super(Entry, self).__setitem__(key, value)
 
@@ -252,12 +254,14 @@ class Entry(LazyDict):
                 snapshot[field] = copy.deepcopy(value)
             except TypeError:
                 log.warning(
-                    'Unable to take `%s` snapshot for field `%s` in `%s`'
-                    % (name, field, self['title'])
+                    'Unable to take `%s` snapshot for field `%s` in `%s`',
+                    name,
+                    field,
+                    self['title'],
                 )
         if snapshot:
             if name in self.snapshots:
-                log.warning('Snapshot `%s` is being overwritten for `%s`' % (name, self['title']))
+                log.warning('Snapshot `%s` is being overwritten for `%s`', name, self['title'])
             self.snapshots[name] = snapshot
 
     def update_using_map(self, field_map, source_item, ignore_none=False):
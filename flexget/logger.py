@@ -1,11 +1,16 @@
 from __future__ import unicode_literals, division, absolute_import, print_function
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
+import atexit
 import codecs
 import collections
 import contextlib
+import gzip
+import json
 import logging
 import logging.handlers
+import queue
+import shutil
 import sys
 import threading
 import uuid
@@ -22,8 +27,12 @@ VERBOSE = 15
 # environment variables to modify rotating log parameters from defaults of 1 MB and 9 files
 ENV_MAXBYTES = 'FLEXGET_LOG_MAXBYTES'
 ENV_MAXCOUNT = 'FLEXGET_LOG_MAXCOUNT'
+# environment variable to compress rotated log files with gzip
+ENV_COMPRESS = 'FLEXGET_LOG_COMPRESS'
+# Records waiting for the log handlers in the background, further ones are dropped
+QUEUE_SIZE = 10000
 
-# Stores `task`, logging `session_id`, and redirected `output` stream in a thread local context
+# Stores `task`, `plugin`, logging `session_id`, and redirected `output` stream in a thread local context
 local_context = threading.local()
 
 
@@ -52,6 +61,17 @@ def task_logging(task):
         local_context.task = old_task
 
 
+@contextlib.contextmanager
+def plugin_logging(plugin):
+    """Context manager which adds the name of the running plugin to log messages."""
+    old_plugin = getattr(local_context, 'plugin', '')
+    local_context.plugin = plugin
+    try:
+        yield
+    finally:
+        local_context.plugin = old_plugin
+
+
 class SessionFilter(logging.Filter):
     def __init__(self, session_id):
         self.session_id = session_id
@@ -82,11 +102,20 @@ def capture_output(stream, loglevel=None):
             root_logger.setLevel(loglevel)
     local_context.output = stream
     local_context.loglevel = loglevel
-    root_logger.addHandler(streamhandler)
+    listener = _listener
+    if listener:
+        listener.add_handler(streamhandler)
+    else:
+        root_logger.addHandler(streamhandler)
     try:
         yield
     finally:
-        root_logger.removeHandler(streamhandler)
+        if listener:
+            # Deliver the queued messages of this session before the stream is closed
+            listener.flush()
+            listener.remove_handler(streamhandler)
+        else:
+            root_logger.removeHandler(streamhandler)
         root_logger.setLevel(old_level)
         local_context.session_id = old_id
         local_context.output = old_output
@@ -111,16 +140,22 @@ class RollingBuffer(collections.deque):
 
 
 class FlexGetLogger(logging.Logger):
-    """Custom logger that adds trace and verbose logging methods, and contextual information to log records."""
+    """
+    Custom logger that adds trace and verbose logging methods, and contextual information to log records.
+
+    Pass message arguments separately rather than formatting the message, so that they are only formatted if the
+    level is enabled. Python 3.7+ caches the level check of each logger until any level changes.
+    """
 
     def makeRecord(self, name, level, fn, lno, msg, args, exc_info, func, extra, *exargs):
         extra = extra or {}
-        extra.update(
-            task=getattr(local_context, 'task', ''),
-            session_id=getattr(local_context, 'session_id', ''),
-        )
+        # Look up the thread local context only once
+        context = vars(local_context)
+        extra['task'] = context.get('task', '')
+        extra['plugin'] = context.get('plugin', '')
+        extra['session_id'] = context.get('session_id', '')
         # Replace newlines in log messages with \n
-        if isinstance(msg, str):
+        if isinstance(msg, str) and '\n' in msg:
             msg = msg.replace('\n', '\\n')
 
         return logging.Logger.makeRecord(
@@ -129,11 +164,13 @@ class FlexGetLogger(logging.Logger):
 
     def trace(self, msg, *args, **kwargs):
         """Log at TRACE level (more detailed than DEBUG)."""
-        self.log(TRACE, msg, *args, **kwargs)
+        if self.isEnabledFor(TRACE):
+            self._log(TRACE, msg, args, **kwargs)
 
     def verbose(self, msg, *args, **kwargs):
         """Log at VERBOSE level (displayed when FlexGet is run interactively.)"""
-        self.log(VERBOSE, msg, *args, **kwargs)
+        if self.isEnabledFor(VERBOSE):
+            self._log(VERBOSE, msg, args, **kwargs)
 
 
 class FlexGetFormatter(logging.Formatter):
@@ -150,9 +187,194 @@ class FlexGetFormatter(logging.Formatter):
         return logging.Formatter.format(self, record)
 
 
+class NotifyingHandler(logging.Handler):
+    """Wakes up the threads in :func:`wait_for_log` once the records before it were written to the log file."""
+
+    def emit(self, record):
+        global _log_writes
+        with _log_written:
+            _log_writes += 1
+            _log_written.notify_all()
+
+
+def log_writes():
+    """Returns the number of records written to the log file so far, to pass to :func:`wait_for_log`."""
+    return _log_writes
+
+
+def wait_for_log(writes, timeout=None):
+    """
+    Waits until records were written to the log file since `writes` were, or for `timeout` seconds.
+
+    :return: The number of records written to the log file so far.
+    """
+    with _log_written:
+        if _log_writes == writes:
+            _log_written.wait(timeout)
+        return _log_writes
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats log records as JSON objects, one per line, for tools and the log API to filter on fields."""
+
+    def __init__(self):
+        logging.Formatter.__init__(self, datefmt='%Y-%m-%d %H:%M:%S')
+
+    def format(self, record):
+        data = {
+            'timestamp': self.formatTime(record, self.datefmt),
+            'log_level': record.levelname,
+            'logger': record.name,
+            'task': getattr(record, 'task', ''),
+            'plugin': getattr(record, 'plugin', ''),
+            'session_id': str(getattr(record, 'session_id', None) or ''),
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, sort_keys=True)
+
+
+class CompressingRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    """Rotating file handler which compresses rotated log files with gzip. Requires python 3.3+."""
+
+    def __init__(self, *args, **kwargs):
+        logging.handlers.RotatingFileHandler.__init__(self, *args, **kwargs)
+        self.namer = self.gzip_name
+        self.rotator = self.gzip_rotate
+
+    @staticmethod
+    def gzip_name(name):
+        return name + '.gz'
+
+    @staticmethod
+    def gzip_rotate(source, dest):
+        with open(source, 'rb') as f_in:
+            with gzip.open(dest, 'wb') as f_out:
+                shutil.copyfileobj(f_in, f_out)
+        os.remove(source)
+
+
+class DroppingQueueHandler(logging.Handler):
+    """
+    Puts log records in a bounded queue for a :class:`LogListener` to handle in the background.
+
+    Logging never waits for slow handlers, like a busy disk or a remote console. When the queue is full, records
+    below WARNING are dropped right away, others after waiting for the queue for a second.
+    """
+
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Format the message and exception now, the arguments may change before the listener gets to them
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            record = self.prepare(record)
+            if record.levelno < logging.WARNING:
+                self.queue.put_nowait(record)
+            else:
+                self.queue.put(record, timeout=1)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+
+class LogListener(object):
+    """Passes records from the queue of a :class:`DroppingQueueHandler` on to its handlers on a background thread."""
+
+    _stop = object()
+
+    def __init__(self, queue_handler, handlers=()):
+        self.queue_handler = queue_handler
+        self.queue = queue_handler.queue
+        # Replaced rather than modified, so that handlers can be added while records are being handled
+        self.handlers = list(handlers)
+        self._thread = None
+
+    def add_handler(self, handler):
+        self.handlers = self.handlers + [handler]
+
+    def remove_handler(self, handler):
+        self.handlers = [h for h in self.handlers if h is not handler]
+
+    def start(self):
+        self._thread = threading.Thread(target=self._monitor, name='log_listener')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        if self._thread:
+            self.queue.put(self._stop)
+            self._thread.join()
+            self._thread = None
+
+    def flush(self, timeout=5):
+        """Waits until the records queued so far have been handled."""
+        if not self._thread:
+            return
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return
+        done.wait(timeout)
+
+    def handle(self, record):
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        if self.queue_handler.dropped:
+            dropped, self.queue_handler.dropped = self.queue_handler.dropped, 0
+            self.handle(
+                logging.makeLogRecord(
+                    {
+                        'name': 'logger',
+                        'levelno': logging.WARNING,
+                        'levelname': 'WARNING',
+                        'msg': '%s log messages were dropped, logging could not keep up' % dropped,
+                        'task': '',
+                        'plugin': '',
+                        'session_id': '',
+                    }
+                )
+            )
+
+    def _monitor(self):
+        while True:
+            item = self.queue.get()
+            if item is self._stop:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+                continue
+            try:
+                self.handle(item)
+            except Exception:
+                # Handlers report their own errors, this only keeps the listener alive
+                pass
+
+
 _logging_configured = False
 _buff_handler = None
 _logging_started = False
+# Handles log records in the background once logging is started with `queued`
+_listener = None
+# Records written to the log file, and a condition notified after each
+_log_writes = 0
+_log_written = threading.Condition()
 # Stores the last 50 debug messages
 debug_buffer = RollingBuffer(maxlen=50)
 
@@ -190,10 +412,20 @@ def initialize(unit_test=False):
     logger.addHandler(crash_handler)
 
 
-def start(filename=None, level=logging.INFO, to_console=True, to_file=True):
+def start(
+    filename=None,
+    level=logging.INFO,
+    to_console=True,
+    to_file=True,
+    queued=False,
+    log_format='text',
+):
     """After initialization, start file logging.
+
+    :param queued: Handle log records on a background thread, so that logging never blocks for long.
+    :param log_format: Format of the log file, either 'text' or 'json' for JSON lines.
     """
-    global _logging_started
+    global _logging_started, _listener
 
     assert _logging_configured
     if _logging_started:
@@ -204,16 +436,28 @@ def start(filename=None, level=logging.INFO, to_console=True, to_file=True):
     level = get_level_no(level)
     logger.setLevel(level)
 
+    handlers = []
     formatter = FlexGetFormatter()
     if to_file:
-        file_handler = logging.handlers.RotatingFileHandler(
+        handler_class = logging.handlers.RotatingFileHandler
+        # Rotated files can only be renamed on python 3.3+
+        if os.environ.get(ENV_COMPRESS) and hasattr(handler_class, 'rotation_filename'):
+            handler_class = CompressingRotatingFileHandler
+        file_handler = handler_class(
             filename,
             maxBytes=int(os.environ.get(ENV_MAXBYTES, 1000 * 1024)),
             backupCount=int(os.environ.get(ENV_MAXCOUNT, 9)),
         )
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(JSONFormatter() if log_format == 'json' else formatter)
         file_handler.setLevel(level)
-        logger.addHandler(file_handler)
+        # Lets the log API follow the file without polling it
+        handlers.extend([file_handler, NotifyingHandler(level)])
+        if queued:
+            # Imported here, the log index module uses this one
+            from flexget.utils.log_index import IndexingHandler
+
+            # Indexes the log for searches as it is written, away from the threads doing the logging
+            handlers.append(IndexingHandler(file_handler, level))
 
     # without --cron we log to console
     if to_console:
@@ -226,7 +470,17 @@ def start(filename=None, level=logging.INFO, to_console=True, to_file=True):
         console_handler = logging.StreamHandler(safe_stdout)
         console_handler.setFormatter(formatter)
         console_handler.setLevel(level)
-        logger.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    if queued:
+        queue_handler = DroppingQueueHandler(queue.Queue(QUEUE_SIZE))
+        _listener = LogListener(queue_handler, handlers)
+        _listener.start()
+        atexit.register(stop)
+        logger.addHandler(_listener.queue_handler)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     # flush what we have stored from the plugin initialization
     logger.removeHandler(_buff_handler)
@@ -238,5 +492,29 @@ def start(filename=None, level=logging.INFO, to_console=True, to_file=True):
     _logging_started = True
 
 
+def stop():
+    """Handles the queued log records, stops the background thread and goes on logging synchronously."""
+    global _listener
+    if _listener:
+        listener, _listener = _listener, None
+        logger = logging.getLogger()
+        logger.removeHandler(listener.queue_handler)
+        listener.stop()
+        for handler in listener.handlers:
+            logger.addHandler(handler)
+
+
+def suspend():
+    """Stops the thread handling queued log records before the process forks, records wait in the queue meanwhile."""
+    if _listener:
+        _listener.stop()
+
+
+def resume():
+    """Starts handling queued log records again after :func:`suspend`."""
+    if _listener and not _listener._thread:
+        _listener.start()
+
+
 # Set our custom logger class as default
 logging.setLoggerClass(FlexGetLogger)
@@ -221,7 +221,14 @@ class Manager(object):
         # If an absolute path is not specified, use the config directory.
         if not os.path.isabs(log_file):
             log_file = os.path.join(self.config_base, log_file)
-        logger.start(log_file, self.options.loglevel.upper(), to_console=not self.options.cron)
+        logger.start(
+            log_file,
+            self.options.loglevel.upper(),
+            to_console=not self.options.cron,
+            # The daemon keeps logging in the background, so that slow log output doesn't hold up tasks
+            queued=getattr(self.options, 'cli_command', None) == 'daemon',
+            log_format=self.options.log_format,
+        )
 
     def initialize(self):
         """
@@ -953,6 +960,8 @@ class Manager(object):
         if sys.platform.startswith('win'):
             log.error('Cannot daemonize on windows')
             return
+        # Threads don't survive the forks, the log listener is started again in the daemon process
+        logger.suspend()
         if threading.activeCount() != 1:
             log.critical(
                 'There are %r active threads. '
@@ -989,6 +998,7 @@ class Manager(object):
             sys.stderr.write('fork #2 failed: %d (%s)\n' % (e.errno, e.strerror))
             sys.exit(1)
 
+        logger.resume()
         log.info('Daemonize complete. New PID: %s' % os.getpid())
         # redirect standard file descriptors
         sys.stdout.flush()
@@ -445,6 +445,12 @@ manager_parser.add_argument(
     choices=['none', 'critical', 'error', 'warning', 'info', 'verbose', 'debug', 'trace'],
 )
 manager_parser.set_post_defaults(loglevel='verbose')
+manager_parser.add_argument(
+    '--log-format',
+    choices=['text', 'json'],
+    default='text',
+    help='Format of the logfile, json writes one JSON object per line. Default: %(default)s',
+)
 # This option is already handled above.
 manager_parser.add_argument(
     '--bugreport',
@@ -508,6 +514,13 @@ class CoreArgumentParser(ArgumentParser):
             help='matches are not downloaded but will be skipped in the future',
         )
         exec_parser.add_argument('--profile', action='store_true', default=False, help=SUPPRESS)
+        exec_parser.add_argument(
+            '--trace-file',
+            metavar='FILE',
+            help='write a trace of the tasks, their phases, plugins, lazy lookups, http requests '
+            'and database queries to FILE in Chrome trace event format, and their collapsed '
+            'stacks for flamegraphs next to it with the .folded extension',
+        )
         exec_parser.add_argument('--disable-phases', nargs='*', help=SUPPRESS)
         exec_parser.add_argument('--inject', nargs='+', action=InjectAction, help=SUPPRESS)
         # Plugins should respect these flags where appropriate
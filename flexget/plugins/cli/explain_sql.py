@@ -1,19 +1,48 @@
 from __future__ import unicode_literals, division, absolute_import
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
+import io
+import json
 import logging
+import os
+import re
+import threading
+from collections import OrderedDict
 from time import time
 from argparse import SUPPRESS
 
+from sqlalchemy import event as sqlalchemy_event, inspect
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm.query import Query
 from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.sql.expression import Executable, ClauseElement, _literal_as_text
 
-from flexget import manager, options
+from flexget import logger, manager, options, plugin
 from flexget.event import event
 
 log = logging.getLogger('explain_sql')
 
+try:
+    from time import perf_counter as wall_clock
+except ImportError:
+    wall_clock = time
+
+# Statements which have a query plan
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'INSERT', 'WITH')
+# A table read row by row. Scans of an index, or of a subquery, are not reported.
+TABLE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)(?: AS \w+)?$')
+TABLE_ALIAS = re.compile(r'(\w+) AS (\w+)', re.IGNORECASE)
+# Qualified columns compared in where and join clauses, on either side of the comparison
+COMPARED_COLUMN = re.compile(
+    r'(\w+)\.(\w+)\s*(?:=|<|>|!=|\bIN\b|\bLIKE\b|\bIS\b|\bBETWEEN\b)|(?:=|<|>)\s*(\w+)\.(\w+)',
+    re.IGNORECASE,
+)
+# Statements shown in the log are cut to this length, the report file has them in full
+STATEMENT_WIDTH = 160
+
+_lock = threading.Lock()
+_listening = False
+
 
 class Explain(Executable, ClauseElement):
     def __init__(self, stmt):
@@ -37,6 +66,261 @@ class ExplainQuery(Query):
         return result
 
 
+class AuditedStatement(object):
+    """A distinct SQL statement run by the audited tasks."""
+
+    def __init__(self, statement, parameters):
+        self.statement = statement
+        # Parameters of the first run, to explain the query plan with
+        self.parameters = parameters
+        self.calls = 0
+        self.took = 0
+        self.tasks = set()
+        self.plugins = set()
+        self.plan = None
+        self.problems = []
+        self.recommendations = []
+
+    def to_dict(self):
+        return {
+            'statement': self.statement,
+            'calls': self.calls,
+            'took': self.took,
+            'tasks': sorted(self.tasks),
+            'plugins': sorted(self.plugins),
+            'plan': self.plan,
+            'problems': self.problems,
+            'recommendations': self.recommendations,
+        }
+
+
+class SQLAudit(object):
+    """
+    Captures the SQL statements run by the tasks of an execution, and flags the ones whose SQLite query plan scans a
+    whole table or builds a temporary b-tree.
+    """
+
+    def __init__(self, filename=None):
+        self.filename = filename
+        # AuditedStatement by statement text, in order of first run
+        self.statements = OrderedDict()
+        # Leading columns of the indexes of each table
+        self.indexed = {}
+        self.lock = threading.Lock()
+
+    def record(self, statement, parameters, took, task, plugin):
+        with self.lock:
+            audited = self.statements.get(statement)
+            if audited is None:
+                audited = self.statements[statement] = AuditedStatement(statement, parameters)
+            audited.calls += 1
+            audited.took += took
+            audited.tasks.add(task)
+            if plugin:
+                audited.plugins.add(plugin)
+
+    def explain(self, engine):
+        """Explains the query plans of the statements which have not been explained yet."""
+        with self.lock:
+            pending = [s for s in self.statements.values() if s.plan is None]
+        for audited in pending:
+            audited.plan = []
+            if audited.statement.lstrip().split(None, 1)[0].upper() not in EXPLAINABLE:
+                continue
+            audited.plan = query_plan(engine, audited.statement, audited.parameters)
+            for detail in audited.plan:
+                scan = TABLE_SCAN.match(detail)
+                if scan:
+                    audited.problems.append(detail)
+                    index = self.recommend(engine, audited.statement, scan.group(1))
+                    if index:
+                        audited.recommendations.append(index)
+                elif 'USE TEMP B-TREE' in detail:
+                    audited.problems.append(detail)
+
+    def recommend(self, engine, statement, table):
+        """Returns an index for the columns of `table` which `statement` filters on, if they have none."""
+        # Newer SQLite versions name scanned tables by their alias
+        aliases = dict((alias, name) for name, alias in TABLE_ALIAS.findall(statement))
+        table = aliases.get(table, table)
+        if table not in self.indexed:
+            try:
+                inspector = inspect(engine)
+                primary_key = inspector.get_pk_constraint(table).get('constrained_columns', [])
+                indexed = set(primary_key[:1])
+                indexed.update(index['column_names'][0] for index in inspector.get_indexes(table))
+            except Exception as e:
+                log.debug('Could not get the indexes of %s: %s', table, e)
+                indexed = set()
+            self.indexed[table] = indexed
+        aliases = set([table]) | set(alias for alias, name in aliases.items() if name == table)
+        columns = []
+        for match in COMPARED_COLUMN.finditer(statement):
+            alias, column = match.group(1, 2) if match.group(1) else match.group(3, 4)
+            if alias in aliases and column not in columns:
+                columns.append(column)
+        if not columns or set(columns) & self.indexed[table]:
+            return None
+        return 'CREATE INDEX ix_%s_%s ON %s (%s)' % (
+            table,
+            '_'.join(columns),
+            table,
+            ', '.join(columns),
+        )
+
+    def flagged(self, task=None):
+        """Returns the statements with problems, of `task` if given, which took the longest first."""
+        with self.lock:
+            statements = [
+                s
+                for s in self.statements.values()
+                if s.problems and (task is None or task in s.tasks)
+            ]
+        return sorted(statements, key=lambda s: s.took, reverse=True)
+
+    def save(self):
+        with self.lock:
+            report = [s.to_dict() for s in self.statements.values()]
+        try:
+            with io.open(self.filename, 'w', encoding='utf-8') as f:
+                f.write(str(json.dumps(report, indent=2)))
+        except (IOError, OSError) as e:
+            log.error('Could not write SQL audit to %s: %s', self.filename, e)
+
+
+def query_plan(engine, statement, parameters):
+    """Returns the detail column of the SQLite query plan of `statement`."""
+    # Runs on the DBAPI connection, so that the audit doesn't capture it
+    connection = engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters or ())
+        return [str(row[-1]) for row in cursor.fetchall()]
+    except Exception as e:
+        log.debug('Could not explain `%s`: %s', statement, e)
+        return []
+    finally:
+        connection.close()
+
+
+def format_audit(audit, task):
+    """
+    Formats the statements with problems run by `task`.
+
+    :return: List of lines
+    """
+    statements = [s for s in audit.statements.values() if task in s.tasks]
+    flagged = audit.flagged(task)
+    lines = [
+        'SQL audit of task %s: %s distinct statements, %s queries taking %0.2fs, %s flagged'
+        % (
+            task,
+            len(statements),
+            sum(s.calls for s in statements),
+            sum(s.took for s in statements),
+            len(flagged),
+        )
+    ]
+    for audited in flagged:
+        statement = ' '.join(audited.statement.split())
+        if len(statement) > STATEMENT_WIDTH:
+            statement = statement[: STATEMENT_WIDTH - 3] + '...'
+        lines.append(
+            '%6d calls %8.3fs  %s  [%s]'
+            % (
+                audited.calls,
+                audited.took,
+                ', '.join(audited.problems),
+                ', '.join(sorted(audited.plugins)) or '-',
+            )
+        )
+        lines.append('    %s' % statement)
+        for index in audited.recommendations:
+            lines.append('    Recommended: %s' % index)
+    return lines
+
+
+def current_audit():
+    # Stored in the logging context, which helper threads doing requests for a task inherit
+    return getattr(logger.local_context, 'sql_audit', None)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_audit():
+        conn.info['audit_query_start'] = wall_clock()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('audit_query_start', None)
+    audit = current_audit()
+    if audit and started is not None:
+        if executemany:
+            parameters = parameters[0] if parameters else None
+        audit.record(
+            statement,
+            parameters,
+            wall_clock() - started,
+            getattr(logger.local_context, 'task', ''),
+            getattr(logger.local_context, 'plugin', ''),
+        )
+
+
+def listen_queries():
+    global _listening
+    with _lock:
+        if not _listening:
+            sqlalchemy_event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+            sqlalchemy_event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+            _listening = True
+
+
+@event('task.execute.started')
+def start_audit(task):
+    audit_sql = getattr(task.options, 'audit_sql', None)
+    if audit_sql is None:
+        logger.local_context.sql_audit = None
+        return
+    if task.manager.engine.dialect.name != 'sqlite':
+        log.warning(
+            'SQL audit needs SQLite query plans, the database is %s',
+            task.manager.engine.dialect.name,
+        )
+        return
+    # All tasks of an execution share the audit and the report file
+    audit = getattr(task.options, 'sql_audit', None)
+    if audit is None:
+        filename = os.path.abspath(os.path.expanduser(audit_sql)) if audit_sql else None
+        audit = task.options.sql_audit = SQLAudit(filename)
+    listen_queries()
+    logger.local_context.sql_audit = audit
+
+
+@event('task.execute.completed')
+def finish_audit(task):
+    audit = current_audit()
+    if not audit:
+        return
+    logger.local_context.sql_audit = None
+    audit.explain(task.manager.engine)
+    for line in format_audit(audit, task.name):
+        log.info(line)
+    if audit.filename:
+        audit.save()
+
+
+class AuditSQL(object):
+    """Finishes the audit of aborted task runs, task.execute.completed is only fired when the task wasn't aborted."""
+
+    @plugin.priority(plugin.PRIORITY_LAST)
+    def on_task_abort(self, task, config):
+        finish_audit(task)
+
+
+@event('plugin.register')
+def register_plugin():
+    plugin.register(AuditSQL, 'audit_sql', builtin=True, api_ver=2)
+
+
 @event('manager.execute.started')
 def register_sql_explain(man, options):
     if options.explain_sql:
@@ -51,6 +335,17 @@ def deregister_sql_explain(man, options):
 
 @event('options.register')
 def register_parser_arguments():
-    options.get_parser('execute').add_argument(
+    parser = options.get_parser('execute')
+    parser.add_argument(
         '--explain-sql', action='store_true', dest='explain_sql', default=False, help=SUPPRESS
     )
+    parser.add_argument(
+        '--audit-sql',
+        nargs='?',
+        const='',
+        metavar='FILE',
+        dest='audit_sql',
+        help='capture the SQL statements run by the tasks and report the ones which scan whole '
+        'tables or sort with temporary b-trees, with recommended indexes. Writes all statements '
+        'and their query plans to FILE if given. SQLite only.',
+    )
@@ -0,0 +1,378 @@
+"""
+Memory profiling of task runs with tracemalloc, enabled with ``--mem-profile``.
+
+For each task run this reports the memory retained by each plugin, the top allocation sites of each phase, and what
+survived since the previous run of the task ended: allocation sites, object types and the caches which live as long as the
+process. The latest report of each task is available from the ``/server/memory/`` API.
+
+Allocations are traced for the whole process, so concurrent task runs show up in each other's phases.
+"""
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import collections
+import gc
+import logging
+import os
+import threading
+from datetime import datetime
+
+from argparse import SUPPRESS
+from flask import jsonify
+
+import flexget
+from flexget import options, plugin
+from flexget.api import api, APIResource
+from flexget.api.core.server import server_api
+from flexget.event import event
+from flexget.utils import qualities, requests
+from flexget.utils.cached_input import cached
+from flexget.utils.parsers import series as series_parser
+from flexget.utils.simple_persistence import SimplePersistence
+
+try:
+    import tracemalloc
+except ImportError:
+    # this will leave the plugin unloaded
+    raise plugin.DependencyError(
+        issued_by='mem_profile', missing='tracemalloc (python 3.4+)', silent=True
+    )
+
+log = logging.getLogger('mem_profile')
+
+# Amount of allocation sites and object types listed
+TOP = 10
+# Plugins retaining less memory are left out of the table, they are still in the API report
+MIN_RETAINED = 64 * 1024
+
+# Number of entries in the caches which live as long as the process, by name
+CACHES = collections.OrderedDict(
+    [
+        (
+            'SimplePersistence.class_store',
+            lambda: sum(
+                len(values)
+                for plugins in list(SimplePersistence.class_store.values())
+                for values in list(plugins.values())
+            ),
+        ),
+        ('cached.cache', lambda: len(cached.cache)),
+        (
+            'TokenBucketLimiter.state_store',
+            lambda: len(getattr(requests.TokenBucketLimiter.state_store, 'states', ())),
+        ),
+        ('requests.circuit_breakers', lambda: len(requests.circuit_breakers)),
+        ('qualities parse cache', lambda: len(qualities._parse_cache)),
+        ('series parser templates', lambda: len(series_parser._templates)),
+    ]
+)
+
+_lock = threading.Lock()
+_local = threading.local()
+# Profiles of running tasks by task id
+_profiles = {}
+# Latest report of each task by name
+_reports = {}
+# Snapshot, object type counts and cache sizes when the previous run of each task ended, by task name
+_previous = {}
+_started_tracing = False
+
+_package_dir = os.path.dirname(os.path.dirname(os.path.abspath(flexget.__file__)))
+
+
+def take_snapshot():
+    return tracemalloc.take_snapshot().filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+            tracemalloc.Filter(False, '<unknown>'),
+        ]
+    )
+
+
+def site_name(traceback):
+    frame = traceback[0]
+    filename = frame.filename
+    if filename.startswith(_package_dir):
+        filename = os.path.relpath(filename, _package_dir)
+    return '%s:%s' % (filename, frame.lineno)
+
+
+def top_sites(snapshot, previous):
+    """Returns the allocation sites whose memory changed the most between two snapshots."""
+    sites = []
+    for stat in snapshot.compare_to(previous, 'lineno'):
+        if len(sites) >= TOP:
+            break
+        if stat.size_diff:
+            sites.append(
+                {
+                    'site': site_name(stat.traceback),
+                    'size': stat.size,
+                    'size_diff': stat.size_diff,
+                    'count_diff': stat.count_diff,
+                }
+            )
+    return sites
+
+
+def type_counts():
+    return collections.Counter(type(obj) for obj in gc.get_objects())
+
+
+def cache_sizes():
+    sizes = {}
+    for name, size in CACHES.items():
+        try:
+            sizes[name] = size()
+        except Exception as e:
+            log.debug('Could not get the size of %s: %s', name, e)
+    return sizes
+
+
+class TaskProfile(object):
+    """Memory profile of a task run."""
+
+    def __init__(self, task):
+        self.task = task.name
+        self.started = datetime.now()
+        self.memory_started = tracemalloc.get_traced_memory()[0]
+        self.phase = None
+        self.snapshot = take_snapshot()
+        self.phase_memory = self.memory_started
+        self.phases = []
+        # Calls and retained memory by (phase, plugin), in order of execution
+        self.plugins = collections.OrderedDict()
+
+    def phase_boundary(self, phase, snapshot=None):
+        """Closes the current phase and starts `phase`."""
+        snapshot = snapshot or take_snapshot()
+        memory = tracemalloc.get_traced_memory()[0]
+        if self.phase is not None:
+            self.phases.append(
+                {
+                    'phase': self.phase,
+                    'size_diff': memory - self.phase_memory,
+                    'top': top_sites(snapshot, self.snapshot),
+                }
+            )
+        self.phase = phase
+        self.snapshot = snapshot
+        self.phase_memory = memory
+
+    def add(self, phase, keyword, retained):
+        record = self.plugins.setdefault((phase, keyword), {'calls': 0, 'retained': 0})
+        record['calls'] += 1
+        record['retained'] += retained
+
+    def finish(self):
+        """Closes the last phase and compares the memory with the end of the previous run of the task."""
+        gc.collect()
+        snapshot = take_snapshot()
+        self.phase_boundary(None, snapshot)
+        current, peak = tracemalloc.get_traced_memory()
+        types = type_counts()
+        caches = cache_sizes()
+        report = {
+            'task': self.task,
+            'started': self.started.isoformat(),
+            'memory_started': self.memory_started,
+            'memory_ended': current,
+            'memory_peak': peak,
+            'plugins': [
+                dict(phase=phase, plugin=keyword, **record)
+                for (phase, keyword), record in self.plugins.items()
+            ],
+            'phases': self.phases,
+            'survivors': None,
+        }
+        with _lock:
+            if self.task in _previous:
+                old_snapshot, old_types, old_caches = _previous[self.task]
+                type_changes = types.copy()
+                type_changes.subtract(old_types)
+                report['survivors'] = {
+                    'top': top_sites(snapshot, old_snapshot),
+                    'types': [
+                        {
+                            'type': '%s.%s' % (cls.__module__, cls.__name__),
+                            'count': types[cls],
+                            'count_diff': change,
+                        }
+                        for cls, change in type_changes.most_common(TOP)
+                        if change > 0
+                    ],
+                    'caches': [
+                        {
+                            'name': name,
+                            'entries': caches[name],
+                            'entries_diff': caches[name] - old_caches.get(name, 0),
+                        }
+                        for name in caches
+                    ],
+                }
+            _previous[self.task] = (snapshot, types, caches)
+            _reports[self.task] = report
+        return report
+
+
+def format_report(report):
+    """
+    Formats the memory profile of a task run.
+
+    :param dict report: Report from :meth:`TaskProfile.finish`
+    :return: List of lines
+    """
+    lines = [
+        'Memory profile of task %s: traced %d KB -> %d KB, peak %d KB'
+        % (
+            report['task'],
+            report['memory_started'] // 1024,
+            report['memory_ended'] // 1024,
+            report['memory_peak'] // 1024,
+        ),
+        '%-10s %-20s %6s %12s' % ('phase', 'plugin', 'calls', 'retained KB'),
+    ]
+    for p in report['plugins']:
+        if abs(p['retained']) < MIN_RETAINED:
+            continue
+        lines.append(
+            '%-10s %-20s %6d %+12d' % (p['phase'], p['plugin'], p['calls'], p['retained'] // 1024)
+        )
+    for phase in report['phases']:
+        if abs(phase['size_diff']) < MIN_RETAINED:
+            continue
+        lines.append(
+            'Top allocation sites of phase %s (%+d KB):'
+            % (phase['phase'], phase['size_diff'] // 1024)
+        )
+        lines.extend(format_sites(phase['top']))
+    survivors = report['survivors']
+    if survivors:
+        lines.append('Top allocation sites since the previous run of the task ended:')
+        lines.extend(format_sites(survivors['top']))
+        if survivors['types']:
+            lines.append('Object types growing since the previous run of the task ended:')
+            for t in survivors['types']:
+                lines.append(
+                    '  %+8d objects  %8d total  %s' % (t['count_diff'], t['count'], t['type'])
+                )
+        lines.append('Caches living as long as the process:')
+        for c in survivors['caches']:
+            lines.append(
+                '  %+8d entries  %8d total  %s' % (c['entries_diff'], c['entries'], c['name'])
+            )
+    return lines
+
+
+def format_sites(sites):
+    return [
+        '  %+8d KB  %+8d objects  %s' % (s['size_diff'] // 1024, s['count_diff'], s['site'])
+        for s in sites
+    ]
+
+
+def enabled(manager):
+    return getattr(manager.options, 'mem_profile', False)
+
+
+def start_tracing():
+    global _started_tracing
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracing = True
+
+
+@event('manager.startup')
+def on_manager_startup(manager):
+    if enabled(manager):
+        start_tracing()
+
+
+@event('manager.shutdown')
+def on_manager_shutdown(manager):
+    global _started_tracing
+    if _started_tracing:
+        tracemalloc.stop()
+        _started_tracing = False
+        _previous.clear()
+
+
+@event('task.execute.started')
+def start_profile(task):
+    if not enabled(task.manager):
+        return
+    start_tracing()
+    with _lock:
+        _profiles[task.id] = TaskProfile(task)
+
+
+@event('task.execute.before_plugin')
+def before_plugin(task, keyword):
+    profile = _profiles.get(task.id)
+    if not profile:
+        return
+    if task.current_phase != profile.phase:
+        profile.phase_boundary(task.current_phase)
+    if not hasattr(_local, 'started'):
+        _local.started = []
+    _local.started.append(tracemalloc.get_traced_memory()[0])
+
+
+@event('task.execute.after_plugin')
+def after_plugin(task, keyword):
+    profile = _profiles.get(task.id)
+    started = getattr(_local, 'started', None)
+    if not profile or not started:
+        return
+    profile.add(task.current_phase, keyword, tracemalloc.get_traced_memory()[0] - started.pop())
+
+
+@event('task.execute.completed')
+def finish_profile(task):
+    with _lock:
+        profile = _profiles.pop(task.id, None)
+    if not profile:
+        return
+    for line in format_report(profile.finish()):
+        log.info(line)
+
+
+class MemProfile(object):
+    """Finishes the profile of aborted task runs, task.execute.completed is only fired when the task wasn't aborted."""
+
+    @plugin.priority(plugin.PRIORITY_LAST)
+    def on_task_abort(self, task, config):
+        finish_profile(task)
+
+
+@event('plugin.register')
+def register_plugin():
+    plugin.register(MemProfile, 'mem_profile', builtin=True, api_ver=2)
+
+
+@server_api.route('/memory/')
+class ServerMemoryAPI(APIResource):
+    @api.response(200, description='Latest memory profile of each task, see --mem-profile')
+    def get(self, session=None):
+        """ Memory profiles of task runs """
+        with _lock:
+            reports = sorted(_reports.values(), key=lambda report: report['task'])
+        return jsonify({'tracing': tracemalloc.is_tracing(), 'tasks': reports})
+
+
+@event('options.register')
+def register_parser_arguments():
+    parser = options.get_parser()
+    parser.add_argument(
+        '--mem-profile',
+        action='store_true',
+        dest='mem_profile',
+        default=False,
+        help='trace memory allocations, report the memory retained by each plugin, the top '
+        'allocation sites of each phase and what survives task runs',
+    )
+    # Replaced by --mem-profile
+    parser.add_argument('--mem-usage', action='store_true', dest='mem_profile', help=SUPPRESS)
@@ -1,22 +1,43 @@
 from __future__ import unicode_literals, division, absolute_import
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
+import io
 import logging
+import platform
+import random
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime
 
-from flexget import options
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from flexget import __version__, options
+from flexget.db_schema import Base
 from flexget.event import event
 from flexget.terminal import console
 from flexget.manager import Session
+from flexget.utils import json
 
 log = logging.getLogger('perftests')
 
-TESTS = ['imdb_query']
+TESTS = ['imdb_query', 'benchmark']
+
+# Benchmark functions by name, in the order they were defined
+BENCHMARKS = OrderedDict()
+# Name of the task the benchmarks run
+TASK_NAME = 'perf_benchmark'
 
 
 def cli_perf_test(manager, options):
     if options.test_name not in TESTS:
         console('Unknown performance test %s' % options.test_name)
         return
+    if options.test_name == 'benchmark':
+        cli_benchmark(manager, options)
+        return
     session = Session()
     try:
         if options.test_name == 'imdb_query':
@@ -77,7 +98,506 @@ def imdb_query(session):
     log.debug('Took %.2f seconds to query %i movies' % (took, len(imdb_urls)))
 
 
+# Benchmarks
+#
+# Each benchmark generates its own fixtures from a fixed random seed, so that runs are comparable between versions
+# and machines. They run in a scratch database, the real one is left alone.
+
+SYLLABLES = ['an', 'bur', 'dor', 'ka', 'lo', 'mi', 'quo', 'ra', 'shi', 'tes', 'ton', 'vel']
+RESOLUTIONS = ['', '480p', '720p', '1080p', '2160p']
+SOURCES = ['', 'HDTV', 'WEB-DL', 'WEBRip', 'BluRay', 'DVDRip']
+CODECS = ['', 'x264', 'x265', 'H.264', 'XviD', 'HEVC']
+AUDIOS = ['', 'AAC', 'DD5.1', 'DTS', 'FLAC']
+GROUPS = ['GRP', 'LOL', 'DIMENSION', 'NTb', 'KILLERS']
+
+try:
+    timer = time.perf_counter
+except AttributeError:
+    timer = time.time
+
+
+def benchmark(name):
+    """
+    Registers a benchmark.
+
+    The decorated function is called with the manager and the scale for each round. It prepares the fixtures and
+    returns the amount of items it processes and a function doing the timed work.
+    """
+
+    def decorator(func):
+        BENCHMARKS[name] = func
+        return func
+
+    return decorator
+
+
+def size(count, scale):
+    return max(1, int(count * scale))
+
+
+def make_name(rng, words=2):
+    return ' '.join(
+        ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+        for _ in range(words)
+    )
+
+
+def make_shows(rng, count):
+    shows = set()
+    while len(shows) < count:
+        shows.add(make_name(rng))
+    return sorted(shows)
+
+
+def make_titles(rng, shows, per_show):
+    titles = []
+    for show in shows:
+        for _ in range(per_show):
+            quality = ' '.join(
+                part
+                for part in (rng.choice(q) for q in (RESOLUTIONS, SOURCES, CODECS, AUDIOS))
+                if part
+            )
+            titles.append(
+                '%s S%02dE%02d %s-%s'
+                % (
+                    show.replace(' ', rng.choice([' ', '.'])),
+                    rng.randint(1, 10),
+                    rng.randint(1, 24),
+                    quality,
+                    rng.choice(GROUPS),
+                )
+            )
+    rng.shuffle(titles)
+    return titles
+
+
+def make_entries(titles):
+    return [{'title': title, 'url': 'http://localhost/%d' % i} for i, title in enumerate(titles)]
+
+
+@contextmanager
+def scratch_database(manager):
+    """Binds database sessions to an empty in-memory database for the duration of a benchmark."""
+    engine = create_engine(
+        'sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(bind=engine)
+    Session.configure(bind=engine)
+    try:
+        yield engine
+    finally:
+        Session.configure(bind=manager.engine)
+        engine.dispose()
+
+
+def prepare_task(manager, config):
+    """Validates a task config up front, returns a function executing the task."""
+    from flexget.task import Task
+    from flexget.utils.simple_persistence import SimplePersistence
+
+    config = manager.validate_config({'tasks': {TASK_NAME: config}})['tasks'][TASK_NAME]
+
+    def execute():
+        task = Task(manager, TASK_NAME, config=config, options={})
+        task.execute()
+        SimplePersistence.class_store.pop(TASK_NAME, None)
+        return task
+
+    return execute
+
+
+@benchmark('series')
+def bench_series(manager, scale):
+    """Series parsing and filtering of many titles from many configured shows."""
+    rng = random.Random(1)
+    shows = make_shows(rng, size(50, scale))
+    titles = make_titles(rng, shows, 40)
+    config = {'mock': make_entries(titles), 'series': shows, 'disable': 'builtins'}
+    return len(titles), prepare_task(manager, config)
+
+
+@benchmark('entry')
+def bench_entry(manager, scale):
+    """Creating entries and setting their fields."""
+    from flexget.entry import Entry
+
+    rng = random.Random(10)
+    titles = make_titles(rng, make_shows(rng, size(100, scale)), 50)
+    fields = ['field_%d' % i for i in range(20)]
+
+    def create():
+        for i, title in enumerate(titles):
+            entry = Entry(title=title, url='http://localhost/%d' % i)
+            for field in fields:
+                entry[field] = title
+
+    return len(titles), create
+
+
+@benchmark('seen')
+def bench_seen(manager, scale):
+    """Seen filter against a large seen table, half of the entries were seen before."""
+    from flexget.components.seen.db import SeenEntry, SeenField
+
+    rng = random.Random(2)
+    count = size(20000, scale)
+    titles = ['%s %d' % (make_name(rng, 3), i) for i in range(count)]
+    now = datetime.now()
+    with Session() as session:
+        session.execute(
+            SeenEntry.__table__.insert(),
+            [
+                {'id': i + 1, 'title': title, 'feed': 'other', 'added': now, 'local': False}
+                for i, title in enumerate(titles)
+            ],
+        )
+        session.execute(
+            SeenField.__table__.insert(),
+            [
+                {'seen_entry_id': i + 1, 'field': field, 'value': value, 'added': now}
+                for i, title in enumerate(titles)
+                for field, value in (('title', title), ('url', 'http://localhost/seen/%d' % i))
+            ],
+        )
+    lookups = size(1000, scale)
+    entries = [
+        {'title': title, 'url': 'http://localhost/seen/%d' % i}
+        for i, title in enumerate(titles[:lookups])
+    ]
+    entries += make_entries('%s new' % title for title in titles[-lookups:])
+    config = {'mock': entries, 'seen': True, 'accept_all': True, 'disable': 'builtins'}
+    return len(entries), prepare_task(manager, config)
+
+
+@benchmark('qualities')
+def bench_qualities(manager, scale):
+    """Quality parsing of titles, without the parse cache."""
+    from flexget.utils import qualities
+
+    rng = random.Random(3)
+    titles = make_titles(rng, make_shows(rng, size(100, scale)), 50)
+
+    def parse():
+        qualities._parse_cache.clear()
+        for title in titles:
+            qualities.Quality(title)
+
+    return len(titles), parse
+
+
+@benchmark('duplicates')
+def bench_duplicates(manager, scale):
+    """Duplicates filter on a field, about a tenth of the entries have a duplicate."""
+    rng = random.Random(11)
+    count = size(10000, scale)
+    entries = make_entries('%s %d' % (make_name(rng), i) for i in range(count))
+    for entry in entries:
+        entry['value'] = rng.randint(0, count * 5)
+    config = {
+        'mock': entries,
+        'duplicates': {'field': 'value', 'action': 'reject'},
+        'disable': 'builtins',
+    }
+    return len(entries), prepare_task(manager, config)
+
+
+@benchmark('regexp')
+def bench_regexp(manager, scale):
+    """Regexp filter with many patterns."""
+    rng = random.Random(4)
+    shows = make_shows(rng, size(50, scale))
+    titles = make_titles(rng, shows, 40)
+    patterns = [show.replace(' ', '.') for show in rng.sample(shows, len(shows) // 2)]
+    patterns += [name.replace(' ', '.') for name in make_shows(rng, 200)]
+    config = {
+        'mock': make_entries(titles),
+        'regexp': {'accept': patterns, 'rest': 'reject'},
+        'disable': 'builtins',
+    }
+    return len(titles), prepare_task(manager, config)
+
+
+@benchmark('template')
+def bench_template(manager, scale):
+    """Rendering a path template with filters for many entries."""
+    from flexget.entry import Entry
+    from flexget.utils.qualities import Quality
+    from flexget.utils.template import render_from_entry
+
+    rng = random.Random(5)
+    text = (
+        '{{ series_name|pathscrub }}/Season {{ series_season|pad(2) }}/'
+        '{{ title|re_replace("[. ]+", " ") }}{% if quality %} [{{ quality }}]{% endif %}'
+    )
+    entries = []
+    for i, title in enumerate(make_titles(rng, make_shows(rng, size(100, scale)), 50)):
+        entries.append(
+            Entry(
+                title=title,
+                url='http://localhost/%d' % i,
+                series_name=title.split(' S', 1)[0],
+                series_season=rng.randint(1, 10),
+                quality=Quality(title),
+            )
+        )
+
+    def render():
+        for entry in entries:
+            render_from_entry(text, entry)
+
+    return len(entries), render
+
+
+@benchmark('input_cache')
+def bench_input_cache(manager, scale):
+    """Restoring input cache entries from the database."""
+    from flexget.entry import Entry
+    from flexget.utils.cached_input import cached
+
+    rng = random.Random(6)
+    cache = cached(TASK_NAME, persist='1 day')
+    cache.config_hash = 'benchmark'
+    cache.cache_name = '%s_%s' % (TASK_NAME, cache.config_hash)
+    entries = [
+        Entry(title=title, url='http://localhost/%d' % i, description=make_name(rng, 20))
+        for i, title in enumerate(make_titles(rng, make_shows(rng, size(50, scale)), 40))
+    ]
+    cache.store_to_db(entries)
+
+    def restore():
+        cache.load_from_db()
+        cached.cache.pop(cache.cache_name, None)
+
+    return len(entries), restore
+
+
+@benchmark('entry_list')
+def bench_entry_list(manager, scale):
+    """Membership checks against a large entry list, half of the entries are on it."""
+    from flexget.components.managed_lists.lists.entry_list.db import DBEntrySet, EntryListEntry
+    from flexget.entry import Entry
+
+    rng = random.Random(7)
+    titles = make_titles(rng, make_shows(rng, size(100, scale)), 50)
+    entry_set = DBEntrySet(TASK_NAME)
+    with Session() as session:
+        list_id = entry_set._db_list(session).id
+        session.add_all(
+            EntryListEntry(Entry(title=title, url='http://localhost/%d' % i), list_id)
+            for i, title in enumerate(titles)
+        )
+    lookups = size(500, scale)
+    entries = [
+        Entry(title=title, url='http://localhost/%d' % i)
+        for i, title in enumerate(titles[:lookups])
+    ]
+    entries += [
+        Entry(title='%s new' % title, url='http://localhost/new/%d' % i)
+        for i, title in enumerate(titles[-lookups:])
+    ]
+
+    def check():
+        for entry in entries:
+            entry in entry_set
+
+    return len(entries), check
+
+
+@benchmark('bdecode')
+def bench_bdecode(manager, scale):
+    """Decoding a torrent with many files."""
+    from flexget.utils.bittorrent import bdecode, bencode
+
+    rng = random.Random(8)
+    count = size(5000, scale)
+    files = [
+        {
+            'length': rng.randint(1, 2 ** 31),
+            'path': [make_name(rng, 1), '%s.mkv' % make_name(rng, 3)],
+        }
+        for _ in range(count)
+    ]
+    pieces = bytes(bytearray(rng.getrandbits(8) for _ in range(20 * count)))
+    data = bencode(
+        {
+            'announce': 'http://localhost/announce',
+            'info': {
+                'name': 'benchmark',
+                'piece length': 2 ** 20,
+                'pieces': pieces,
+                'files': files,
+            },
+        }
+    )
+    return count, lambda: bdecode(data)
+
+
+@benchmark('config')
+def bench_config(manager, scale):
+    """Validation of a config with many tasks."""
+    rng = random.Random(9)
+    tasks = {}
+    for i in range(size(1000, scale)):
+        tasks['task %d' % i] = {
+            'rss': 'http://localhost/%d.rss' % i,
+            'series': make_shows(rng, 20),
+            'quality': '720p+',
+            'regexp': {'reject': ['sample', 'dubbed']},
+            'set': {'path': '/downloads/%d' % i},
+        }
+    return len(tasks), lambda: manager.validate_config({'tasks': tasks})
+
+
+def run_benchmarks(manager, names, rounds=3, scale=1):
+    """
+    Runs benchmarks, each round in a new scratch database.
+
+    :param list names: Names of the benchmarks to run
+    :param int rounds: Times to run each benchmark, the fastest run counts
+    :param float scale: Factor for the size of the generated fixtures
+    :return: Dict of results by benchmark name
+    """
+    results = OrderedDict()
+    for name in names:
+        times = []
+        items = 0
+        for _ in range(rounds):
+            # Logging of the tasks would take most of the time
+            logging.disable(logging.INFO)
+            try:
+                with scratch_database(manager):
+                    items, func = BENCHMARKS[name](manager, scale)
+                    started = timer()
+                    func()
+                    times.append(timer() - started)
+            finally:
+                logging.disable(logging.NOTSET)
+        times.sort()
+        results[name] = {
+            'items': items,
+            'min': times[0],
+            'median': times[len(times) // 2],
+            'per_second': items / times[0] if times[0] else None,
+        }
+    return results
+
+
+def compare(results, baseline, threshold=10):
+    """
+    Compares benchmark results against a baseline.
+
+    :param dict results: Results of :func:`run_benchmarks`
+    :param dict baseline: Results saved from an earlier run
+    :param float threshold: Slowdown in percent which counts as a regression
+    :return: List of tuples of benchmark name, baseline time, time, change in percent and whether it regressed. The
+        change is None if the benchmark processed a different amount of items in the baseline.
+    """
+    rows = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before['items'] != result['items']:
+            rows.append((name, before['min'], result['min'], None, False))
+            continue
+        change = (result['min'] - before['min']) / before['min'] * 100 if before['min'] else 0
+        rows.append((name, before['min'], result['min'], change, change > threshold))
+    return rows
+
+
+def cli_benchmark(manager, options):
+    if manager.is_daemon:
+        console('Benchmarks swap the database for a scratch one, they cannot run in the daemon.')
+        return
+    names = options.benchmarks or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        console(
+            'Unknown benchmark %s, choose from %s' % (', '.join(unknown), ', '.join(BENCHMARKS))
+        )
+        return
+    baseline = None
+    if options.baseline:
+        try:
+            with io.open(options.baseline, encoding='utf-8') as f:
+                baseline = json.load(f)['benchmarks']
+        except (IOError, OSError, ValueError, KeyError) as e:
+            console('Could not read baseline %s: %s' % (options.baseline, e))
+            return
+
+    console('Running %s benchmarks %s times each ...' % (len(names), options.rounds))
+    results = run_benchmarks(manager, names, options.rounds, options.scale)
+    console('%-12s %8s %10s %10s %12s' % ('benchmark', 'items', 'min', 'median', 'items/s'))
+    for name, result in results.items():
+        console(
+            '%-12s %8d %9.3fs %9.3fs %12.0f'
+            % (name, result['items'], result['min'], result['median'], result['per_second'] or 0)
+        )
+
+    if options.output:
+        report = {
+            'flexget': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'created': datetime.now().isoformat(),
+            'rounds': options.rounds,
+            'scale': options.scale,
+            'benchmarks': results,
+        }
+        with io.open(options.output, 'w', encoding='utf-8') as f:
+            f.write(str(json.dumps(report, indent=2)))
+        console('Results written to %s' % options.output)
+
+    if baseline is None:
+        return
+    rows = compare(results, baseline, options.threshold)
+    console('%-12s %10s %10s %8s' % ('benchmark', 'baseline', 'now', 'change'))
+    for name, before, after, change, regressed in rows:
+        if change is None:
+            console('%-12s %10s %10s %8s' % (name, '-', '-', 'n/a (different fixture size)'))
+            continue
+        console(
+            '%-12s %9.3fs %9.3fs %+7.1f%%%s'
+            % (name, before, after, change, '  REGRESSION' if regressed else '')
+        )
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        console(
+            '%s slower than the baseline by more than %s%%: %s'
+            % (len(regressions), options.threshold, ', '.join(regressions))
+        )
+        sys.exit(1)
+
+
 @event('options.register')
 def register_parser_arguments():
     perf_parser = options.register_command('perf-test', cli_perf_test)
     perf_parser.add_argument('test_name', metavar='<test name>', choices=TESTS)
+    perf_parser.add_argument(
+        'benchmarks',
+        nargs='*',
+        metavar='<benchmark>',
+        help='benchmarks to run with the benchmark test, all by default: %s'
+        % ', '.join(BENCHMARKS),
+    )
+    perf_parser.add_argument(
+        '--rounds', type=int, default=3, help='times to run each benchmark, the fastest counts'
+    )
+    perf_parser.add_argument(
+        '--scale', type=float, default=1, help='factor for the size of the generated fixtures'
+    )
+    perf_parser.add_argument('--output', metavar='FILE', help='write the results to FILE as json')
+    perf_parser.add_argument(
+        '--baseline',
+        metavar='FILE',
+        help='compare the results with ones written by --output earlier, exits with an error on '
+        'regressions',
+    )
+    perf_parser.add_argument(
+        '--threshold',
+        type=float,
+        default=10,
+        metavar='PERCENT',
+        help='slowdown compared to the baseline which counts as a regression (default 10)',
+    )
@@ -1,95 +1,326 @@
 from __future__ import unicode_literals, division, absolute_import
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import io
 import logging
+import os
+import sys
+import threading
 import time
+from datetime import datetime
 
 from argparse import SUPPRESS
 
-from flexget import options
-from flexget.event import event, add_event_handler, remove_event_handler
+from sqlalchemy import event as sqlalchemy_event
+from sqlalchemy.engine import Engine
+
+from flexget import logger, options
+from flexget.event import event
+from flexget.utils import json
+from flexget.utils.parsers import series as series_parser
 
-from sqlalchemy.engine import Connection
+try:
+    import resource
+except ImportError:
+    resource = None
 
 log = logging.getLogger('performance')
 
-performance = {}
+# Profiles of previous runs are kept in this file in the config directory
+HISTORY_FILE = 'plugin_profile.json'
+# Amount of task runs kept in the history
+HISTORY_SIZE = 50
+# Plugins below these limits are left out of the table, they are still in the history
+MIN_TOOK = 0.1
+MIN_QUERIES = 10
+
+METRICS = [
+    'calls',
+    'took',
+    'cpu',
+    'queries',
+    'query_time',
+    'requests',
+    'request_bytes',
+    'request_time',
+    'entries_in',
+    'entries_out',
+    'memory',
+]
+
+try:
+    wall_clock = time.perf_counter
+except AttributeError:
+    wall_clock = time.time
 
-_start = {}
+try:
+    # CPU time of the running thread only, so that concurrent tasks don't count each other
+    cpu_clock = time.thread_time
+except AttributeError:
+    try:
+        cpu_clock = time.process_time
+    except AttributeError:
+        cpu_clock = time.clock
 
+# Task profiles by task id
+_profiles = {}
+_lock = threading.Lock()
+_listening = False
+# Queries ran since they were first counted
 query_count = 0
-orig_execute = None
 
 
 def log_query_count(name_point):
     """Debugging purposes, allows logging number of executed queries at :name_point:"""
+    listen_queries()
     log.info('At point named `%s` total of %s queries were ran' % (name_point, query_count))
 
 
+def peak_memory():
+    """Returns the peak memory usage of the process in bytes, or None if it is not known."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class Frame(object):
+    """Metrics of a single plugin call."""
+
+    def __init__(self, task):
+        self.metrics = dict.fromkeys(METRICS, 0)
+        self.metrics['calls'] = 1
+        self.metrics['entries_in'] = len(task.entries)
+        self.started = wall_clock()
+        self.cpu_started = cpu_clock()
+        self.memory_started = peak_memory()
+
+    def finish(self, task):
+        self.metrics['took'] = wall_clock() - self.started
+        self.metrics['cpu'] = cpu_clock() - self.cpu_started
+        self.metrics['entries_out'] = len(task.entries)
+        memory = peak_memory()
+        if memory is not None:
+            self.metrics['memory'] = memory - self.memory_started
+
+
+class TaskProfile(object):
+    """Metrics of a task run, per phase and plugin."""
+
+    def __init__(self, task):
+        self.task = task.name
+        self.started = datetime.now()
+        # Metrics by (phase, plugin), in order of execution
+        self.plugins = {}
+        self.order = []
+        self.lock = threading.Lock()
+        self.templates = dict(series_parser.template_stats)
+
+    def add(self, phase, plugin, metrics):
+        with self.lock:
+            key = (phase, plugin)
+            if key not in self.plugins:
+                self.plugins[key] = dict.fromkeys(METRICS, 0)
+                self.order.append(key)
+            for name, value in metrics.items():
+                self.plugins[key][name] += value
+
+    def to_dict(self):
+        templates = dict(
+            (name, series_parser.template_stats[name] - count)
+            for name, count in self.templates.items()
+        )
+        plugins = []
+        for phase, plugin in self.order:
+            record = {'phase': phase, 'plugin': plugin}
+            record.update(self.plugins[(phase, plugin)])
+            plugins.append(record)
+        return {
+            'task': self.task,
+            'started': self.started.isoformat(),
+            'plugins': plugins,
+            'series_parser_templates': templates,
+        }
+
+
+def current_frame():
+    # Stored in the logging context, which helper threads doing requests for a task inherit
+    frames = getattr(logger.local_context, 'profile_frames', None)
+    return frames[-1] if frames else None
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_frame():
+        conn.info['profile_query_start'] = wall_clock()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    global query_count
+    query_count += 1
+    frame = current_frame()
+    started = conn.info.pop('profile_query_start', None)
+    if frame and started is not None:
+        frame.metrics['queries'] += 1
+        frame.metrics['query_time'] += wall_clock() - started
+
+
+@event('requests.response')
+def count_request(response):
+    frame = current_frame()
+    if not frame:
+        return
+    frame.metrics['requests'] += 1
+    frame.metrics['request_time'] += response.elapsed.total_seconds()
+    try:
+        frame.metrics['request_bytes'] += int(response.headers.get('content-length') or 0)
+    except ValueError:
+        pass
+
+
+def listen_queries():
+    global _listening
+    with _lock:
+        if not _listening:
+            sqlalchemy_event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+            sqlalchemy_event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+            _listening = True
+
+
+@event('task.execute.started')
+def start_profile(task):
+    if not task.options.debug_perf:
+        return
+    listen_queries()
+    with _lock:
+        _profiles[task.id] = TaskProfile(task)
+
+
+@event('task.execute.before_plugin')
 def before_plugin(task, keyword):
-    fd = _start.setdefault(task.name, {})
-    fd.setdefault('time', {})[keyword] = time.time()
-    fd.setdefault('queries', {})[keyword] = query_count
+    if task.id not in _profiles:
+        return
+    frames = getattr(logger.local_context, 'profile_frames', None)
+    if frames is None:
+        frames = logger.local_context.profile_frames = []
+    frames.append(Frame(task))
 
 
+@event('task.execute.after_plugin')
 def after_plugin(task, keyword):
-    took = time.time() - _start[task.name]['time'][keyword]
-    queries = query_count - _start[task.name]['queries'][keyword]
-    # Store results, increases previous values
-    pd = performance.setdefault(task.name, {})
-    data = pd.setdefault(keyword, {})
-    data['took'] = data.get('took', 0) + took
-    data['queries'] = data.get('queries', 0) + queries
-
-
-@event('manager.execute.started')
-def startup(manager, options):
-    if not options.debug_perf:
+    profile = _profiles.get(task.id)
+    frames = getattr(logger.local_context, 'profile_frames', None)
+    if not profile or not frames:
         return
+    frame = frames.pop()
+    frame.finish(task)
+    profile.add(task.current_phase, keyword, frame.metrics)
 
-    log.info('Enabling plugin and SQLAlchemy performance debugging')
-    global query_count, orig_execute
-    query_count = 0
 
-    # Monkeypatch query counter for SQLAlchemy
-    if hasattr(Connection, 'execute'):
-        orig_execute = Connection.execute
+@event('task.execute.completed')
+def finish_profile(task):
+    with _lock:
+        profile = _profiles.pop(task.id, None)
+    if not profile:
+        return
+    record = profile.to_dict()
+    history_file = os.path.join(task.manager.config_base, HISTORY_FILE)
+    with _lock:
+        history = load_history(history_file)
+        previous = next((run for run in reversed(history) if run['task'] == task.name), None)
+        history.append(record)
+        save_history(history_file, history[-HISTORY_SIZE:])
+    for line in format_table(record, previous):
+        log.info(line)
 
-        def monkeypatched(*args, **kwargs):
-            global query_count
-            query_count += 1
-            return orig_execute(*args, **kwargs)
 
-        Connection.execute = monkeypatched
-    else:
-        log.critical('Unable to monkeypatch sqlalchemy')
+def load_history(filename):
+    try:
+        with io.open(filename, encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return []
 
-    add_event_handler('task.execute.before_plugin', before_plugin)
-    add_event_handler('task.execute.after_plugin', after_plugin)
 
+def save_history(filename, history):
+    try:
+        with io.open(filename, 'w', encoding='utf-8') as f:
+            f.write(str(json.dumps(history)))
+    except (IOError, OSError) as e:
+        log.warning('Could not save performance profile to %s: %s', filename, e)
 
-@event('manager.execute.completed')
-def cleanup(manager, options):
-    if not options.debug_perf:
-        return
 
-    # Print summary
-    for name, data in performance.items():
-        log.info('Performance results for task %s:' % name)
-        for keyword, results in data.items():
-            took = results['took']
-            queries = results['queries']
-            if took > 0.1 or queries > 10:
-                log.info('%-15s took %0.2f sec (%s queries)' % (keyword, took, queries))
+def format_table(record, previous=None):
+    """
+    Formats the profile of a task run as a table.
 
-    # Deregister our hooks
-    if hasattr(Connection, 'execute') and orig_execute:
-        Connection.execute = orig_execute
-    remove_event_handler('task.execute.before_plugin', before_plugin)
-    remove_event_handler('task.execute.after_plugin', after_plugin)
+    :param dict record: Profile from :meth:`TaskProfile.to_dict`
+    :param dict previous: Profile of the previous run of the task, to show the change in time taken
+    :return: List of lines
+    """
+    before = {}
+    if previous:
+        before = dict(((p['phase'], p['plugin']), p['took']) for p in previous['plugins'])
+    lines = [
+        'Performance results for task %s:' % record['task'],
+        '%-10s %-20s %8s %8s %8s %7s %9s %5s %9s %11s %9s'
+        % (
+            'phase',
+            'plugin',
+            'took',
+            'change',
+            'cpu',
+            'queries',
+            'query',
+            'http',
+            'http KB',
+            'entries',
+            'memory KB',
+        ),
+    ]
+    for p in record['plugins']:
+        if p['took'] <= MIN_TOOK and p['queries'] <= MIN_QUERIES and not p['requests']:
+            continue
+        old = before.get((p['phase'], p['plugin']))
+        change = '%+0.2fs' % (p['took'] - old) if old is not None else '-'
+        lines.append(
+            '%-10s %-20s %7.2fs %8s %7.2fs %7d %8.2fs %5d %9d %5d->%-5d %9d'
+            % (
+                p['phase'],
+                p['plugin'],
+                p['took'],
+                change,
+                p['cpu'],
+                p['queries'],
+                p['query_time'],
+                p['requests'],
+                p['request_bytes'] // 1024,
+                p['entries_in'] // p['calls'],
+                p['entries_out'] // p['calls'],
+                p['memory'] // 1024,
+            )
+        )
+    templates = record['series_parser_templates']
+    lookups = templates['hits'] + templates['misses']
+    if lookups:
+        lines.append(
+            'Series parser templates: %s of %s reused (%0.1f%%)'
+            % (templates['hits'], lookups, 100.0 * templates['hits'] / lookups)
+        )
+    return lines
 
 
 @event('options.register')
 def register_parser_arguments():
-    options.get_parser('execute').add_argument(
-        '--debug-perf', action='store_true', dest='debug_perf', default=False, help=SUPPRESS
+    parser = options.get_parser('execute')
+    parser.add_argument(
+        '--profile-plugins',
+        action='store_true',
+        dest='debug_perf',
+        default=False,
+        help='record time, cpu, database queries, http requests and memory used by each '
+        'plugin, print them at the end of each task and keep them in plugin_profile.json '
+        'in the config directory',
     )
+    # Old name of --profile-plugins
+    parser.add_argument('--debug-perf', action='store_true', dest='debug_perf', help=SUPPRESS)
@@ -47,25 +47,49 @@ class CrossMatch(object):
         all_fields = config['all_fields']
 
         match_entries = aggregate_inputs(task, config['from'])
+        indexes = [
+            FieldIndex(field, match_entries, config.get('exact'), config.get('case_sensitive'))
+            for field in fields
+        ]
 
         # perform action on intersecting entries
         for entry in task.entries:
-            for generated_entry in match_entries:
-                log.trace('checking if %s matches %s', entry['title'], generated_entry['title'])
-                common = self.entry_intersects(entry, generated_entry, fields, config.get('exact'), config.get('case_sensitive'))
+            common_fields = self.common_fields(entry, indexes)
+            positions = sorted(common_fields)
+            while positions:
+                position = positions.pop(0)
+                generated_entry = match_entries[position]
+                common = common_fields[position]
                 if common and (not all_fields or len(common) == len(fields)):
                     msg = 'intersects with %s on field(s) %s' % (
                         generated_entry['title'],
                         ', '.join(common),
                     )
-                    for key in generated_entry:
-                        if key not in entry:
-                            entry[key] = generated_entry[key]
+                    added = [key for key in generated_entry if key not in entry]
+                    for key in added:
+                        entry[key] = generated_entry[key]
+                    if any(field in added for field in fields):
+                        # The entry can now intersect with the following generated entries on the copied fields
+                        common_fields = self.common_fields(entry, indexes)
+                        positions = [p for p in sorted(common_fields) if p > position]
                     if action == 'reject':
                         entry.reject(msg)
                     if action == 'accept':
                         entry.accept(msg)
 
+    @staticmethod
+    def common_fields(entry, indexes):
+        """
+        :param entry: :class:`flexget.entry.Entry` to find intersecting entries for
+        :param indexes: List of :class:`FieldIndex` of the generated entries
+        :return: Dict of the positions of intersecting generated entries, with the list of their common fields
+        """
+        common_fields = {}
+        for index in indexes:
+            for position in index.matches(entry):
+                common_fields.setdefault(position, []).append(index.field)
+        return common_fields
+
     def entry_intersects(self, e1, e2, fields=None, exact=True, case_sensitive=True):
         """
         :param e1: First :class:`flexget.entry.Entry`
@@ -101,11 +125,129 @@ class CrossMatch(object):
                     log.trace('not matching')
             except TypeError as e:
                 # argument of type <type> is not iterable
-                log.trace('error matching fields: %s', str(e))
+                log.trace('error matching fields: %s', e)
 
         return common_fields
 
 
+class FieldIndex(object):
+    """
+    Indexes the values of a field of generated entries, to find the ones intersecting with an entry without comparing
+    it against all of them.
+
+    String values are kept in a hash table for exact matching. For substring matching, they are also indexed by
+    their trigrams (to find values containing the entry value) and by their leading trigram (to find values contained
+    in the entry value). Other values are compared one by one.
+    """
+
+    def __init__(self, field, entries, exact=True, case_sensitive=True):
+        """
+        :param field: Name of the field to index
+        :param entries: List of generated :class:`flexget.entry.Entry`
+        """
+        self.field = field
+        self.exact = exact
+        self.case_sensitive = case_sensitive
+        # Positions of the entries having the field, and their values
+        self.values = []
+        # Positions of the entries by normalized string value
+        self.strings = {}
+        # Positions of the entries having a value which is not a string
+        self.others = []
+        # Normalized string values by all of their trigrams, and by their leading trigram
+        self.grams = {}
+        self.prefixes = {}
+        # Normalized string values too short to have trigrams
+        self.short = set()
+        for position, entry in enumerate(entries):
+            if field not in entry:
+                continue
+            value = entry[field]
+            self.values.append((position, value))
+            if not isinstance(value, str):
+                self.others.append((position, value))
+                continue
+            value = self.normalize(value)
+            if value not in self.strings:
+                self.strings[value] = []
+                if not exact:
+                    self.add_grams(value)
+            self.strings[value].append(position)
+
+    def normalize(self, value):
+        return value if self.case_sensitive else value.lower()
+
+    def add_grams(self, value):
+        if len(value) < 3:
+            self.short.add(value)
+            return
+        self.prefixes.setdefault(value[:3], []).append(value)
+        for i in range(len(value) - 2):
+            self.grams.setdefault(value[i : i + 3], set()).add(value)
+
+    @staticmethod
+    def compare(v1, v2, exact):
+        try:
+            return v1 == v2 or not exact and (v2 in v1 or v1 in v2)
+        except TypeError as e:
+            # argument of type <type> is not iterable
+            log.trace('error matching fields: %s', e)
+            return False
+
+    def matches(self, entry):
+        """
+        :param entry: :class:`flexget.entry.Entry` to find intersecting entries for
+        :return: Sorted list of positions of the generated entries intersecting with `entry` on this field
+        """
+        # Doesn't really make sense to match if field is not in both entries
+        if self.field not in entry:
+            log.trace('field %s is not in entry %s', self.field, entry['title'])
+            return []
+        v1 = entry[self.field]
+        if not isinstance(v1, str):
+            # Values of other types are compared as they are
+            return [position for position, v2 in self.values if self.compare(v1, v2, self.exact)]
+
+        if not self.case_sensitive:
+            v1 = v1.lower()
+        found = set()
+        for value in self.matching_strings(v1):
+            found.update(self.strings[value])
+        for position, v2 in self.others:
+            if not self.case_sensitive:
+                v2 = v2.lower()
+            if self.compare(v1, v2, self.exact):
+                found.add(position)
+        return sorted(found)
+
+    def matching_strings(self, v1):
+        """Yields the indexed normalized strings equal to, or when not exact, containing or contained in `v1`."""
+        if self.exact:
+            if v1 in self.strings:
+                yield v1
+            return
+        matching = set()
+        # Indexed strings contained in v1
+        matching.update(value for value in self.short if value in v1)
+        for i in range(len(v1) - 2):
+            for value in self.prefixes.get(v1[i : i + 3], []):
+                if v1.startswith(value, i):
+                    matching.add(value)
+        # Indexed strings containing v1
+        if len(v1) < 3:
+            matching.update(value for value in self.strings if v1 in value)
+        else:
+            candidates = None
+            for i in range(len(v1) - 2):
+                values = self.grams.get(v1[i : i + 3], set())
+                candidates = values.copy() if candidates is None else candidates & values
+                if not candidates:
+                    break
+            matching.update(value for value in candidates if v1 in value)
+        for value in matching:
+            yield value
+
+
 @event('plugin.register')
 def register_plugin():
     plugin.register(CrossMatch, 'crossmatch', api_ver=2)
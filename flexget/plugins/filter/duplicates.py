@@ -28,18 +28,56 @@ class Duplicates(object):
     def on_task_filter(self, task, config):
         field = config['field']
         action = config['action']
-        for entry in task.entries:
-            for prospect in task.entries:
-                if entry == prospect:
+        entries = task.entries
+        # Group the entries by the value of the field, evaluating it only once per entry
+        groups = {}
+        keys = []
+        for entry in entries:
+            value = entry.get(field)
+            if value is None:
+                keys.append(None)
+                continue
+            try:
+                key = hashable(value)
+                groups.setdefault(key, []).append(entry)
+            except TypeError:
+                # Unhashable values are grouped with the first equal one
+                key = next((k for k in groups if groups[k][0][field] == value), id(entry))
+                groups.setdefault(key, []).append(entry)
+            keys.append(key)
+
+        for entry, key in zip(entries, keys):
+            if key is None or len(groups[key]) < 2:
+                continue
+            for prospect in groups[key]:
+                if prospect == entry:
+                    continue
+                # Rejected entries are no longer duplicates of the rest, so the last one of a group is kept
+                if action == 'reject' and prospect.rejected:
                     continue
-                if entry.get(field) is not None and entry[field] == prospect.get(field):
-                    msg = 'Field {} value {} equals on {} and {}'.format(
-                        field, entry[field], entry['title'], prospect['title']
-                    )
-                    if action == 'accept':
-                        entry.accept(msg)
-                    else:
-                        entry.reject(msg)
+                break
+            else:
+                continue
+            msg = 'Field {} value {} equals on {} and {}'.format(
+                field, entry[field], entry['title'], prospect['title']
+            )
+            if action == 'accept':
+                entry.accept(msg)
+            else:
+                entry.reject(msg)
+
+
+def hashable(value):
+    """
+    Returns a hashable representation of `value`, which equals the one of another value if the values are equal.
+    """
+    if isinstance(value, list):
+        return list, tuple(hashable(item) for item in value)
+    if isinstance(value, dict):
+        return dict, frozenset((key, hashable(item)) for key, item in value.items())
+    if isinstance(value, set):
+        return frozenset(value)
+    return value
 
 
 @event('plugin.register')
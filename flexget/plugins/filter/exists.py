@@ -9,6 +9,7 @@ from path import Path
 from flexget import plugin
 from flexget.event import event
 from flexget.config_schema import one_or_more
+from flexget.utils.file_index import get_index
 
 log = logging.getLogger('exists')
 
@@ -42,12 +43,12 @@ class FilterExists(object):
             folder = Path(folder).expanduser()
             if not folder.exists():
                 raise plugin.PluginWarning('Path %s does not exist' % folder, log)
-            for p in folder.walk(errors='ignore'):
+            for p in get_index(folder).entries():
                 key = p.name
                 # windows file system is not case sensitive
                 if platform.system() == 'Windows':
                     key = key.lower()
-                filenames[key] = p
+                filenames[key] = p.path
         for entry in task.accepted:
             # priority is: filename, location (filename only), title
             name = Path(entry.get('filename', entry.get('location', entry['title']))).name
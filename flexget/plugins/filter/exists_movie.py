@@ -9,7 +9,7 @@ from path import Path
 from flexget import plugin
 from flexget.config_schema import one_or_more
 from flexget.event import event
-from flexget.utils.tools import TimedDict
+from flexget.utils.file_index import get_index
 
 log = logging.getLogger('exists_movie')
 
@@ -50,9 +50,6 @@ class FilterExistsMovie(object):
     dir_pattern = re.compile('\b(cd.\d|subs?|samples?)\b', re.IGNORECASE)
     file_pattern = re.compile('\.(avi|mkv|mp4|mpg|webm)$', re.IGNORECASE)
 
-    def __init__(self):
-        self.cache = TimedDict(cache_time='1 hour')
-
     def prepare_config(self, config):
         # if config is not a dict, assign value to 'path' key
         if not isinstance(config, dict):
@@ -80,18 +77,13 @@ class FilterExistsMovie(object):
         count_entries = 0
         count_files = 0
 
-        # list of imdb ids gathered from paths / cache
+        # list of imdb ids gathered from paths
         qualities = {}
+        parsing = plugin.get('parsing', self)
+        parse_kind = ('movie', parsing.parser_name('movie'))
 
         for folder in config['path']:
             folder = Path(folder).expanduser()
-            # see if this path has already been scanned
-            cached_qualities = self.cache.get(folder, None)
-            if cached_qualities:
-                log.verbose('Using cached scan for %s ...' % folder)
-                qualities.update(cached_qualities)
-                continue
-
             path_ids = {}
 
             if not folder.isdir():
@@ -99,6 +91,7 @@ class FilterExistsMovie(object):
                 continue
 
             log.verbose('Scanning path %s ...' % folder)
+            index = get_index(folder)
 
             # Help debugging by removing a lot of noise
             # logging.getLogger('movieparser').setLevel(logging.WARNING)
@@ -107,17 +100,17 @@ class FilterExistsMovie(object):
             # scan through
             items = []
             if config.get('type') == 'dirs':
-                for d in folder.walkdirs(errors='ignore'):
+                for d in index.dirs():
                     if self.dir_pattern.search(d.name):
                         continue
                     log.debug('detected dir with name %s, adding to check list' % d.name)
-                    items.append(d.name)
+                    items.append(d)
             elif config.get('type') == 'files':
-                for f in folder.walkfiles(errors='ignore'):
+                for f in index.files():
                     if not self.file_pattern.search(f.name):
                         continue
                     log.debug('detected file with name %s, adding to check list' % f.name)
-                    items.append(f.name)
+                    items.append(f)
 
             if not items:
                 log.verbose(
@@ -128,24 +121,24 @@ class FilterExistsMovie(object):
             for item in items:
                 count_files += 1
 
-                movie = plugin.get('parsing', self).parse_movie(item)
+                movie = index.parse(item, parse_kind, parsing.parse_movie)
 
                 if config.get('lookup') == 'imdb':
                     try:
                         imdb_id = imdb_lookup.imdb_id_lookup(
                             movie_title=movie.name,
                             movie_year=movie.year,
-                            raw_title=item,
+                            raw_title=item.name,
                             session=task.session,
                         )
                         if imdb_id in path_ids:
-                            log.trace('duplicate %s' % item)
+                            log.trace('duplicate %s' % item.name)
                             continue
                         if imdb_id is not None:
                             log.trace('adding: %s' % imdb_id)
                             path_ids[imdb_id] = movie.quality
                     except plugin.PluginError as e:
-                        log.trace('%s lookup failed (%s)' % (item, e.value))
+                        log.trace('%s lookup failed (%s)' % (item.name, e.value))
                         incompatible_files += 1
                 else:
                     movie_id = movie.name
@@ -154,8 +147,6 @@ class FilterExistsMovie(object):
                     path_ids[movie_id] = movie.quality
                     log.trace('adding: %s' % movie_id)
 
-            # store to cache and extend to found list
-            self.cache[folder] = path_ids
             qualities.update(path_ids)
 
         log.debug('-- Start filtering entries ----------------------------------')
@@ -1,5 +1,6 @@
 from __future__ import unicode_literals, division, absolute_import
 
+import functools
 import logging
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
@@ -7,7 +8,9 @@ from path import Path
 
 from flexget import plugin
 from flexget.config_schema import one_or_more
+from flexget.components.series.utils import normalize_series_name
 from flexget.event import event
+from flexget.utils.file_index import get_index
 from flexget.utils.log import log_once
 from flexget.utils.template import RenderError
 
@@ -81,58 +84,77 @@ class FilterExistsSeries(object):
             )
             return
 
-        # scan through
-        # For speed, only test accepted entries since our priority should be after everything is accepted.
+        indexes = []
+        for folder in paths:
+            folder = Path(folder).expanduser()
+            if not folder.isdir():
+                log.warning('Directory %s does not exist', folder)
+                continue
+            indexes.append(get_index(folder))
+
+        parsing = plugin.get('parsing', self)
+
+        def parse(data, name=None):
+            try:
+                return parsing.parse_series(data=data, name=name)
+            except plugin_parsers.ParseWarning as pw:
+                log_once(pw.value, logger=log)
+                return pw.parsed
+
+        # Each file is parsed once, without a series name, and parse results of unchanged files are reused in
+        # following runs. Files are looked up by the normalized series name and identifier they parsed to.
+        parse_kind = ('series', parsing.parser_name('series'))
+        on_disk = {}
+        unnamed = []
+        for index in indexes:
+            for filename in index.entries():
+                disk_parser = index.parse(filename, parse_kind, parse)
+                if disk_parser.valid and disk_parser.name:
+                    key = (normalize_series_name(disk_parser.name), disk_parser.identifier)
+                    on_disk.setdefault(key, []).append((filename, disk_parser))
+                else:
+                    unnamed.append((index, filename))
+
+        # Episodes numbered by sequence or id are only recognized when the series name is known, the files which
+        # didn't parse without one are parsed again with the name of each accepted series.
         for series in accepted_series:
-            # make new parser from parser in entry
-            series_parser = accepted_series[series][0]['series_parser']
-            for folder in paths:
-                folder = Path(folder).expanduser()
-                if not folder.isdir():
-                    log.warning('Directory %s does not exist', folder)
-                    continue
-
-                for filename in folder.walk(errors='ignore'):
-                    # run parser on filename data
-                    try:
-                        disk_parser = plugin.get('parsing', self).parse_series(
-                            data=filename.name, name=series_parser.name
-                        )
-                    except plugin_parsers.ParseWarning as pw:
-                        disk_parser = pw.parsed
-                        log_once(pw.value, logger=log)
-                    if disk_parser.valid:
-                        log.debug('name %s is same series as %s', filename.name, series)
-                        log.debug('disk_parser.identifier = %s', disk_parser.identifier)
-                        log.debug('disk_parser.quality = %s', disk_parser.quality)
-                        log.debug('disk_parser.proper_count = %s', disk_parser.proper_count)
-
-                        for entry in accepted_series[series]:
-                            log.debug(
-                                'series_parser.identifier = %s', entry['series_parser'].identifier
-                            )
-                            if disk_parser.identifier != entry['series_parser'].identifier:
-                                log.trace('wrong identifier')
-                                continue
-                            log.debug('series_parser.quality = %s', entry['series_parser'].quality)
-                            if config.get('allow_different_qualities') == 'better':
-                                if entry['series_parser'].quality > disk_parser.quality:
-                                    log.trace('better quality')
-                                    continue
-                            elif config.get('allow_different_qualities'):
-                                if disk_parser.quality != entry['series_parser'].quality:
-                                    log.trace('wrong quality')
-                                    continue
-                            log.debug(
-                                'entry parser.proper_count = %s',
-                                entry['series_parser'].proper_count,
-                            )
-                            if disk_parser.proper_count >= entry['series_parser'].proper_count:
-                                entry.reject('episode already exists')
-                                continue
-                            else:
-                                log.trace('new one is better proper, allowing')
-                                continue
+            for index, filename in unnamed:
+                disk_parser = index.parse(
+                    filename, parse_kind + (series,), functools.partial(parse, name=series)
+                )
+                if disk_parser.valid:
+                    key = (normalize_series_name(series), disk_parser.identifier)
+                    on_disk.setdefault(key, []).append((filename, disk_parser))
+
+        # For speed, only test accepted entries since our priority should be after everything is accepted.
+        for series, entries in accepted_series.items():
+            name = normalize_series_name(series)
+            for entry in entries:
+                log.debug('series_parser.identifier = %s', entry['series_parser'].identifier)
+                found = on_disk.get((name, entry['series_parser'].identifier), [])
+                for filename, disk_parser in found:
+                    log.debug('name %s is same series as %s', filename.name, series)
+                    log.debug('disk_parser.identifier = %s', disk_parser.identifier)
+                    log.debug('disk_parser.quality = %s', disk_parser.quality)
+                    log.debug('disk_parser.proper_count = %s', disk_parser.proper_count)
+                    log.debug('series_parser.quality = %s', entry['series_parser'].quality)
+                    if config.get('allow_different_qualities') == 'better':
+                        if entry['series_parser'].quality > disk_parser.quality:
+                            log.trace('better quality')
+                            continue
+                    elif config.get('allow_different_qualities'):
+                        if disk_parser.quality != entry['series_parser'].quality:
+                            log.trace('wrong quality')
+                            continue
+                    log.debug(
+                        'entry parser.proper_count = %s', entry['series_parser'].proper_count
+                    )
+                    if disk_parser.proper_count >= entry['series_parser'].proper_count:
+                        entry.reject('episode already exists')
+                        break
+                    else:
+                        log.trace('new one is better proper, allowing')
+                        continue
 
 
 @event('plugin.register')
@@ -29,11 +29,18 @@ class FilterQuality(object):
         if not isinstance(config, list):
             config = [config]
         reqs = [qualities.Requirements(req) for req in config]
+        entries = []
         for entry in task.entries:
             if entry.get('quality') is None:
                 entry.reject('Entry doesn\'t have a quality')
                 continue
-            if not any(req.allows(entry['quality']) for req in reqs):
+            entries.append(entry)
+        quals = [entry['quality'] for entry in entries]
+        allowed = [False] * len(entries)
+        for req in reqs:
+            allowed = [a or b for a, b in zip(allowed, req.allows_many(quals))]
+        for entry, allow in zip(entries, allowed):
+            if not allow:
                 entry.reject('%s does not match quality requirement %s' % (entry['quality'], reqs))
 
 
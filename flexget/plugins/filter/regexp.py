@@ -160,7 +160,7 @@ class FilterRegexp(object):
         if 'rest' in config:
             rest_method = Entry.accept if config['rest'] == 'accept' else Entry.reject
             for entry in rest:
-                log.debug('Rest method %s for %s' % (config['rest'], entry['title']))
+                log.debug('Rest method %s for %s', config['rest'], entry['title'])
                 rest_method(entry, 'regexp `rest`')
 
     def matches(self, entry, regexp, find_from=None, not_regexps=None):
@@ -173,29 +173,7 @@ class FilterRegexp(object):
         :param not_regexps: None or list of regexps that can NOT match
         :return: Field matching
         """
-        unquote_fields = ['url']
-        for field in find_from or ['title', 'description']:
-            # Only evaluate lazy fields if find_from has been explicitly specified
-            if not entry.get(field, eval_lazy=find_from):
-                continue
-            # Make all fields into lists for search purposes
-            values = entry[field]
-            if not isinstance(values, list):
-                values = [values]
-            for value in values:
-                if not isinstance(value, str):
-                    value = str(value)
-                if field in unquote_fields:
-                    value = unquote(value)
-                    # If none of the not_regexps match
-                if regexp.search(value):
-                    # Make sure the not_regexps do not match for this field
-                    for not_regexp in not_regexps or []:
-                        if self.matches(entry, not_regexp, find_from=[field]):
-                            entry.trace('Configured not_regexp %s matched, ignored' % not_regexp)
-                            break
-                    else:  # None of the not_regexps matched
-                        return field
+        return EntryValues(entry).matches(regexp, find_from, not_regexps)
 
     def filter(self, entries, operation, regexps):
         """
@@ -209,40 +187,211 @@ class FilterRegexp(object):
         matched = set()
         method = Entry.accept if 'accept' in operation else Entry.reject
         match_mode = 'excluding' not in operation
+        groups = RegexpGroup.from_regexps(regexps)
         for entry in entries:
-            log.trace('testing %i regexps to %s' % (len(regexps), entry['title']))
-            for regexp_opts in regexps:
-                regexp, opts = list(regexp_opts.items())[0]
-
+            log.trace('testing %i regexps to %s', len(regexps), entry['title'])
+            values = EntryValues(entry)
+            for group in groups:
                 # check if entry matches given regexp configuration
-                field = self.matches(entry, regexp, opts.get('from'), opts.get('not'))
-
-                # Run if we are in match mode and have a hit, or are in non-match mode and don't have a hit
-                if match_mode == bool(field):
-                    # Creates the string with the reason for the hit
-                    matchtext = 'regexp \'%s\' ' % regexp.pattern + (
-                        'matched field \'%s\'' % field if match_mode else 'didn\'t match'
-                    )
-                    log.debug('%s for %s' % (matchtext, entry['title']))
-                    # apply settings to entry and run the method on it
-                    if opts.get('path'):
-                        entry['path'] = opts['path']
-                    if opts.get('set'):
-                        # invoke set plugin with given configuration
-                        log.debug(
-                            'adding set: info to entry:"%s" %s' % (entry['title'], opts['set'])
-                        )
-                        plugin.get('set', self).modify(entry, opts['set'])
-                    method(entry, matchtext)
-                    matched.add(entry)
-                    # We had a match so break out of the regexp loop.
-                    break
+                hit = group.first_hit(values, match_mode)
+                if not hit:
+                    continue
+                regexp, opts, field = hit
+                # Creates the string with the reason for the hit
+                matchtext = 'regexp \'%s\' ' % regexp.pattern + (
+                    'matched field \'%s\'' % field if match_mode else 'didn\'t match'
+                )
+                log.debug('%s for %s', matchtext, entry['title'])
+                # apply settings to entry and run the method on it
+                if opts.get('path'):
+                    entry['path'] = opts['path']
+                if opts.get('set'):
+                    # invoke set plugin with given configuration
+                    log.debug('adding set: info to entry:"%s" %s', entry['title'], opts['set'])
+                    plugin.get('set', self).modify(entry, opts['set'])
+                method(entry, matchtext)
+                matched.add(entry)
+                # We had a match so break out of the regexp loop.
+                break
             else:
                 # We didn't run method for any of the regexps, add this entry to rest
                 entry.trace('None of configured %s regexps matched' % operation)
         return matched
 
 
+class EntryValues(object):
+    """Extracts the string values of entry fields to match regexps against, each field only once."""
+
+    unquote_fields = ['url']
+
+    def __init__(self, entry):
+        self.entry = entry
+        self._values = {}
+
+    def get(self, field, eval_lazy=False):
+        """
+        :param field: Name of the entry field
+        :param eval_lazy: Whether lazy fields should be evaluated
+        :return: List of string values of the field
+        """
+        key = (field, bool(eval_lazy))
+        if key not in self._values:
+            result = []
+            if self.entry.get(field, eval_lazy=eval_lazy):
+                # Make all fields into lists for search purposes
+                values = self.entry[field]
+                if not isinstance(values, list):
+                    values = [values]
+                for value in values:
+                    if not isinstance(value, str):
+                        value = str(value)
+                    if field in self.unquote_fields:
+                        value = unquote(value)
+                    result.append(value)
+            self._values[key] = result
+        return self._values[key]
+
+    def fields(self, find_from=None):
+        """Yields tuples of field name and its values to search from."""
+        # Only evaluate lazy fields if find_from has been explicitly specified
+        for field in find_from or ['title', 'description']:
+            yield field, self.get(field, eval_lazy=find_from)
+
+    def matches(self, regexp, find_from=None, not_regexps=None):
+        """
+        Check if the entry has any string fields or strings in a list field that match :regexp:
+
+        :param regexp: Compiled regexp
+        :param find_from: None or a list of fields to search from
+        :param not_regexps: None or list of regexps that can NOT match
+        :return: Field matching
+        """
+        for field, values in self.fields(find_from):
+            for value in values:
+                if regexp.search(value):
+                    # Make sure the not_regexps do not match for this field
+                    for not_regexp in not_regexps or []:
+                        if self.matches(not_regexp, find_from=[field]):
+                            self.entry.trace(
+                                'Configured not_regexp %s matched, ignored' % not_regexp
+                            )
+                            break
+                    else:  # None of the not_regexps matched
+                        return field
+
+
+# Python 2 refuses patterns with more than 100 groups, counting the ones inside the combined regexps
+MAX_GROUPS = 99
+
+
+class RegexpGroup(object):
+    """
+    Consecutive regexps of an operation which search the same fields.
+
+    The regexps are combined into one alternation with a named group for each of them, so that a single search of a
+    value tells whether any of them match. The regexps are only evaluated one by one, with their `not` options,
+    from the lowest indexed one which matched.
+    """
+
+    def __init__(self, find_from=None):
+        self.find_from = find_from
+        self.regexps = []
+        # Groups in the alternation of all regexps, their own groups included
+        self.group_count = 0
+        self._scanners = {}
+
+    @staticmethod
+    def combinable(regexp):
+        """Whether the regexp keeps its meaning inside of an alternation with other regexps."""
+        # Group names must be unique, and numbered back references would refer to the wrong group
+        return not regexp.groupindex and not re.search(
+            r'\\[1-9]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)', regexp.pattern
+        )
+
+    @classmethod
+    def from_regexps(cls, regexps):
+        """
+        :param regexps: list of {compiled_regexp: options} dictionaries
+        :return: List of groups, in order of the regexps
+        """
+        groups = []
+        for regexp_opts in regexps:
+            regexp, opts = list(regexp_opts.items())[0]
+            find_from = opts.get('from')
+            if (
+                not groups
+                or groups[-1].find_from != find_from
+                or not cls.combinable(regexp)
+                or not cls.combinable(groups[-1].regexps[-1][0])
+                or groups[-1].group_count + 1 + regexp.groups > MAX_GROUPS
+            ):
+                groups.append(cls(find_from))
+            groups[-1].regexps.append((regexp, opts))
+            groups[-1].group_count += 1 + regexp.groups
+        return groups
+
+    def scanner(self, start, end):
+        """Returns a compiled alternation of the regexps from index `start` up to `end`."""
+        key = (start, end)
+        if key not in self._scanners:
+            if end - start == 1:
+                scanner = self.regexps[start][0]
+            else:
+                scanner = re.compile(
+                    '|'.join(
+                        '(?P<r%d>%s)' % (index, self.regexps[index][0].pattern)
+                        for index in range(start, end)
+                    ),
+                    re.IGNORECASE | re.UNICODE,
+                )
+            self._scanners[key] = scanner
+        return self._scanners[key]
+
+    def first_match(self, values, start=0):
+        """
+        Finds the lowest indexed regexp from `start` on which matches any of the searched entry values.
+
+        :param EntryValues values: Values of the entry
+        :return: Index of the regexp, or None
+        """
+        found = None
+        end = len(self.regexps)
+        for _, field_values in values.fields(self.find_from):
+            for value in field_values:
+                while start < end:
+                    match = self.scanner(start, end).search(value)
+                    if not match:
+                        break
+                    # The leftmost match isn't necessarily the lowest indexed one, but later ones are ruled out
+                    end = int(match.lastgroup[1:]) if end - start > 1 else start
+                    found = end
+        return found
+
+    def first_hit(self, values, match_mode=True):
+        """
+        Finds the first regexp of the group which matches the entry, or doesn't match it when not in `match_mode`.
+
+        :param EntryValues values: Values of the entry
+        :param bool match_mode: Whether to look for the first matching or the first non matching regexp
+        :return: Tuple of regexp, options and matched field, or None
+        """
+        start = 0
+        while start < len(self.regexps):
+            index = self.first_match(values, start)
+            if not match_mode and index != start:
+                # Nothing matches the regexp at `start`
+                regexp, opts = self.regexps[start]
+                return regexp, opts, None
+            if index is None:
+                return None
+            regexp, opts = self.regexps[index]
+            field = values.matches(regexp, self.find_from, opts.get('not'))
+            if bool(field) == match_mode:
+                return regexp, opts, field
+            start = index + 1
+        return None
+
+
 @event('plugin.register')
 def register_plugin():
     plugin.register(FilterRegexp, 'regexp', api_ver=2)
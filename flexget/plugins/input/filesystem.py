@@ -3,18 +3,95 @@ from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 from future.utils import PY2
 
 import logging
+import os
 import re
 import sys
 from datetime import datetime
 
 from path import Path
+from sqlalchemy import Column, Integer, Float, Unicode, Index
 
-from flexget import plugin
+from flexget import db_schema, plugin
 from flexget.config_schema import one_or_more
 from flexget.event import event
 from flexget.entry import Entry
+from flexget.manager import Session
+from flexget.utils.database import json_synonym
+from flexget.utils.file_index import FileIndex
 
 log = logging.getLogger('filesystem')
+Base = db_schema.versioned_base('filesystem', 0)
+
+
+class DirectoryListing(Base):
+    """Listing of a directory below a folder of an incremental filesystem input, as of the last run of the task."""
+
+    __tablename__ = 'filesystem_directory'
+
+    id = Column(Integer, primary_key=True)
+    task = Column(Unicode)
+    folder = Column(Unicode)
+    path = Column(Unicode)
+    mtime = Column(Float)
+    inode = Column(Integer)
+    listed_at = Column(Float)
+    _listing = Column('listing', Unicode)
+    listing = json_synonym('_listing')
+
+    def __repr__(self):
+        return '<DirectoryListing(task=%s,path=%s)>' % (self.task, self.path)
+
+
+Index('ix_filesystem_directory_task_folder', DirectoryListing.task, DirectoryListing.folder)
+
+
+def load_state(task_name, folder):
+    """Returns the stored directory listings of `folder` in the format of :meth:`FileIndex.to_dict`."""
+    with Session() as session:
+        return {
+            row.path: [row.mtime, row.inode, row.listed_at, row.listing]
+            for row in session.query(DirectoryListing)
+            .filter(DirectoryListing.task == task_name)
+            .filter(DirectoryListing.folder == folder)
+        }
+
+
+def save_state(task_name, folder, old, new):
+    """Stores the directory listings of `folder` which changed from `old` to `new`."""
+    changed = [path for path in new if old.get(path) != new[path]]
+    removed = [path for path in old if path not in new]
+    if not changed and not removed:
+        return
+    with Session() as session:
+        rows = {
+            row.path: row
+            for row in session.query(DirectoryListing)
+            .filter(DirectoryListing.task == task_name)
+            .filter(DirectoryListing.folder == folder)
+        }
+        for path in removed:
+            if path in rows:
+                session.delete(rows[path])
+        for path in changed:
+            row = rows.get(path)
+            if row is None:
+                row = DirectoryListing(task=task_name, folder=folder, path=path)
+                session.add(row)
+            row.mtime, row.inode, row.listed_at, listing = new[path]
+            row.listing = [list(info) for info in listing]
+    log.debug('Stored %s changed directories of %s', len(changed) + len(removed), folder)
+
+
+@event('manager.db_cleanup')
+def db_cleanup(manager, session):
+    # Purge the listings of tasks which don't exist anymore
+    result = (
+        session.query(DirectoryListing)
+        .filter(~DirectoryListing.task.in_(list(manager.config['tasks'])))
+        .delete(synchronize_session=False)
+    )
+    if result:
+        log.verbose('Removed %s directory listings of removed tasks', result)
 
 
 class Filesystem(object):
@@ -62,8 +139,23 @@ class Filesystem(object):
           - files
           - dirs
 
+    Example 6::
+
+      filesystem:
+        path: /storage/movies/
+        recursive: yes
+        incremental: new  # Only files and dirs which are new or changed since the last run
+
+    With `incremental`, the contents of the folders are remembered between runs, and only directories which changed
+    are listed again. `new` produces entries only for new or changed items, `all` for all of them.
+    Files changed in place are not noticed, as that doesn't change their directory. The listings are stored when the
+    task finishes, so a rerun or an aborted run produces the same items again.
     """
 
+    def __init__(self):
+        # Listings to store when tasks finish, by task name
+        self.pending_states = {}
+
     retrieval_options = ['files', 'dirs', 'symlinks']
     paths = one_or_more({'type': 'string', 'format': 'path'}, unique_items=True)
 
@@ -82,6 +174,7 @@ class Filesystem(object):
                     'retrieve': one_or_more(
                         {'type': 'string', 'enum': retrieval_options}, unique_items=True
                     ),
+                    'incremental': {'type': 'string', 'enum': ['new', 'all']},
                 },
                 'required': ['path'],
                 'additionalProperties': False,
@@ -111,11 +204,11 @@ class Filesystem(object):
 
         return config
 
-    def create_entry(self, filepath, test_mode):
+    def create_entry(self, info, test_mode):
         """
-        Creates a single entry using a filepath and a type (file/dir)
+        Creates a single entry using the :class:`FileInfo` of a file/dir
         """
-        filepath = filepath.abspath()
+        filepath = Path(info.path).abspath()
         entry = Entry()
         entry['location'] = filepath
         if PY2:
@@ -128,18 +221,19 @@ class Filesystem(object):
 
             entry['url'] = pathlib.Path(filepath).absolute().as_uri()
         entry['filename'] = filepath.name
-        if filepath.isfile():
+        if info.is_file:
             entry['title'] = filepath.stem
         else:
             entry['title'] = filepath.name
-        try:
-            entry['timestamp'] = datetime.fromtimestamp(filepath.getmtime())
-        except Exception as e:
-            log.warning('Error setting timestamp for %s: %s' % (filepath, e))
+        if info.mtime is None:
+            log.warning('Error setting timestamp for %s: could not stat it' % filepath)
             entry['timestamp'] = None
-        entry['accessed'] = datetime.fromtimestamp(filepath.getatime())
-        entry['modified'] = datetime.fromtimestamp(filepath.getmtime())
-        entry['created'] = datetime.fromtimestamp(filepath.getctime())
+            entry['accessed'] = entry['modified'] = entry['created'] = None
+        else:
+            entry['timestamp'] = datetime.fromtimestamp(info.mtime)
+            entry['accessed'] = datetime.fromtimestamp(info.atime)
+            entry['modified'] = datetime.fromtimestamp(info.mtime)
+            entry['created'] = datetime.fromtimestamp(info.ctime)
         if entry.isvalid():
             if test_mode:
                 log.info("Test mode. Entry includes:")
@@ -161,50 +255,94 @@ class Filesystem(object):
         else:
             return base_depth + recursion
 
-    def get_folder_objects(self, folder, recursion):
+    def get_max_level(self, folder, recursion):
+        """Returns how many levels below `folder` are retrieved, or None if there is no limit."""
         if recursion is False:
-            return folder.listdir()
-        else:
-            return folder.walk(errors='ignore')
+            return 1
+        max_depth = self.get_max_depth(recursion, len(folder.splitall()))
+        if max_depth == float('inf'):
+            return None
+        # Depth of the items in the folder, which is not base_depth + 1 if it ends with a separator
+        return max_depth - len((folder / 'item').splitall()) + 1
+
+    @staticmethod
+    def is_new(info, previous):
+        """
+        :param info: :class:`FileInfo` of a file/dir
+        :param previous: Dict of previous listings of the directories which were listed again, by path
+        :return: Whether the file/dir is new or changed since the last scan
+        """
+        listing = previous.get(os.path.dirname(info.path))
+        if listing is None:
+            return False
+        return not any(
+            old.name == info.name and old.size == info.size and old.mtime == info.mtime
+            for old in listing
+        )
 
     def get_entries_from_path(
-        self, path_list, match, recursion, test_mode, get_files, get_dirs, get_symlinks
+        self,
+        path_list,
+        match,
+        recursion,
+        test_mode,
+        get_files,
+        get_dirs,
+        get_symlinks,
+        incremental=None,
+        states=None,
     ):
+        """
+        :param incremental: `new` or `all` to list only changed directories, see the class docs
+        :param dict states: Listings of the folders from :meth:`FileIndex.to_dict` by folder, updated in place
+        """
         entries = []
+        seen = set()
 
         for folder in path_list:
             log.verbose('Scanning folder %s. Recursion is set to %s.' % (folder, recursion))
             folder = Path(folder).expanduser()
             log.debug('Scanning %s' % folder)
-            base_depth = len(folder.splitall())
-            max_depth = self.get_max_depth(recursion, base_depth)
-            folder_objects = self.get_folder_objects(folder, recursion)
-            for path_object in folder_objects:
-                log.debug('Checking if %s qualifies to be added as an entry.' % path_object)
-                try:
-                    path_object.exists()
-                except UnicodeError:
-                    log.error(
-                        'File %s not decodable with filesystem encoding: %s'
-                        % (path_object, sys.getfilesystemencoding())
-                    )
+            max_level = self.get_max_level(folder, recursion)
+            index = FileIndex(folder, watch=False, max_depth=max_level)
+            if incremental:
+                index.from_dict(states.get(folder, {}))
+            previous = index.refresh()
+            if incremental:
+                states[folder] = index.to_dict()
+            if incremental == 'new':
+                # Listed paths don't keep a trailing separator of the folder
+                previous = {os.path.normpath(path): listing for path, listing in previous.items()}
+            for info, level in index.walk():
+                if max_level is not None and level > max_level:
                     continue
+                if incremental == 'new' and not self.is_new(info, previous):
+                    continue
+                log.debug('Checking if %s qualifies to be added as an entry.' % info.path)
                 entry = None
-                object_depth = len(path_object.splitall())
-                if object_depth <= max_depth:
-                    if match(path_object):
-                        if (
-                            (path_object.isdir() and get_dirs)
-                            or (path_object.islink() and get_symlinks)
-                            or (path_object.isfile() and not path_object.islink() and get_files)
-                        ):
-                            entry = self.create_entry(path_object, test_mode)
-                        else:
-                            log.debug(
-                                "Path object's %s type doesn't match requested object types."
-                                % path_object
+                if match(info.path):
+                    if (
+                        (info.is_dir and get_dirs)
+                        or (info.is_symlink and get_symlinks)
+                        or (info.is_file and not info.is_symlink and get_files)
+                    ):
+                        try:
+                            entry = self.create_entry(info, test_mode)
+                        except UnicodeError:
+                            log.error(
+                                'File %s not decodable with filesystem encoding: %s'
+                                % (info.path, sys.getfilesystemencoding())
                             )
-                        if entry and entry not in entries:
+                            continue
+                    else:
+                        log.debug(
+                            "Path object's %s type doesn't match requested object types."
+                            % info.path
+                        )
+                    if entry:
+                        key = (entry.get('original_title'), entry.get('original_url'))
+                        if key not in seen:
+                            seen.add(key)
                             entries.append(entry)
 
         return entries
@@ -220,10 +358,40 @@ class Filesystem(object):
         get_dirs = 'dirs' in config['retrieve']
         get_symlinks = 'symlinks' in config['retrieve']
 
+        incremental = config.get('incremental')
+        old_states = {}
+        if incremental:
+            for folder in path_list:
+                folder = Path(folder).expanduser()
+                old_states[folder] = load_state(task.name, folder)
+        states = dict(old_states)
+
         log.verbose('Starting to scan folders.')
-        return self.get_entries_from_path(
-            path_list, match, recursive, test_mode, get_files, get_dirs, get_symlinks
+        entries = self.get_entries_from_path(
+            path_list,
+            match,
+            recursive,
+            test_mode,
+            get_files,
+            get_dirs,
+            get_symlinks,
+            incremental,
+            states,
         )
+        if incremental and not test_mode:
+            self.pending_states[task.name] = (old_states, states)
+        return entries
+
+    def on_task_exit(self, task, config):
+        """Stores the listings once the task has finished, it isn't called while a rerun is pending."""
+        pending = self.pending_states.pop(task.name, None)
+        if pending:
+            old_states, states = pending
+            for folder, state in states.items():
+                save_state(task.name, folder, old_states.get(folder, {}), state)
+
+    def on_task_abort(self, task, config):
+        self.pending_states.pop(task.name, None)
 
 
 @event('plugin.register')
@@ -16,6 +16,7 @@ from flexget.event import event
 from flexget.entry import Entry
 from flexget.utils.soup import get_soup
 from flexget.utils.cached_input import cached
+from flexget.utils.requests import MAX_WORKERS
 
 log = logging.getLogger('html')
 
@@ -123,22 +124,32 @@ class InputHtml(object):
                 if dump_name:
                     template_dump = Template(dump_name)
 
+            # Pages after the one which meets a stop condition must not be requested, so pages are only
+            # requested in batches when there is no stop condition
+            batch_size = 1 if stop_when_empty or entries_count else MAX_WORKERS
             while to is None or current < to:
-                render_ctx = {increment_name: current}
-                url = template_url.render(**render_ctx)
-                dump_name = None
-                if template_dump:
-                    dump_name = template_dump.render(**render_ctx)
-                new_entries = self._request_url(task, config, url, auth, dump_name)
-                if not entries:
-                    entries = new_entries
-                else:
-                    entries.extend(new_entries)
-                if stop_when_empty and not new_entries:
-                    break
-                if entries_count and len(entries) >= entries_count:
-                    break
-                current += step
+                # Request a batch of pages at once, then handle them in order
+                batch = []
+                while len(batch) < batch_size and (to is None or current < to):
+                    render_ctx = {increment_name: current}
+                    dump_name = None
+                    if template_dump:
+                        dump_name = template_dump.render(**render_ctx)
+                    batch.append((template_url.render(**render_ctx), dump_name))
+                    current += step
+                for url, dump_name in batch:
+                    log.verbose('Requesting: %s' % url)
+                results = task.requests.get_many([url for url, _ in batch], auth=auth)
+                for (url, dump_name), result in zip(batch, results):
+                    new_entries = self._parse_page(config, url, result.result(), dump_name)
+                    if not entries:
+                        entries = new_entries
+                    else:
+                        entries.extend(new_entries)
+                    if stop_when_empty and not new_entries:
+                        return entries
+                    if entries_count and len(entries) >= entries_count:
+                        return entries
             return entries
         else:
             return self._request_url(task, config, base_url, auth, dump_name=config.get('dump'))
@@ -146,6 +157,9 @@ class InputHtml(object):
     def _request_url(self, task, config, url, auth, dump_name=None):
         log.verbose('Requesting: %s' % url)
         page = task.requests.get(url, auth=auth)
+        return self._parse_page(config, url, page, dump_name)
+
+    def _parse_page(self, config, url, page, dump_name=None):
         log.verbose('Response: %s (%s)' % (page.status_code, page.reason))
         soup = get_soup(page.content)
 
@@ -1,6 +1,7 @@
 from __future__ import unicode_literals, division, absolute_import
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
+import codecs
 import io
 import os
 import re
@@ -17,6 +18,9 @@ from flexget.manager import Session
 log = logging.getLogger('tail')
 Base = versioned_base('tail', 0)
 
+# Bytes read from the file at once
+CHUNK_SIZE = 1024 * 1024
+
 
 class TailPosition(Base):
     __tablename__ = 'tail'
@@ -77,6 +81,65 @@ class InputTail(object):
         for k, v in d.items():
             entry[k] = v % entry
 
+    @staticmethod
+    def read_chunks(file, encoding):
+        """
+        Reads the rest of a binary file in large chunks.
+
+        :return: Iterator of decoded text blocks with universal newlines, each ending with a complete line except
+            the last one
+        """
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        decoder = io.IncrementalNewlineDecoder(decoder, translate=True)
+        rest = ''
+        while True:
+            data = file.read(CHUNK_SIZE)
+            text = rest + decoder.decode(data, final=not data)
+            if not data:
+                if text:
+                    yield text
+                return
+            end = text.rfind('\n') + 1
+            rest = text[end:]
+            if end:
+                yield text[:end]
+
+    @staticmethod
+    def scanner(regexps):
+        """
+        Returns a regexp finding the lines on which any of the `regexps` may match, or None if they cannot be combined.
+        """
+        for regexp in regexps:
+            # Numbered back references would refer to the wrong group, anchors to the start and end of the
+            # whole text don't mean the start and end of a line in it
+            if regexp.groupindex or re.search(
+                r'\\[1-9AZ]|\(\?P=|\(\?\(|\(\?[aiLmsux]+\)', regexp.pattern
+            ):
+                return None
+        return re.compile(
+            '|'.join('(?:%s)' % regexp.pattern for regexp in regexps), re.MULTILINE
+        )
+
+    @staticmethod
+    def candidate_lines(text, scanner):
+        """
+        Yields the lines of `text` on which the `scanner` finds a match.
+
+        A match found by searching the whole text never starts later than it would when searching line by line, so
+        continuing the search at the start of the next line doesn't skip any matching lines.
+        """
+        pos = 0
+        while True:
+            match = scanner.search(text, pos)
+            if not match:
+                return
+            start = text.rfind('\n', 0, match.start()) + 1
+            end = text.find('\n', match.start()) + 1 or len(text)
+            yield text[start:end]
+            if end >= len(text):
+                return
+            pos = end
+
     def on_task_input(self, task, config):
 
         # Let details plugin know that it is ok if this task doesn't produce any entries
@@ -96,7 +159,7 @@ class InputTail(object):
             else:
                 last_pos = 0
 
-            with io.open(filename, 'r', encoding=encoding, errors='replace') as file:
+            with io.open(filename, 'rb') as file:
                 if task.options.tail_reset == filename or task.options.tail_reset == task.name:
                     if last_pos == 0:
                         log.info('Task %s tail position is already zero' % task.name)
@@ -118,6 +181,10 @@ class InputTail(object):
 
                 entry_config = config.get('entry')
                 format_config = config.get('format', {})
+                regexps = [
+                    (field, re.compile(regexp)) for field, regexp in entry_config.items()
+                ]
+                scanner = self.scanner([regexp for _, regexp in regexps])
 
                 # keep track what fields have been found
                 used = {}
@@ -126,52 +193,54 @@ class InputTail(object):
 
                 # now parse text
 
-                for line in file:
-                    if not line:
-                        break
-
-                    for field, regexp in entry_config.items():
-                        # log.debug('search field: %s regexp: %s' % (field, regexp))
-                        match = re.search(regexp, line)
-                        if match:
-                            # check if used field detected, in such case start with new entry
-                            if field in used:
-                                if entry.isvalid():
+                for text in self.read_chunks(file, encoding):
+                    if scanner:
+                        # Only lines on which some field matches can affect the entries
+                        lines = self.candidate_lines(text, scanner)
+                    else:
+                        lines = io.StringIO(text)
+                    for line in lines:
+                        for field, regexp in regexps:
+                            match = regexp.search(line)
+                            if match:
+                                # check if used field detected, in such case start with new entry
+                                if field in used:
+                                    if entry.isvalid():
+                                        log.info(
+                                            'Found field %s again before entry was completed. \
+                                                  Adding current incomplete, but valid entry and moving to next.'
+                                            % field
+                                        )
+                                        self.format_entry(entry, format_config)
+                                        entries.append(entry)
+                                    else:
+                                        log.info(
+                                            'Invalid data, entry field %s is already found once. Ignoring entry.'
+                                            % field
+                                        )
+                                    # start new entry
+                                    entry = Entry()
+                                    used = {}
+
+                                # add field to entry
+                                entry[field] = match.group(1)
+                                used[field] = True
+                                log.debug('found field: %s value: %s' % (field, entry[field]))
+
+                            # if all fields have been found
+                            if len(used) == len(entry_config):
+                                # check that entry has at least title and url
+                                if not entry.isvalid():
                                     log.info(
-                                        'Found field %s again before entry was completed. \
-                                              Adding current incomplete, but valid entry and moving to next.'
-                                        % field
+                                        'Invalid data, constructed entry is missing mandatory fields (title or url)'
                                     )
+                                else:
                                     self.format_entry(entry, format_config)
                                     entries.append(entry)
-                                else:
-                                    log.info(
-                                        'Invalid data, entry field %s is already found once. Ignoring entry.'
-                                        % field
-                                    )
-                                # start new entry
-                                entry = Entry()
-                                used = {}
-
-                            # add field to entry
-                            entry[field] = match.group(1)
-                            used[field] = True
-                            log.debug('found field: %s value: %s' % (field, entry[field]))
-
-                        # if all fields have been found
-                        if len(used) == len(entry_config):
-                            # check that entry has at least title and url
-                            if not entry.isvalid():
-                                log.info(
-                                    'Invalid data, constructed entry is missing mandatory fields (title or url)'
-                                )
-                            else:
-                                self.format_entry(entry, format_config)
-                                entries.append(entry)
-                                log.debug('Added entry %s' % entry)
-                                # start new entry
-                                entry = Entry()
-                                used = {}
+                                    log.debug('Added entry %s' % entry)
+                                    # start new entry
+                                    entry = Entry()
+                                    used = {}
                 last_pos = file.tell()
             if db_pos:
                 db_pos.position = last_pos
@@ -0,0 +1,108 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, String, Float, DateTime
+from sqlalchemy.exc import OperationalError
+
+from flexget import db_schema
+from flexget.event import event
+from flexget.manager import Session
+from flexget.utils.requests import LimiterStateStore, TokenBucketLimiter
+
+log = logging.getLogger('limiter_state')
+Base = db_schema.versioned_base('limiter_state', 0)
+
+
+class TokenBucketState(Base):
+    __tablename__ = 'token_bucket_state'
+
+    domain = Column(String, primary_key=True)
+    tokens = Column(Float)
+    last_update = Column(DateTime)
+
+    def __repr__(self):
+        return '<TokenBucketState(domain=%s,tokens=%s)>' % (self.domain, self.tokens)
+
+
+class DatabaseLimiterStateStore(LimiterStateStore):
+    """
+    Keeps the state of token buckets in memory and stores it in the database when tasks complete, so that
+    consecutive executions via cron honor the same limits.
+
+    The stored state of a domain is read the first time the domain is used. Requests never write to the database, so
+    they don't wait for the database write lock while a plugin holds it.
+    """
+
+    def __init__(self):
+        super(DatabaseLimiterStateStore, self).__init__()
+        # Domains whose state changed since it was last stored
+        self.dirty = set()
+
+    def update(self, domain, default, func):
+        with self._lock:
+            if domain not in self.states:
+                self.states[domain] = self.load(domain) or default
+            self.dirty.add(domain)
+            return func(self.states[domain])
+
+    @staticmethod
+    def load(domain):
+        try:
+            with Session() as session:
+                bucket = session.query(TokenBucketState).get(domain)
+                if bucket:
+                    return {'tokens': bucket.tokens, 'last_update': bucket.last_update}
+        except OperationalError as e:
+            log.debug('Could not load stored state for %s: %s', domain, e)
+        return None
+
+    def flush(self):
+        """Stores the state of the buckets which changed in the database."""
+        with self._lock:
+            states = {domain: dict(self.states[domain]) for domain in self.dirty}
+            self.dirty = set()
+        if not states:
+            return
+        try:
+            with Session() as session:
+                for domain, state in states.items():
+                    session.merge(TokenBucketState(domain=domain, **state))
+        except OperationalError as e:
+            log.debug('Could not store token bucket states, will try again later: %s', e)
+            with self._lock:
+                self.dirty.update(states)
+
+
+@event('manager.startup')
+def use_database_store(manager):
+    TokenBucketLimiter.state_store = DatabaseLimiterStateStore()
+
+
+@event('task.execute.completed')
+def flush_state(task):
+    store = TokenBucketLimiter.state_store
+    if isinstance(store, DatabaseLimiterStateStore):
+        store.flush()
+
+
+@event('manager.shutdown')
+def use_memory_store(manager):
+    store = TokenBucketLimiter.state_store
+    if isinstance(store, DatabaseLimiterStateStore):
+        store.flush()
+    TokenBucketLimiter.state_store = LimiterStateStore()
+
+
+@event('manager.db_cleanup')
+def db_cleanup(manager, session):
+    # Buckets that haven't been used in a while have refilled, no need to keep them around
+    result = (
+        session.query(TokenBucketState)
+        .filter(TokenBucketState.last_update < datetime.now() - timedelta(days=7))
+        .delete()
+    )
+    if result:
+        log.verbose('Removed %d unused token bucket states.', result)
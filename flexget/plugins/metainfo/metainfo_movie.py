@@ -26,11 +26,18 @@ class MetainfoMovie(object):
         # Don't run if we are disabled
         if config is False:
             return
-        for entry in task.entries:
+        entries = [
+            entry
+            for entry in task.entries
             # If movie parser already parsed this, don't touch it.
-            if entry.get('id'):
-                continue
-            self.guess_entry(entry)
+            if not entry.get('id') and not entry.get('movie_guessed')
+        ]
+        # Parse all titles at once, so that the parser can spread them over several processes
+        results = plugin.get('parsing', 'metainfo_movie').parse_movie_many(
+            [entry['title'] for entry in entries]
+        )
+        for entry, parser in zip(entries, results):
+            self.populate_entry(entry, parser)
 
     @staticmethod
     def guess_entry(entry):
@@ -43,6 +50,11 @@ class MetainfoMovie(object):
             # Return true if we already parsed this
             return True
         parser = plugin.get('parsing', 'metainfo_movie').parse_movie(data=entry['title'])
+        return MetainfoMovie.populate_entry(entry, parser)
+
+    @staticmethod
+    def populate_entry(entry, parser):
+        """Populates movie_* fields of `entry` if `parser` is a valid parse result, returns whether it was."""
         if parser and parser.valid:
             parser.name = plugin_parser_common.normalize_name(
                 plugin_parser_common.remove_dirt(parser.name)
@@ -1,23 +1,27 @@
 from __future__ import unicode_literals, division, absolute_import
 
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
-from future.moves.urllib.parse import unquote
+from future.moves.urllib.parse import unquote, urlparse
 
 import hashlib
 import io
 import logging
 import mimetypes
 import os
+import re
 import shutil
 import socket
 import sys
 import tempfile
+import threading
+import time
 from cgi import parse_header
+from contextlib import contextmanager
 from http.client import BadStatusLine
 
 from requests import RequestException
 
-from flexget import options, plugin
+from flexget import logger, options, plugin
 from flexget.event import event
 from flexget.utils.tools import decode_html, native_str_to_text
 from flexget.utils.template import RenderError
@@ -25,6 +29,12 @@ from flexget.utils.pathscrub import pathscrub
 
 log = logging.getLogger('download')
 
+# Maximum amount of simultaneous downloads from a single host when downloading in parallel
+MAX_HOST_CONNECTIONS = 2
+# Partial downloads which haven't been resumed for this many seconds are removed
+PARTIAL_MAX_AGE = 7 * 24 * 60 * 60
+PARTIAL_FILE = re.compile(r'^[0-9a-f]{32}\.part(\.validator)?$')
+
 
 class PluginDownload(object):
     """
@@ -50,8 +60,19 @@ class PluginDownload(object):
         path: ~/something/
         fail_html: no
 
+    Download several files at once:
+
+    Example::
+
+      download:
+        path: ~/torrents/
+        parallel: 4
+
     You may use commandline parameter --dl-path to temporarily override
     all paths to another location.
+
+    Interrupted downloads are kept in the temp folder, and resumed the next
+    time if the server supports it.
     """
 
     schema = {
@@ -65,6 +86,7 @@ class PluginDownload(object):
                     'overwrite': {'type': 'boolean', 'default': False},
                     'temp': {'type': 'string', 'format': 'path'},
                     'filename': {'type': 'string'},
+                    'parallel': {'type': 'integer', 'minimum': 1, 'default': 1},
                 },
                 'additionalProperties': False,
             },
@@ -82,6 +104,7 @@ class PluginDownload(object):
         if not config.get('path'):
             config['require_path'] = True
         config.setdefault('fail_html', True)
+        config.setdefault('parallel', 1)
         return config
 
     def on_task_download(self, task, config):
@@ -95,6 +118,7 @@ class PluginDownload(object):
             require_path=config.get('require_path', False),
             fail_html=config['fail_html'],
             tmp_path=tmp,
+            parallel=config['parallel'],
         )
 
     def get_temp_file(
@@ -105,6 +129,7 @@ class PluginDownload(object):
         handle_magnets=False,
         fail_html=True,
         tmp_path=tempfile.gettempdir(),
+        host_slots=None,
     ):
         """
         Download entry content and store in temporary folder.
@@ -119,6 +144,23 @@ class PluginDownload(object):
           fail entries which url respond with html content
         :param tmp_path:
           path to use for temporary files while downloading
+        :param host_slots:
+          :class:`HostSlots` limiting simultaneous downloads per host, when downloading in parallel
+        """
+        error = self.download_urls(
+            task, entry, require_path, handle_magnets, fail_html, tmp_path, host_slots
+        )
+        if error:
+            entry.fail(error)
+
+    def download_urls(
+        self, task, entry, require_path, handle_magnets, fail_html, tmp_path, host_slots=None
+    ):
+        """
+        Tries the urls of `entry` until one of them is downloaded. Doesn't fail the entry, so that it can be used from
+        helper threads.
+
+        :return: The reason to fail the entry with, if none of the urls could be downloaded.
         """
         if entry.get('urls'):
             urls = entry.get('urls')
@@ -140,7 +182,7 @@ class PluginDownload(object):
                 # Don't fail here, there might be a magnet later in the list of urls
                 log.debug('Skipping url %s because there is no path for download', url)
                 continue
-            error = self.process_entry(task, entry, url, tmp_path)
+            error = self.process_entry(task, entry, url, tmp_path, host_slots)
 
             # disallow html content
             html_mimes = ['html', 'text/html']
@@ -162,14 +204,12 @@ class PluginDownload(object):
             # check if entry must have a path (download: yes)
             if require_path and 'path' not in entry:
                 log.error('%s can\'t be downloaded, no path specified for entry', entry['title'])
-                entry.fail('no path specified for entry')
-            else:
-                entry.fail(', '.join(errors))
+                return 'no path specified for entry'
+            return ', '.join(errors)
 
     def save_error_page(self, entry, task, page):
         received = os.path.join(task.manager.config_base, 'received', task.name)
-        if not os.path.isdir(received):
-            os.makedirs(received)
+        makedirs(received)
         filename = os.path.join(received, pathscrub('%s.error' % entry['title'], filename=True))
         log.error(
             'Error retrieving %s, the error page has been saved to %s', entry['title'], filename
@@ -184,6 +224,7 @@ class PluginDownload(object):
         handle_magnets=False,
         fail_html=True,
         tmp_path=tempfile.gettempdir(),
+        parallel=1,
     ):
         """Download all task content and store in temporary folder.
 
@@ -196,12 +237,58 @@ class PluginDownload(object):
           fail entries which url respond with html content
         :param tmp_path:
           path to use for temporary files while downloading
+        :param int parallel:
+          maximum amount of simultaneous downloads
         """
-        for entry in task.accepted:
-            self.get_temp_file(task, entry, require_path, handle_magnets, fail_html, tmp_path)
+        self.remove_stale_partials(tmp_path)
+        entries = list(task.accepted)
+        if parallel <= 1 or len(entries) <= 1 or task.options.test:
+            for entry in entries:
+                self.get_temp_file(task, entry, require_path, handle_magnets, fail_html, tmp_path)
+            return
+
+        log.verbose('Downloading %s entries, %s at a time', len(entries), parallel)
+        host_slots = HostSlots(MAX_HOST_CONNECTIONS)
+        pending = iter(enumerate(entries))
+        lock = threading.Lock()
+        errors = []
+        # Reasons to fail entries with by their position, entries are failed from the task thread
+        failures = {}
+        # Make log messages from helper threads look like they came from this task
+        context = dict(vars(logger.local_context))
+
+        def worker():
+            vars(logger.local_context).update(context)
+            while not errors:
+                with lock:
+                    index, entry = next(pending, (None, None))
+                if entry is None:
+                    return
+                try:
+                    failures[index] = self.download_urls(
+                        task, entry, require_path, handle_magnets, fail_html, tmp_path, host_slots
+                    )
+                except Exception as e:
+                    # Stop handing out downloads, the error is raised from the task thread below
+                    errors.append(e)
+
+        threads = [
+            threading.Thread(target=worker, name='download-%d' % i)
+            for i in range(min(parallel, len(entries)))
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for index in sorted(failures):
+            if failures[index]:
+                entries[index].fail(failures[index])
+        if errors:
+            raise errors[0]
 
     # TODO: a bit silly method, should be get rid of now with simplier exceptions ?
-    def process_entry(self, task, entry, url, tmp_path):
+    def process_entry(self, task, entry, url, tmp_path, host_slots=None):
         """
         Processes `entry` by using `url`. Does not use entry['url'].
         Does not fail the `entry` if there is a network issue, instead just logs and returns a string error.
@@ -210,15 +297,21 @@ class PluginDownload(object):
         :param entry: Entry
         :param url: Url to try download
         :param tmp_path: Path to store temporary files
+        :param host_slots: Optional :class:`HostSlots` to limit simultaneous downloads per host
         :return: String error, if failed.
         """
+        error = None
         try:
             if task.options.test:
                 log.info('Would download: %s', entry['title'])
             else:
                 if not task.manager.unit_test:
                     log.info('Downloading: %s', entry['title'])
-                self.download_entry(task, entry, url, tmp_path)
+                if host_slots:
+                    with host_slots.acquire(url):
+                        error = self.download_entry(task, entry, url, tmp_path)
+                else:
+                    error = self.download_entry(task, entry, url, tmp_path)
         except RequestException as e:
             log.warning('RequestException %s, while downloading %s', e, url)
             return 'Network error during request: %s' % e
@@ -238,10 +331,12 @@ class PluginDownload(object):
             log.warning(msg)
             log.debug(msg, exc_info=True)
             return msg
+        return error
 
     def download_entry(self, task, entry, url, tmp_path):
         """Downloads `entry` by using `url`.
 
+        :return: String error, if the download failed for a reason other than an exception.
         :raises: Several types of exceptions ...
         :raises: PluginWarning
         """
@@ -256,7 +351,8 @@ class PluginDownload(object):
                 'Custom auth enabled for %s download: %s', entry['title'], entry['download_auth']
             )
 
-        headers = task.requests.headers
+        # Copy, so that custom headers don't leak into other requests of the session
+        headers = task.requests.headers.copy()
         if 'download_headers' in entry:
             headers.update(entry['download_headers'])
             log.debug(
@@ -265,27 +361,12 @@ class PluginDownload(object):
                 entry['download_headers'],
             )
 
-        try:
-            response = task.requests.get(url, auth=auth, raise_status=False, headers=headers)
-        except UnicodeError:
-            log.error('Unicode error while encoding url %s', url)
-            return
-        if response.status_code != 200:
-            log.debug('Got %s response from server. Saving error page.', response.status_code)
-            # Save the error page
-            if response.content:
-                self.save_error_page(entry, task, response.content)
-            # Raise the error
-            response.raise_for_status()
-            return
-
         # expand ~ in temp path
         # TODO jinja?
         try:
             tmp_path = os.path.expanduser(tmp_path)
         except RenderError as e:
-            entry.fail('Could not set temp path. Error during string replacement: %s' % e)
-            return
+            return 'Could not set temp path. Error during string replacement: %s' % e
 
         # Clean illegal characters from temp path name
         tmp_path = pathscrub(tmp_path)
@@ -293,26 +374,64 @@ class PluginDownload(object):
         # create if missing
         if not os.path.isdir(tmp_path):
             log.debug('creating tmp_path %s' % tmp_path)
-            os.mkdir(tmp_path)
+            makedirs(tmp_path)
 
         # check for write-access
         if not os.access(tmp_path, os.W_OK):
             raise plugin.PluginError('Not allowed to write to temp directory `%s`' % tmp_path)
 
-        # download and write data into a temp file
-        tmp_dir = tempfile.mkdtemp(dir=tmp_path)
-        fname = hashlib.md5(url.encode('utf-8', 'replace')).hexdigest()
-        datafile = os.path.join(tmp_dir, fname)
-        outfile = io.open(datafile, 'wb')
+        # Data is downloaded into a partial file, which is kept when the download is interrupted. It is named after
+        # the task and entry too, so that downloads of the same url by other entries or tasks don't share it.
+        fname = hashlib.md5(
+            ('%s\n%s\n%s' % (task.name, entry['title'], url)).encode('utf-8', 'replace')
+        ).hexdigest()
+        partfile = os.path.join(tmp_path, fname + '.part')
+        offset = self.resume_headers(partfile, headers)
+
+        try:
+            response = task.requests.get(url, auth=auth, raise_status=False, headers=headers)
+        except UnicodeError:
+            log.error('Unicode error while encoding url %s', url)
+            return
+        if offset and response.status_code == 416:
+            log.debug('Server can\'t resume the download of %s, starting over', url)
+            self.remove_partial(partfile)
+            return self.download_entry(task, entry, url, tmp_path)
+        if response.status_code not in (200, 206):
+            log.debug('Got %s response from server. Saving error page.', response.status_code)
+            # Save the error page
+            if response.content:
+                self.save_error_page(entry, task, response.content)
+            # Raise the error
+            response.raise_for_status()
+            return
+
+        if response.status_code == 206:
+            content_range = response.headers.get('content-range', '')
+            if not content_range.startswith('bytes %d-' % offset):
+                self.remove_partial(partfile)
+                raise RequestException('Unexpected content range `%s` from server' % content_range)
+            log.verbose('Resuming download of %s from %s bytes', entry['title'], offset)
+            mode = 'ab'
+        else:
+            offset = 0
+            mode = 'wb'
+            self.save_validator(partfile, response)
+
+        # download and write data into the partial file
+        outfile = io.open(partfile, mode)
         try:
             for chunk in response.iter_content(chunk_size=150 * 1024, decode_unicode=False):
                 outfile.write(chunk)
         except Exception as e:
-            # don't leave futile files behind
             # outfile has to be closed before we can delete it on Windows
             outfile.close()
-            log.debug('Download interrupted, removing datafile')
-            os.remove(datafile)
+            if self.can_resume(response):
+                log.debug('Download interrupted, keeping partial file to resume later')
+            else:
+                # don't leave futile files behind
+                log.debug('Download interrupted, removing partial file')
+                self.remove_partial(partfile)
             if isinstance(e, socket.timeout):
                 log.error('Timeout while downloading file')
             else:
@@ -320,10 +439,14 @@ class PluginDownload(object):
         else:
             outfile.close()
             # Do a sanity check on downloaded file
-            if os.path.getsize(datafile) == 0:
-                entry.fail('File %s is 0 bytes in size' % datafile)
-                os.remove(datafile)
-                return
+            if os.path.getsize(partfile) == 0:
+                self.remove_partial(partfile)
+                return 'File %s is 0 bytes in size' % partfile
+            # Move the finished download into its own temp dir, this is a rename on the same filesystem
+            tmp_dir = tempfile.mkdtemp(dir=tmp_path)
+            datafile = os.path.join(tmp_dir, fname)
+            os.rename(partfile, datafile)
+            self.remove_partial(partfile)
             # store temp filename into entry so other plugins may read and modify content
             # temp file is moved into final destination at self.output
             entry['file'] = datafile
@@ -337,7 +460,12 @@ class PluginDownload(object):
         content_encoding = response.headers.get('content-encoding', '')
         decompress = 'gzip' in content_encoding or 'deflate' in content_encoding
         if 'content-length' in response.headers and not decompress:
-            entry['content-length'] = int(response.headers['content-length'])
+            length = int(response.headers['content-length'])
+            if response.status_code == 206:
+                # Only the rest of the file was sent, the size of the file is in the range `bytes a-b/size`
+                size = response.headers['content-range'].rpartition('/')[2]
+                length = int(size) if size.isdigit() else offset + length
+            entry['content-length'] = length
 
         # prefer content-disposition naming, note: content-disposition can be disabled completely
         # by setting entry field `content-disposition` to False
@@ -353,6 +481,71 @@ class PluginDownload(object):
             entry['filename'] = filename
         log.debug('Finishing download_entry() with filename %s', entry.get('filename'))
 
+    @staticmethod
+    def resume_headers(partfile, headers):
+        """
+        Adds headers to resume a previously interrupted download, if there is one.
+
+        :return: Amount of bytes already downloaded, 0 if there is nothing to resume
+        """
+        try:
+            offset = os.path.getsize(partfile)
+            with io.open(partfile + '.validator', 'r', encoding='utf-8') as f:
+                validator = f.read().strip()
+        except (IOError, OSError):
+            return 0
+        if not offset or not validator:
+            return 0
+        headers['Range'] = 'bytes=%d-' % offset
+        # Server will send the whole file again if it has changed since
+        headers['If-Range'] = validator
+        # Ranges refer to the encoded content, make sure we get it as is
+        headers['Accept-Encoding'] = 'identity'
+        return offset
+
+    @staticmethod
+    def can_resume(response):
+        return (
+            response.headers.get('accept-ranges') == 'bytes'
+            and not response.headers.get('content-encoding')
+            and bool(response.headers.get('etag') or response.headers.get('last-modified'))
+        )
+
+    def save_validator(self, partfile, response):
+        """Stores what we need to check that the file hasn't changed when resuming the download."""
+        if not self.can_resume(response):
+            self.remove_partial(partfile)
+            return
+        validator = response.headers.get('etag') or response.headers.get('last-modified')
+        with io.open(partfile + '.validator', 'w', encoding='utf-8') as f:
+            f.write(native_str_to_text(validator, encoding='latin1'))
+
+    @staticmethod
+    def remove_stale_partials(tmp_path):
+        """Removes the partial downloads of entries which haven't come back to be resumed in a while."""
+        tmp_path = pathscrub(os.path.expanduser(tmp_path))
+        try:
+            names = os.listdir(tmp_path)
+        except OSError:
+            return
+        expired = time.time() - PARTIAL_MAX_AGE
+        for name in names:
+            if not PARTIAL_FILE.match(name):
+                continue
+            filename = os.path.join(tmp_path, name)
+            try:
+                if os.path.getmtime(filename) < expired:
+                    log.debug('Removing stale partial download %s', filename)
+                    os.remove(filename)
+            except OSError as e:
+                log.debug('Could not remove stale partial download %s: %s', filename, e)
+
+    @staticmethod
+    def remove_partial(partfile):
+        for filename in (partfile, partfile + '.validator'):
+            if os.path.exists(filename):
+                os.remove(filename)
+
     def filename_from_headers(self, entry, response):
         """Checks entry filename if it's found from content-disposition"""
         if not response.headers.get('content-disposition'):
@@ -558,6 +751,32 @@ class PluginDownload(object):
             self.cleanup_temp_file(entry)
 
 
+def makedirs(path):
+    """Creates `path` if it doesn't exist yet, safe for use from several threads at once."""
+    try:
+        os.makedirs(path)
+    except OSError:
+        if not os.path.isdir(path):
+            raise
+
+
+class HostSlots(object):
+    """Limits the amount of simultaneous downloads from each host."""
+
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self.semaphores = {}
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, url):
+        host = urlparse(url).hostname
+        with self.lock:
+            semaphore = self.semaphores.setdefault(host, threading.BoundedSemaphore(self.per_host))
+        with semaphore:
+            yield
+
+
 @event('plugin.register')
 def register_plugin():
     plugin.register(PluginDownload, 'download', api_ver=2)
@@ -14,7 +14,7 @@ from sqlalchemy import Column, Integer, String, Unicode
 from flexget import config_schema, db_schema
 from flexget.entry import EntryUnicodeError
 from flexget.event import event, fire_event
-from flexget.logger import capture_output
+from flexget.logger import capture_output, plugin_logging
 from flexget.manager import Session
 from flexget.plugin import plugins as all_plugins
 from flexget.plugin import (
@@ -26,7 +26,7 @@ from flexget.plugin import (
     PluginWarning,
     task_phases,
 )
-from flexget.utils import requests
+from flexget.utils import requests, tracing
 from flexget.utils.database import with_session
 from flexget.utils.simple_persistence import SimpleTaskPersistence
 from flexget.utils.tools import get_config_hash, MergeException, merge_dict_from_to
@@ -482,11 +482,12 @@ class Task(object):
                 args = (self, copy.copy(self.config.get(plugin.name)))
 
             # Hack to make task.session only active for a single plugin
-            with Session() as session:
+            with Session() as session, plugin_logging(plugin.name):
                 self.session = session
                 try:
                     fire_event('task.execute.before_plugin', self, plugin.name)
-                    response = self.__run_plugin(plugin, phase, args)
+                    with tracing.span(plugin.name, 'plugin'):
+                        response = self.__run_plugin(plugin, phase, args)
                     if phase == 'input' and response:
                         # add entries returned by input to self.all_entries
                         for e in response:
@@ -656,13 +657,15 @@ class Task(object):
                     log.debug('not running task_exit yet because task will rerun')
                 else:
                     # run all plugins with this phase
-                    self.__run_task_phase(phase)
+                    with tracing.span(phase, 'phase'):
+                        self.__run_task_phase(phase)
                     if phase == 'start':
                         # Store a copy of the config state after start phase to restore for reruns
                         self.prepared_config = copy.deepcopy(self.config)
         except TaskAbort:
             try:
-                self.__run_task_phase('abort')
+                with tracing.span('abort', 'phase'):
+                    self.__run_task_phase('abort')
             except TaskAbort as e:
                 log.exception('abort handlers aborted: %s' % e)
             raise
@@ -689,27 +692,28 @@ class Task(object):
             if self.options.cron:
                 self.manager.db_cleanup()
             fire_event('task.execute.started', self)
-            while True:
-                self._execute()
-                # rerun task
-                if (
-                    self._rerun
-                    and self._rerun_count < self.max_reruns
-                    and self._rerun_count < Task.RERUN_MAX
-                ):
-                    log.info('Rerunning the task in case better resolution can be achieved.')
-                    self._rerun_count += 1
-                    # TODO: Potential optimization is to take snapshots (maybe make the ones backlog uses built in
-                    # instead of taking another one) after input and just inject the same entries for the rerun
-                    self._all_entries = EntryContainer()
-                    self._rerun = False
-                    continue
-                elif self._rerun:
-                    log.info(
-                        'Task has been re-run %s times already, stopping for now'
-                        % self._rerun_count
-                    )
-                break
+            with tracing.trace_task(self):
+                while True:
+                    self._execute()
+                    # rerun task
+                    if (
+                        self._rerun
+                        and self._rerun_count < self.max_reruns
+                        and self._rerun_count < Task.RERUN_MAX
+                    ):
+                        log.info('Rerunning the task in case better resolution can be achieved.')
+                        self._rerun_count += 1
+                        # TODO: Potential optimization is to take snapshots (maybe make the ones backlog uses built in
+                        # instead of taking another one) after input and just inject the same entries for the rerun
+                        self._all_entries = EntryContainer()
+                        self._rerun = False
+                        continue
+                    elif self._rerun:
+                        log.info(
+                            'Task has been re-run %s times already, stopping for now'
+                            % self._rerun_count
+                        )
+                    break
             fire_event('task.execute.completed', self)
         finally:
             self.finished_event.set()
@@ -10,6 +10,7 @@ import time
 from sqlalchemy.exc import ProgrammingError, OperationalError
 
 from flexget.task import TaskAbort
+from flexget.utils import metrics
 
 log = logging.getLogger('task_queue')
 
@@ -44,6 +45,10 @@ class TaskQueue(object):
                 if self._shutdown_when_finished:
                     self._shutdown_now = True
                 continue
+            metrics.task_queue_depth.set(self.run_queue.qsize())
+            queued_at = getattr(self.current_task, 'queued_at', None)
+            if queued_at is not None:
+                metrics.task_queue_wait.observe(time.time() - queued_at)
             try:
                 self.current_task.execute()
             except TaskAbort as e:
@@ -72,7 +77,9 @@ class TaskQueue(object):
 
     def put(self, task):
         """Adds a task to be executed to the queue."""
+        task.queued_at = time.time()
         self.run_queue.put(task)
+        metrics.task_queue_depth.set(self.run_queue.qsize())
 
     def __len__(self):
         return self.run_queue.qsize()
@@ -9,7 +9,7 @@ from mock import patch
 
 from flexget import __version__
 from flexget.api.app import __version__ as __api_version__, base_message
-from flexget.api.core.server import ObjectsContainer as OC
+from flexget.api.core.server import LogParser, ObjectsContainer as OC
 from flexget.manager import Manager
 from flexget.tests.conftest import MockManager
 from flexget.utils.tools import get_latest_flexget_version_number
@@ -34,6 +34,14 @@ class TestServerAPI(object):
         assert not errors
         assert data['pid'] == os.getpid()
 
+    def test_metrics(self, api_client):
+        rsp = api_client.get('/server/metrics/')
+        assert rsp.status_code == 200
+        assert rsp.mimetype == 'text/plain'
+        data = rsp.get_data(as_text=True)
+        assert '# TYPE flexget_task_queue_depth gauge' in data
+        assert 'flexget_task_queue_depth 0' in data
+
     @patch.object(MockManager, 'load_config')
     def test_reload(self, mocked_load_config, api_client, schema_match):
         payload = {'operation': 'reload'}
@@ -131,3 +139,33 @@ class TestServerAPI(object):
         assert not errors
 
         assert len(data) == 2
+
+
+class TestLogParser(object):
+    text_line = '2019-01-01 10:00 INFO     seen          some_task       Rejected entry'
+    json_line = json.dumps(
+        {
+            'timestamp': '2019-01-01 10:00:00',
+            'log_level': 'WARNING',
+            'logger': 'requests',
+            'plugin': 'rss',
+            'task': 'other task',
+            'session_id': '',
+            'message': 'Timed out',
+        }
+    )
+
+    def test_fields(self):
+        assert LogParser(None, task='Some_Task').matches(self.text_line)
+        assert not LogParser(None, task='other task').matches(self.text_line)
+        assert LogParser(None, plugin='seen').matches(self.text_line)
+        assert LogParser(None, plugin='rss').matches(self.json_line)
+        assert LogParser(None, plugin='requests').matches(self.json_line)
+        assert not LogParser(None, level='warning').matches(self.text_line)
+        assert LogParser(None, level='warning', task='other task').matches(self.json_line)
+
+    def test_json_string(self):
+        parser = LogParser('timed')
+        assert parser.matches(self.json_line)
+        assert json.loads(parser.json_string(self.json_line))['plugin'] == 'rss'
+        assert json.loads(parser.json_string(self.text_line))['plugin'] == 'seen'
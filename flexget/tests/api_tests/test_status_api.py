@@ -7,7 +7,7 @@ from flexget.api.app import base_message
 
 from flexget.manager import Session
 from flexget.components.status.api import ObjectsContainer as OC
-from flexget.components.status.db import StatusTask, TaskExecution
+from flexget.components.status.db import StatusTask, TaskExecution, add_execution
 from flexget.utils import json
 
 
@@ -327,3 +327,50 @@ class TestTaskStatusPagination(object):
         data = json.loads(rsp.get_data(as_text=True))
 
         assert data[0]['produced'] == 10
+
+
+class TestStatusRollupsAPI(object):
+    config = "{'tasks': {}}"
+
+    def test_status_rollups(self, api_client, schema_match):
+        rsp = api_client.get('/status/1/rollups/')
+        assert rsp.status_code == 404
+
+        now = datetime.now()
+        with Session() as session:
+            st1 = StatusTask()
+            st1.name = 'status task 1'
+            session.add(st1)
+            session.flush()
+            for days, seconds, succeeded in ((0, 10, True), (0, 20, False), (3, 30, True)):
+                ex = TaskExecution()
+                ex.task_id = st1.id
+                ex.start = now - timedelta(days=days)
+                ex.end = ex.start + timedelta(seconds=seconds)
+                ex.succeeded = succeeded
+                ex.produced = 1
+                session.add(ex)
+                session.flush()
+                add_execution(ex, session)
+
+        rsp = api_client.get('/status/1/rollups/')
+        assert rsp.status_code == 200
+        data = json.loads(rsp.get_data(as_text=True))
+        errors = schema_match(OC.rollups_schema, data)
+        assert not errors
+        assert data['period'] == 'day'
+        assert len(data['rollups']) == 2
+        assert data['summary']['executions'] == 3
+        assert data['summary']['produced'] == 3
+        assert data['summary']['duration_max'] == 30
+        assert data['rollups'][-1]['aborted'] == 1
+
+        start_date = (now - timedelta(days=1)).strftime('%Y-%m-%d')
+        rsp = api_client.get('/status/1/rollups/?period=hour&start_date=%s' % start_date)
+        assert rsp.status_code == 200
+        data = json.loads(rsp.get_data(as_text=True))
+        errors = schema_match(OC.rollups_schema, data)
+        assert not errors
+        assert data['period'] == 'hour'
+        assert data['summary']['executions'] == 2
+        assert data['summary']['abort_rate'] == 0.5
@@ -15,9 +15,84 @@ class TestCrossmatch(object):
                 - title: entry 2
               action: reject
               fields: [title]
+
+          test_case_insensitive:
+            mock:
+            - title: Entry 1
+            - title: entry 2
+            crossmatch:
+              from:
+              - mock:
+                - title: ENTRY 1
+              action: accept
+              case_sensitive: no
+              fields: [title]
+
+          test_not_exact:
+            mock:
+            - title: entry 1
+            - title: the entry 2 extended
+            - title: other
+            - title: entr
+            crossmatch:
+              from:
+              - mock:
+                - title: entry 1 extended
+                - title: entry 2
+              action: accept
+              exact: no
+              fields: [title]
+
+          test_all_fields:
+            mock:
+            - {title: entry 1, imdb_id: tt1}
+            - {title: entry 2, imdb_id: tt2}
+            crossmatch:
+              from:
+              - mock:
+                - {title: entry 1, imdb_id: tt1, extra: 1}
+                - {title: entry 3, imdb_id: tt2}
+              action: accept
+              all_fields: yes
+              fields: [title, imdb_id]
+
+          test_copy_fields:
+            mock:
+            - {title: entry 1, imdb_id: tt1}
+            crossmatch:
+              from:
+              - mock:
+                - {title: entry 1, imdb_id: tt2, first: 1}
+                - {title: other, imdb_id: tt1, first: 2, second: 2}
+              action: accept
+              fields: [title, imdb_id]
     """
 
     def test_reject_title(self, execute_task):
         task = execute_task('test_title')
         assert task.find_entry('rejected', title='entry 2')
         assert len(task.rejected) == 1
+
+    def test_case_insensitive(self, execute_task):
+        task = execute_task('test_case_insensitive')
+        assert task.find_entry('accepted', title='Entry 1')
+        assert len(task.accepted) == 1
+
+    def test_not_exact(self, execute_task):
+        task = execute_task('test_not_exact')
+        assert task.find_entry('accepted', title='entry 1'), 'contained in a generated title'
+        assert task.find_entry('accepted', title='the entry 2 extended'), 'contains a generated title'
+        assert task.find_entry('accepted', title='entr'), 'contained in both generated titles'
+        assert len(task.accepted) == 3
+
+    def test_all_fields(self, execute_task):
+        task = execute_task('test_all_fields')
+        assert task.find_entry('accepted', title='entry 1', extra=1)
+        assert len(task.accepted) == 1
+
+    def test_copy_fields(self, execute_task):
+        task = execute_task('test_copy_fields')
+        entry = task.find_entry('accepted', title='entry 1')
+        assert entry['first'] == 1, 'fields of the first intersecting entry should be copied first'
+        assert entry['second'] == 2
+        assert entry['imdb_id'] == 'tt1'
@@ -1,9 +1,12 @@
 from __future__ import unicode_literals, division, absolute_import
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
+import io
 import pytest
 import sys
 import os
+import threading
+import time
 
 from jinja2 import Template
 
@@ -181,3 +184,148 @@ class TestDownloadAuth(object):
 
         task = execute_task('with_auth')
         assert len(task.accepted) == 2
+
+
+class TestDownloadParallel(object):
+    _config = """
+        tasks:
+          parallel:
+            mock:
+            {% for i in range(6) %}
+              - {title: 'entry {{ i }}', url: 'file:///{{ source }}/{{ i }}.txt', filename: '{{ i }}.txt'}
+            {% endfor %}
+            accept_all: yes
+            download:
+              path: {{ dest }}
+              temp: {{ temp }}
+              parallel: 3
+    """
+
+    @pytest.fixture
+    def config(self, tmpdir):
+        source = tmpdir.mkdir('source')
+        for i in range(6):
+            source.join('%d.txt' % i).write('content %d' % i)
+        return Template(self._config).render(
+            {
+                'source': source.strpath.lstrip('/'),
+                'dest': tmpdir.mkdir('dest').strpath,
+                'temp': tmpdir.mkdir('temp').strpath,
+            }
+        )
+
+    def test_parallel(self, execute_task, tmpdir):
+        task = execute_task('parallel')
+        assert len(task.accepted) == 6
+        for i in range(6):
+            assert tmpdir.join('dest', '%d.txt' % i).read() == 'content %d' % i
+        assert not tmpdir.join('temp').listdir(), 'temp files should have been cleaned up'
+
+    def test_failures_on_task_thread(self, execute_task, tmpdir, monkeypatch):
+        from flexget.entry import Entry
+
+        tmpdir.join('source', '2.txt').remove()
+        tmpdir.join('source', '4.txt').remove()
+        failed_on = []
+        fail = Entry.fail
+
+        def record_fail(entry, *args, **kwargs):
+            failed_on.append((entry['title'], threading.current_thread()))
+            return fail(entry, *args, **kwargs)
+
+        monkeypatch.setattr(Entry, 'fail', record_fail)
+        execute_task('parallel')
+        assert failed_on[:2] == [
+            ('entry 2', threading.current_thread()),
+            ('entry 4', threading.current_thread()),
+        ]
+
+
+class TestDownloadResume(object):
+    _config = """
+        tasks:
+          resume:
+            mock:
+              - {title: 'resumed', url: 'http://localhost/resumed.torrent'}
+            accept_all: yes
+            download:
+              path: __tmp__/dest
+              temp: __tmp__/temp
+    """
+
+    @pytest.fixture
+    def config(self, tmpdir):
+        tmpdir.mkdir('dest')
+        tmpdir.mkdir('temp')
+        return self._config.replace('__tmp__', tmpdir.strpath)
+
+    def test_resume_download(self, execute_task, tmpdir, monkeypatch):
+        import hashlib
+
+        from requests import Response
+        from requests.structures import CaseInsensitiveDict
+
+        from flexget.utils import requests
+
+        with io.open(os.path.join(os.path.dirname(__file__), 'test.torrent'), 'rb') as f:
+            data = f.read()
+        name = hashlib.md5(b'resume\nresumed\nhttp://localhost/resumed.torrent').hexdigest()
+        tmpdir.join('temp', name + '.part').write_binary(data[:100])
+        tmpdir.join('temp', name + '.part.validator').write('"etag"')
+        sent_headers = []
+
+        def get(session, url, headers=None, **kwargs):
+            sent_headers.append(headers)
+            response = Response()
+            response.status_code = 206
+            response.url = url
+            response.headers = CaseInsensitiveDict(
+                {
+                    'content-type': 'application/x-bittorrent',
+                    'content-length': str(len(data) - 100),
+                    'content-range': 'bytes 100-%d/%d' % (len(data) - 1, len(data)),
+                    'accept-ranges': 'bytes',
+                    'etag': '"etag"',
+                }
+            )
+            response.raw = io.BytesIO(data[100:])
+            return response
+
+        monkeypatch.setattr(requests.Session, 'get', get)
+        task = execute_task('resume')
+        assert sent_headers[0]['Range'] == 'bytes=100-'
+        entry = task.find_entry('accepted', title='resumed')
+        assert entry, 'resumed torrent should not have failed the size check'
+        assert entry['content-length'] == len(data)
+        assert tmpdir.join('dest', 'resumed.torrent').read_binary() == data
+
+    def test_resume_headers(self, tmpdir):
+        from flexget.plugins.output.download import PluginDownload
+
+        partfile = tmpdir.join('abc.part')
+        headers = {}
+        assert PluginDownload.resume_headers(partfile.strpath, headers) == 0
+        assert not headers
+
+        partfile.write('12345')
+        tmpdir.join('abc.part.validator').write('"etag"')
+        assert PluginDownload.resume_headers(partfile.strpath, headers) == 5
+        assert headers['Range'] == 'bytes=5-'
+        assert headers['If-Range'] == '"etag"'
+
+    def test_remove_stale_partials(self, tmpdir):
+        from flexget.plugins.output.download import PluginDownload, PARTIAL_MAX_AGE
+
+        stale = tmpdir.join('a' * 32 + '.part')
+        stale_validator = tmpdir.join('a' * 32 + '.part.validator')
+        recent = tmpdir.join('b' * 32 + '.part')
+        other = tmpdir.join('notes.part')
+        for path in (stale, stale_validator, recent, other):
+            path.write('12345')
+        old = time.time() - PARTIAL_MAX_AGE - 60
+        for path in (stale, stale_validator, other):
+            os.utime(path.strpath, (old, old))
+        PluginDownload.remove_stale_partials(tmpdir.strpath)
+        assert sorted(path.basename for path in tmpdir.listdir()) == sorted(
+            [recent.basename, other.basename]
+        )
@@ -26,6 +26,23 @@ class TestDuplicates(object):
             duplicates:
               field: foo
               action: reject
+          duplicates_reject_group:
+            mock:
+              - {title: 'entry 1', url: 'http://foo.bar', another_field: 'bla'}
+              - {title: 'entry 2', url: 'http://foo.baz', another_field: 'bla'}
+              - {title: 'entry 3', url: 'http://foo.qux', another_field: 'bla'}
+              - {title: 'entry 4', url: 'http://foo.quux', another_field: 'other'}
+            duplicates:
+              field: another_field
+              action: reject
+          duplicates_list_field:
+            mock:
+              - {title: 'entry 1', url: 'http://foo.bar', list_field: ['a', 'b']}
+              - {title: 'entry 2', url: 'http://foo.baz', list_field: ['a', 'b']}
+              - {title: 'entry 3', url: 'http://foo.qux', list_field: ['b', 'a']}
+            duplicates:
+              field: list_field
+              action: accept
     """
 
     def test_duplicates_accept(self, execute_task):
@@ -42,3 +59,14 @@ class TestDuplicates(object):
         task = execute_task('duplicates_missing_field')
         assert len(task.accepted) == 0
         assert len(task.rejected) == 0
+
+    def test_duplicates_reject_group(self, execute_task):
+        task = execute_task('duplicates_reject_group')
+        assert len(task.rejected) == 2
+        assert task.find_entry('undecided', title='entry 3'), 'last duplicate should be kept'
+        assert task.find_entry('undecided', title='entry 4')
+
+    def test_duplicates_list_field(self, execute_task):
+        task = execute_task('duplicates_list_field')
+        assert len(task.accepted) == 2
+        assert task.find_entry('undecided', title='entry 3')
@@ -89,6 +89,17 @@ class TestExistsSeries(object):
             - title: jinja2 s01e01
             accept_all: yes
             exists_series: __tmp__
+          test_sequence:
+            mock:
+              - {title: 'Show Name - 123 [720p]'}
+              - {title: 'Show Name - 124 [720p]'}
+              - {title: '[Group] Show - 05 [720p]'}
+            series:
+              - show name:
+                  identified_by: sequence
+              - show:
+                  identified_by: sequence
+            exists_series: __tmp__
     """
 
     test_dirs = [
@@ -100,6 +111,8 @@ class TestExistsSeries(object):
         'jinja.s01e02',
         'jinja2/jinja2.s01e01',
         'invalid',
+        'Show Name - 123 [720p]',
+        '[Group] Show - 05 [720p]',
     ]
 
     @pytest.fixture(params=['internal', 'guessit'], ids=['internal', 'guessit'])
@@ -182,3 +195,26 @@ class TestExistsSeries(object):
         assert task.find_entry(
             'accepted', title='jinja s01e02'
         ), 'jinja s01e02 should have been accepted'
+
+    def test_sequence(self, execute_task):
+        """Exists_series plugin: episodes numbered by sequence are only found with the series name"""
+        task = execute_task('test_sequence')
+        assert task.find_entry('rejected', title='Show Name - 123 [720p]')
+        assert task.find_entry('rejected', title='[Group] Show - 05 [720p]')
+        assert task.find_entry('accepted', title='Show Name - 124 [720p]')
+
+    def test_files_parsed_once(self, execute_task, tmpdir):
+        """Files are parsed once per run, only the ones which need a series name once for each accepted series"""
+        from flexget.utils.file_index import get_index
+
+        execute_task('test_propers')
+        index = get_index(tmpdir.strpath)
+        names = sorted(info.name for info in index.entries())
+        # Parse kinds are ('series', parser) without a series name, ('series', parser, name) with one
+        nameless = [results for kind, results in index.parsed.items() if len(kind) == 2]
+        assert len(nameless) == 1
+        assert sorted(name for name, _, _ in nameless[0]) == names
+        for kind, results in index.parsed.items():
+            if len(kind) == 3:
+                assert kind[2] in ('mock', 'test')
+                assert len(results) < len(names)
@@ -0,0 +1,68 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import json
+
+from flexget.plugins.cli import explain_sql
+
+
+class TestSQLAudit(object):
+    config = """
+        tasks:
+          test:
+            mock:
+              - {title: 'entry 1'}
+            accept_all: yes
+            seen: local
+          aborting:
+            mock:
+              - {title: 'entry 2'}
+            seen: local
+            abort_if_exists:
+              regexp: entry
+              field: title
+    """
+
+    def test_recommends_index(self, manager):
+        with manager.engine.connect() as conn:
+            conn.execute('CREATE TABLE audit_test (id INTEGER PRIMARY KEY, name TEXT, value TEXT)')
+            conn.execute('CREATE INDEX ix_audit_test_value ON audit_test (value)')
+        audit = explain_sql.SQLAudit()
+        statements = [
+            'SELECT audit_test.id FROM audit_test WHERE audit_test.name = ?',
+            'SELECT a.id FROM audit_test AS a WHERE ? = a.name',
+            'SELECT audit_test.id FROM audit_test WHERE audit_test.value = ?',
+            'SELECT audit_test.id FROM audit_test WHERE audit_test.id = ? ORDER BY audit_test.name',
+        ]
+        for statement in statements:
+            audit.record(statement, ('x',) * statement.count('?'), 0.1, 'test', 'plugin')
+        audit.record(statements[0], ('y',), 0.2, 'test', 'other')
+        audit.explain(manager.engine)
+        first, second, by_value, by_id = [audit.statements[s] for s in statements]
+        assert first.calls == 2
+        assert first.plugins == set(['plugin', 'other'])
+        assert first.recommendations == ['CREATE INDEX ix_audit_test_name ON audit_test (name)']
+        assert second.recommendations == ['CREATE INDEX ix_audit_test_name ON audit_test (name)']
+        assert not by_value.problems
+        assert not by_id.problems
+        assert audit.flagged() == [first, second]
+
+    def test_audit_task(self, execute_task, tmpdir):
+        report = tmpdir.join('audit.json')
+        execute_task('test', options={'audit_sql': report.strpath})
+        statements = json.loads(report.read())
+        assert statements
+        assert all(s['tasks'] == ['test'] for s in statements)
+        assert any('seen' in s['plugins'] for s in statements)
+        assert all(s['plan'] is not None for s in statements)
+        # Queries outside of audited tasks are not captured
+        execute_task('test')
+        assert json.loads(report.read()) == statements
+
+    def test_audit_aborted_task(self, execute_task, tmpdir):
+        report = tmpdir.join('audit.json')
+        execute_task('aborting', abort=True, options={'audit_sql': report.strpath})
+        statements = json.loads(report.read())
+        assert statements
+        assert all(s['tasks'] == ['aborting'] for s in statements)
+        assert not explain_sql.current_audit()
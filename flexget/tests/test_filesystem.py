@@ -277,3 +277,68 @@ class TestFilesystem(object):
         task = execute_task(task_name)
 
         self.assert_check(task, task_name, 'positive', should_exist)
+
+
+class TestFilesystemIncremental(object):
+    config = """
+        tasks:
+          new:
+            filesystem:
+              path: __tmp__
+              recursive: yes
+              incremental: new
+          all:
+            filesystem:
+              path: __tmp__
+              recursive: yes
+              incremental: all
+          aborting:
+            filesystem:
+              path: __tmp__
+              incremental: new
+            abort_if_exists:
+              regexp: 'a'
+              field: title
+    """
+
+    def titles(self, task):
+        return sorted(entry['title'] for entry in task.all_entries)
+
+    def test_incremental_new(self, execute_task, tmpdir):
+        tmpdir.join('a.mkv').write('a')
+        tmpdir.mkdir('sub').join('b.mkv').write('b')
+        task = execute_task('new')
+        assert self.titles(task) == ['a', 'b', 'sub']
+        task = execute_task('new')
+        assert not task.all_entries, 'unchanged items should not be produced again'
+        tmpdir.join('sub', 'c.mkv').write('c')
+        task = execute_task('new')
+        # The directory changed along with its contents
+        assert self.titles(task) == ['c', 'sub']
+
+    def test_incremental_all(self, execute_task, tmpdir):
+        tmpdir.join('a.mkv').write('a')
+        task = execute_task('all')
+        assert self.titles(task) == ['a']
+        tmpdir.mkdir('sub').join('b.mkv').write('b')
+        task = execute_task('all')
+        assert self.titles(task) == ['a', 'b', 'sub']
+        tmpdir.join('a.mkv').remove()
+        task = execute_task('all')
+        assert self.titles(task) == ['b', 'sub']
+
+    def test_state_stored_when_task_finishes(self, execute_task, manager, tmpdir):
+        from flexget.manager import Session
+        from flexget.plugins.input.filesystem import DirectoryListing
+
+        tmpdir.join('a.mkv').write('a')
+        execute_task('aborting', abort=True)
+        with Session() as session:
+            assert not session.query(DirectoryListing).count()
+        del manager.config['tasks']['aborting']['abort_if_exists']
+        task = execute_task('aborting')
+        assert self.titles(task) == ['a'], 'items of an aborted run should be produced again'
+        with Session() as session:
+            assert session.query(DirectoryListing).filter(DirectoryListing.task == 'aborting').count()
+        task = execute_task('aborting')
+        assert not task.all_entries
@@ -0,0 +1,59 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import mock
+import pytest
+
+from flexget.utils.requests import FetchResult, Session
+
+
+@pytest.fixture()
+def pages(monkeypatch):
+    """Pages 0 and 1 have a link each, the ones after are empty. Returns the list of requested urls."""
+    requested = []
+
+    def get_many(self, urls, *args, **kwargs):
+        results = []
+        for url in urls:
+            requested.append(url)
+            number = int(url.rsplit('/', 1)[-1])
+            links = '<a href="http://example.com/%s.torrent">Entry %s</a>' % (number, number)
+            result = FetchResult(url)
+            result.response = mock.Mock(
+                status_code=200,
+                reason='OK',
+                content=('<html><body>%s</body></html>' % (links if number < 2 else '')).encode(),
+            )
+            results.append(result)
+        return results
+
+    monkeypatch.setattr(Session, 'get_many', get_many)
+    return requested
+
+
+class TestHtmlIncrement(object):
+    config = """
+        tasks:
+          stop_when_empty:
+            html:
+              url: 'http://example.com/page/{{i}}'
+              increment:
+                to: 5
+          no_stop_condition:
+            html:
+              url: 'http://example.com/page/{{i}}'
+              increment:
+                to: 5
+                stop_when_empty: no
+                entries_count: 0
+    """
+
+    def test_stops_requesting_at_empty_page(self, execute_task, pages):
+        task = execute_task('stop_when_empty')
+        assert len(task.all_entries) == 2
+        assert pages == ['http://example.com/page/%s' % i for i in range(3)]
+
+    def test_batches_without_stop_condition(self, execute_task, pages):
+        task = execute_task('no_stop_condition')
+        assert len(task.all_entries) == 2
+        assert pages == ['http://example.com/page/%s' % i for i in range(5)]
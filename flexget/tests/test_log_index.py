@@ -0,0 +1,197 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import gzip
+import io
+import json
+import logging
+import logging.handlers
+import os
+
+import pytest
+
+from flexget.api.core.server import LogParser
+from flexget.utils import log_index
+
+TASKS = ['movies', 'series', 'backlog']
+LEVELS = ['INFO', 'VERBOSE', 'DEBUG', 'WARNING']
+
+
+def text_line(number):
+    task = TASKS[number % 3] if number % 5 else ''
+    level = 'ERROR' if number == 77 else LEVELS[number % 4]
+    return '2019-01-01 10:%02d %-8s %-13s %-15s Entry number %s' % (
+        number // 60,
+        level,
+        'seen' if number % 2 else 'regexp',
+        task,
+        'unique%s' % number if number % 50 == 0 else number,
+    )
+
+
+def json_line(number):
+    return json.dumps(
+        {
+            'timestamp': '2019-01-01 11:%02d:00' % (number // 60),
+            'log_level': LEVELS[number % 4],
+            'logger': 'requests',
+            'plugin': 'rss' if number % 2 else '',
+            'task': TASKS[number % 3],
+            'session_id': 'session%s' % (number % 7),
+            'message': 'Request number %s' % number,
+        }
+    )
+
+
+def write(path, lines, mode='a'):
+    with io.open(path, mode, encoding='utf-8') as f:
+        f.write(''.join(line + '\n' for line in lines))
+
+
+def brute_force(paths, log_parser, limit):
+    found = []
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else io.open
+        with opener(path, 'rb') as f:
+            lines = f.read().decode('utf-8').split('\n')
+        found.extend(line for line in reversed(lines) if log_parser.matches(line))
+    return found[:limit]
+
+
+PARSERS = [
+    dict(query=None),
+    dict(query='unique100'),
+    dict(query='number and no seen'),
+    dict(query='"entry number"'),
+    dict(query='unique50 or unique150'),
+    dict(query=None, task='backlog'),
+    dict(query=None, task='nonexistent'),
+    dict(query=None, level='error'),
+    dict(query=None, plugin='rss'),
+    dict(query='request', session_id='session3'),
+    dict(query=None, since='2019-01-01 11:02:00'),
+]
+
+
+@pytest.fixture()
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(log_index, 'BLOCK_SIZE', 1024)
+
+
+@pytest.mark.usefixtures('small_blocks')
+class TestLogIndex(object):
+    @pytest.mark.parametrize('params', PARSERS)
+    def test_matches_full_scan(self, tmpdir, params):
+        filename = tmpdir.join('flexget.log').strpath
+        write(filename + '.2', [text_line(i) for i in range(200)])
+        write(filename + '.1', [json_line(i) for i in range(200)])
+        write(filename, [text_line(i) for i in range(200, 300)] + [json_line(i) for i in range(5)])
+        paths = [filename, filename + '.1', filename + '.2']
+        params = dict(params)
+        log_parser = LogParser(params.pop('query'), **params)
+        for limit in (1, 15, 1000):
+            found, size = log_index.LogIndex(filename).search(log_parser, limit)
+            assert found == brute_force(paths, log_parser, limit)
+            assert size == os.path.getsize(filename)
+
+    def test_skips_blocks(self, tmpdir):
+        filename = tmpdir.join('flexget.log').strpath
+        write(filename, [text_line(i) for i in range(300)])
+        index = log_index.LogIndex(filename)
+        index.update()
+        blocks = list(index.blocks.values())[0]
+        assert len(blocks) > 10
+        assert [b for b in blocks if b.may_match(LogParser('unique100'))] == [
+            b for b in blocks if b.start <= len(''.join(text_line(i) + '\n' for i in range(100)))
+        ][-1:]
+        assert not any(b.may_match(LogParser(None, task='nonexistent')) for b in blocks)
+        assert len([b for b in blocks if b.may_match(LogParser(None, level='error'))]) == 1
+
+    def test_incremental(self, tmpdir):
+        filename = tmpdir.join('flexget.log').strpath
+        write(filename, [text_line(i) for i in range(100)])
+        index = log_index.LogIndex(filename)
+        index.update()
+        found, size = index.search(LogParser(None), 1)
+        assert found == [text_line(99)]
+        indexed = sum(1 for _ in io.open(index.index_file))
+        assert indexed
+        # Lines which aren't indexed yet are searched too, a line which is still being written is left out
+        write(filename, [text_line(i) for i in range(100, 200)] + ['2019-01-01 incomplete'])
+        with io.open(filename, 'a', encoding='utf-8') as f:
+            f.write('2019-01-01 partial')
+        found, size = index.search(LogParser(None), 1)
+        assert found == ['2019-01-01 incomplete']
+        assert size == os.path.getsize(filename) - len('2019-01-01 partial')
+        assert sum(1 for _ in io.open(index.index_file)) == indexed
+        index.update()
+        assert sum(1 for _ in io.open(index.index_file)) > indexed
+        # A new index picks up the blocks from the sidecar file
+        reloaded = log_index.LogIndex(filename)
+        assert [b.to_dict() for b in reloaded.blocks[os.stat(filename).st_ino]] == [
+            b.to_dict() for b in index.blocks[os.stat(filename).st_ino]
+        ]
+
+    def test_rotation(self, tmpdir):
+        filename = tmpdir.join('flexget.log').strpath
+        write(filename, [text_line(i) for i in range(100)])
+        index = log_index.LogIndex(filename)
+        index.update()
+        inode = os.stat(filename).st_ino
+        blocks = list(index.blocks[inode])
+        os.rename(filename, filename + '.1')
+        write(filename, [text_line(i) for i in range(100, 150)])
+        found, _ = index.search(LogParser('unique50'), 10)
+        assert found == [text_line(50)]
+        index.update()
+        # Renamed files keep their blocks, the rest of the file is indexed now that it doesn't grow anymore
+        assert index.blocks[inode][: len(blocks)] == blocks
+        assert index.blocks[inode][-1].end == os.path.getsize(filename + '.1')
+
+        # Compressed files are indexed again, the blocks of the files which are gone are removed
+        with io.open(filename + '.1', 'rb') as f_in, gzip.open(filename + '.1.gz', 'wb') as f_out:
+            f_out.write(f_in.read())
+        os.remove(filename + '.1')
+        found, _ = index.search(LogParser('unique50'), 10)
+        assert found == [text_line(50)]
+        index.update()
+        assert inode not in index.blocks
+        stored = [json.loads(line)['inode'] for line in io.open(index.index_file)]
+        assert inode not in stored
+
+    def test_reused_inode(self, tmpdir):
+        filename = tmpdir.join('flexget.log').strpath
+        write(filename, [text_line(i) for i in range(100)])
+        index = log_index.LogIndex(filename)
+        index.update()
+        inode = os.stat(filename).st_ino
+        # Same inode, other lines, as when a removed log file's inode is given to a new one
+        write(filename, [json_line(i) for i in range(200)], mode='w')
+        assert os.stat(filename).st_ino == inode
+        log_parser = LogParser('request')
+        assert index.search(log_parser, 1000)[0] == brute_force([filename], log_parser, 1000)
+        index.update()
+        assert index.blocks[inode][0].head == log_index.file_head(filename)
+        assert index.search(log_parser, 1000)[0] == brute_force([filename], log_parser, 1000)
+
+
+@pytest.mark.usefixtures('small_blocks')
+def test_indexing_handler(tmpdir):
+    filename = tmpdir.join('flexget.log').strpath
+    file_handler = logging.handlers.RotatingFileHandler(filename, maxBytes=3000, backupCount=2)
+    file_handler.setFormatter(logging.Formatter('%(message)s'))
+    handler = log_index.IndexingHandler(file_handler)
+    try:
+        for number in range(100):
+            record = logging.makeLogRecord({'msg': text_line(number)})
+            file_handler.handle(record)
+            handler.handle(record)
+    finally:
+        file_handler.close()
+    index = handler.index
+    assert index is log_index.get_index(filename)
+    # The rotated files are indexed completely, the live one up to the last update
+    inodes = [os.stat(path).st_ino for path in index.files()]
+    assert len(inodes) == 3
+    assert all(index.blocks.get(inode) for inode in inodes[1:])
+    assert index.blocks[inodes[1]][-1].end == os.path.getsize(filename + '.1')
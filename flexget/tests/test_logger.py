@@ -0,0 +1,219 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import ast
+import gzip
+import io
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+
+import pytest
+
+import flexget
+from flexget import logger
+
+# Modules run for every entry, log calls in them must not format messages before the level is checked
+HOT_MODULES = [
+    'entry.py',
+    'utils/lazy_dict.py',
+    'utils/parsers/series.py',
+    'utils/qualities.py',
+    'components/parsing/parsers/parser_internal.py',
+    'components/seen/seen.py',
+    'components/series/series.py',
+    'plugins/filter/crossmatch.py',
+    'plugins/filter/regexp.py',
+]
+LOG_METHODS = ['trace', 'debug', 'verbose', 'info', 'warning', 'error', 'critical', 'exception']
+
+
+def is_eager(node):
+    """Whether an expression formats a string right away."""
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mod):
+        return True
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == 'format'
+    )
+
+
+def is_logger(node):
+    if isinstance(node, ast.Attribute):
+        return node.attr == 'log'
+    return isinstance(node, ast.Name) and node.id in ('log', 'logger')
+
+
+def is_level_guard(node):
+    return isinstance(node, ast.If) and any(
+        isinstance(child, ast.Call)
+        and isinstance(child.func, ast.Attribute)
+        and child.func.attr == 'isEnabledFor'
+        for child in ast.walk(node.test)
+    )
+
+
+def eager_log_calls(tree):
+    """Yields the line numbers of log calls with eagerly formatted messages, which are not guarded by a level check."""
+    stack = [tree]
+    while stack:
+        node = stack.pop()
+        if is_level_guard(node):
+            stack.extend(node.orelse)
+            continue
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Attribute)
+            and node.func.attr in LOG_METHODS
+            and is_logger(node.func.value)
+            and node.args
+            and is_eager(node.args[0])
+        ):
+            yield node.lineno
+        stack.extend(ast.iter_child_nodes(node))
+
+
+class TestLazyFormatting(object):
+    @pytest.mark.parametrize('module', HOT_MODULES)
+    def test_no_eager_formatting(self, module):
+        path = os.path.join(os.path.dirname(flexget.__file__), *module.split('/'))
+        with io.open(path, encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        assert not list(eager_log_calls(tree)), (
+            'Pass the arguments of log messages separately in %s' % module
+        )
+
+    def test_checker(self):
+        tree = ast.parse(
+            'log.debug("%s" % x)\n'
+            'log.debug("{}".format(x))\n'
+            'log.debug("%s", x)\n'
+            'if log.isEnabledFor(TRACE):\n'
+            '    log.trace("%s" % x)\n'
+        )
+        assert sorted(eager_log_calls(tree)) == [1, 2]
+
+
+class TestLogger(object):
+    def test_trace_disabled_does_not_format(self):
+        class Unformattable(object):
+            def __str__(self):
+                raise AssertionError('message was formatted')
+
+            __repr__ = __str__
+
+        log = logging.getLogger('test_logger')
+        assert isinstance(log, logger.FlexGetLogger)
+        old_level = log.level
+        log.setLevel(logging.DEBUG)
+        try:
+            log.trace('value %s', Unformattable())
+            log.verbose('value %r', 'fine')
+        finally:
+            log.setLevel(old_level)
+
+    def test_trace_enabled(self, caplog):
+        log = logging.getLogger('test_logger')
+        with caplog.at_level(logger.TRACE, logger='test_logger'):
+            log.trace('traced %s', 'value')
+        assert 'traced value' in caplog.text
+
+    def test_json_format(self):
+        log = logging.getLogger('test_logger')
+        with logger.task_logging('some task'), logger.plugin_logging('some_plugin'):
+            record = log.makeRecord(
+                'test_logger', logging.INFO, '', 0, 'a\nb %s', ('c',), None, None, None
+            )
+        data = json.loads(logger.JSONFormatter().format(record))
+        assert data['message'] == 'a\\nb c'
+        assert data['task'] == 'some task'
+        assert data['plugin'] == 'some_plugin'
+        assert data['logger'] == 'test_logger'
+        assert data['log_level'] == 'INFO'
+
+    @pytest.mark.skipif(
+        not hasattr(logging.handlers.RotatingFileHandler, 'rotation_filename'),
+        reason='rotated files can only be renamed on python 3.3+',
+    )
+    def test_compressed_rotation(self, tmpdir):
+        filename = tmpdir.join('flexget.log').strpath
+        handler = logger.CompressingRotatingFileHandler(filename, maxBytes=100, backupCount=2)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        try:
+            for i in range(3):
+                handler.emit(logging.makeLogRecord({'msg': str(i) * 80}))
+        finally:
+            handler.close()
+        assert sorted(os.listdir(tmpdir.strpath)) == [
+            'flexget.log',
+            'flexget.log.1.gz',
+            'flexget.log.2.gz',
+        ]
+        with gzip.open(filename + '.2.gz', 'rb') as f:
+            assert f.read().decode() == '0' * 80 + '\n'
+
+
+class TestQueuedLogging(object):
+    def record(self, level=logging.INFO, msg='message'):
+        return logging.makeLogRecord({'levelno': level, 'msg': msg, 'session_id': ''})
+
+    def test_drop_policy(self):
+        handler = logger.DroppingQueueHandler(queue.Queue(1))
+        handler.handle(self.record())
+        handler.handle(self.record())
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().msg == 'message'
+
+    def test_listener(self):
+        stream = io.StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(logging.Formatter('%(message)s'))
+        handler = logger.DroppingQueueHandler(queue.Queue(1))
+        listener = logger.LogListener(handler, [target])
+        handler.handle(self.record(msg='first %s'))
+        handler.handle(self.record(msg='dropped'))
+        listener.start()
+        try:
+            handler.handle(self.record(msg='second'))
+            listener.flush()
+        finally:
+            listener.stop()
+        assert stream.getvalue().splitlines() == [
+            'first %s',
+            '1 log messages were dropped, logging could not keep up',
+            'second',
+        ]
+
+    def test_suspend(self, monkeypatch):
+        stream = io.StringIO()
+        target = logging.StreamHandler(stream)
+        target.setFormatter(logging.Formatter('%(message)s'))
+        handler = logger.DroppingQueueHandler(queue.Queue(10))
+        listener = logger.LogListener(handler, [target])
+        monkeypatch.setattr(logger, '_listener', listener)
+        listener.start()
+        try:
+            logger.suspend()
+            assert not listener._thread
+            handler.handle(self.record(msg='while forking'))
+            assert not stream.getvalue()
+            logger.resume()
+            listener.flush()
+        finally:
+            listener.stop()
+        assert stream.getvalue() == 'while forking\n'
+
+    def test_wait_for_log(self):
+        writes = logger.log_writes()
+        assert logger.wait_for_log(writes, timeout=0.01) == writes
+        handler = logger.NotifyingHandler()
+        timer = threading.Timer(0.05, handler.handle, [self.record()])
+        timer.start()
+        try:
+            assert logger.wait_for_log(writes, timeout=5) == writes + 1
+        finally:
+            timer.cancel()
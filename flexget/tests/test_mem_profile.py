@@ -0,0 +1,76 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import json
+
+import pytest
+
+try:
+    from flexget.plugins.cli import mem_profile
+except ImportError:
+    mem_profile = None
+
+pytestmark = pytest.mark.skipif(mem_profile is None, reason='tracemalloc needs python 3.4+')
+
+
+class TestMemProfile(object):
+    config = """
+        tasks:
+          test:
+            mock:
+              - {title: 'entry 1'}
+              - {title: 'entry 2'}
+            accept_all: yes
+          other:
+            mock:
+              - {title: 'entry 3'}
+          aborting:
+            mock:
+              - {title: 'entry 4'}
+            abort_if_exists:
+              regexp: entry
+              field: title
+    """
+
+    @pytest.fixture(autouse=True)
+    def profiling(self, manager):
+        manager.options.mem_profile = True
+        yield
+        mem_profile.on_manager_shutdown(manager)
+        mem_profile._reports.clear()
+
+    def test_reports(self, execute_task, caplog):
+        execute_task('test')
+        report = mem_profile._reports['test']
+        assert ('input', 'mock') in [(p['phase'], p['plugin']) for p in report['plugins']]
+        assert 'input' in [p['phase'] for p in report['phases']]
+        # Nothing to compare with for the first run
+        assert report['survivors'] is None
+        assert 'Memory profile of task test' in caplog.text
+
+        # Other tasks are compared with their own previous runs
+        execute_task('other')
+        assert mem_profile._reports['other']['survivors'] is None
+
+        execute_task('test')
+        survivors = mem_profile._reports['test']['survivors']
+        assert [c['name'] for c in survivors['caches']] == list(mem_profile.CACHES)
+        assert 'Caches living as long as the process:' in caplog.text
+
+    def test_aborted(self, execute_task):
+        execute_task('aborting', abort=True)
+        assert not mem_profile._profiles
+        assert 'abort' in [p['phase'] for p in mem_profile._reports['aborting']['phases']]
+
+    def test_disabled(self, manager, execute_task):
+        manager.options.mem_profile = False
+        execute_task('test')
+        assert 'test' not in mem_profile._reports
+
+    def test_api(self, execute_task, api_client):
+        execute_task('test')
+        rsp = api_client.get('/server/memory/')
+        assert rsp.status_code == 200
+        data = json.loads(rsp.get_data(as_text=True))
+        assert data['tracing']
+        assert [report['task'] for report in data['tasks']] == ['test']
@@ -0,0 +1,72 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+from flexget.utils import metrics
+
+
+class TestRegistry(object):
+    def test_render(self):
+        registry = metrics.Registry()
+        counter = registry.counter('test_total', 'Test counter.', labels=['name'])
+        gauge = registry.gauge('test_gauge', 'Test gauge.')
+        counter.inc(name='a')
+        counter.inc(2, name='b "quoted"')
+        gauge.set(1.5)
+        assert registry.render().splitlines() == [
+            '# HELP test_total Test counter.',
+            '# TYPE test_total counter',
+            'test_total{name="a"} 1',
+            'test_total{name="b \\"quoted\\""} 2',
+            '# HELP test_gauge Test gauge.',
+            '# TYPE test_gauge gauge',
+            'test_gauge 1.5',
+        ]
+
+    def test_histogram(self):
+        registry = metrics.Registry()
+        histogram = registry.histogram('test_seconds', 'Test histogram.', buckets=(1, 10))
+        for value in (0.5, 5, 50):
+            histogram.observe(value)
+        lines = registry.render().splitlines()
+        assert lines[2:] == [
+            'test_seconds_bucket{le="1"} 1',
+            'test_seconds_bucket{le="10"} 2',
+            'test_seconds_bucket{le="+Inf"} 3',
+            'test_seconds_sum 55.5',
+            'test_seconds_count 3',
+        ]
+
+    def test_collector(self):
+        registry = metrics.Registry()
+        gauge = registry.gauge('test_gauge', 'Test gauge.')
+        registry.collector(lambda: gauge.set(3))
+        assert 'test_gauge 3' in registry.render()
+
+    def test_process_metrics(self):
+        lines = metrics.registry.render().splitlines()
+        assert '# TYPE python_gc_collections_total counter' in lines
+        assert any(line.startswith('python_gc_collections_total{generation="0"} ') for line in lines)
+
+
+class TestTaskMetrics(object):
+    config = """
+        tasks:
+          test:
+            mock:
+              - {title: 'entry 1'}
+              - {title: 'entry 2'}
+            accept_all: yes
+    """
+
+    def test_task_metrics(self, execute_task):
+        def count(metric, **labels):
+            return metric.values.get(metric._key(labels), 0)
+
+        accepted = count(metrics.task_entries, task='test', state='accepted')
+        calls = count(metrics.plugin_calls, phase='input', plugin='mock')
+        execute_task('test')
+        assert count(metrics.task_entries, task='test', state='accepted') == accepted + 2
+        assert count(metrics.plugin_calls, phase='input', plugin='mock') == calls + 1
+        assert metrics.task_duration._key({'task': 'test', 'succeeded': 'true'}) in (
+            metrics.task_duration.values
+        )
@@ -1,15 +1,23 @@
 from __future__ import unicode_literals, division, absolute_import
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
+import mock
+import pytest
+
 from flexget.components.parsing import plugin_parsing
+from flexget.components.parsing.parsers import parser_guessit
+from flexget.components.parsing.parsers.parser_guessit import ParserGuessit
 from flexget import plugin
 
 
 class TestParsingAPI(object):
     def test_all_types_handled(self):
         declared_types = set(plugin_parsing.PARSER_TYPES)
+        # Each type is handled by a parse_<type> and a parse_<type>_many method
         method_handlers = set(
-            m[6:] for m in dir(plugin.get('parsing', 'tests')) if m.startswith('parse_')
+            m[6:].replace('_many', '')
+            for m in dir(plugin.get('parsing', 'tests'))
+            if m.startswith('parse_')
         )
         assert set(declared_types) == set(
             method_handlers
@@ -38,3 +46,30 @@ class TestTaskParsing(object):
         # make sure when a non-default parser is installed on a task, it doesn't affect other tasks
         execute_task('explicit_parser')
         assert not plugin_parsing.selected_parsers
+
+
+class TestParseMany(object):
+    titles = [
+        'Some.Show.S01E02.720p.HDTV.x264-GRP',
+        'Some Show 2019-05-03 1080p WEB-DL',
+        'Other.Show.S03E04.PROPER.HDTV',
+        'Not a series at all',
+    ]
+
+    @pytest.mark.parametrize('pool', [False, True], ids=['serial', 'pool'])
+    def test_guessit_parse_many(self, pool):
+        parser = ParserGuessit()
+        min_batch = 1 if pool else 1000
+        with mock.patch.object(parser_guessit, 'POOL_MIN_BATCH', min_batch), mock.patch.object(
+            parser_guessit, 'POOL_CHUNK_SIZE', 2
+        ), mock.patch.object(parser_guessit.multiprocessing, 'cpu_count', return_value=2):
+            try:
+                series = parser.parse_series_many(self.titles, name='Some Show')
+                movies = parser.parse_movie_many(self.titles)
+                assert (parser_guessit._pool is not None) == pool
+            finally:
+                parser_guessit.close_pool(None)
+        assert [str(s) for s in series] == [
+            str(parser.parse_series(title, name='Some Show')) for title in self.titles
+        ]
+        assert [str(m) for m in movies] == [str(parser.parse_movie(title)) for title in self.titles]
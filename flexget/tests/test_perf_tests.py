@@ -0,0 +1,48 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+from flexget.manager import Session
+from flexget.plugins.cli import perf_tests
+
+
+class TestBenchmarks(object):
+    config = """
+        tasks: {}
+    """
+
+    def test_run_benchmarks(self, manager):
+        results = perf_tests.run_benchmarks(
+            manager, list(perf_tests.BENCHMARKS), rounds=2, scale=0.01
+        )
+        assert list(results) == list(perf_tests.BENCHMARKS)
+        for result in results.values():
+            assert result['items'] > 0
+            assert 0 <= result['min'] <= result['median']
+        # The real database is bound again afterwards
+        assert Session.kw['bind'] is manager.engine
+
+    def test_fixtures_are_reproducible(self):
+        def titles():
+            rng = perf_tests.random.Random(1)
+            return perf_tests.make_titles(rng, perf_tests.make_shows(rng, 5), 3)
+
+        assert titles() == titles()
+        assert len(set(titles())) > 1
+
+    def test_compare(self):
+        baseline = {
+            'series': {'items': 100, 'min': 1.0},
+            'seen': {'items': 100, 'min': 1.0},
+            'config': {'items': 50, 'min': 1.0},
+        }
+        results = {
+            'series': {'items': 100, 'min': 1.05},
+            'seen': {'items': 100, 'min': 1.5},
+            'config': {'items': 100, 'min': 2.0},
+            'template': {'items': 100, 'min': 1.0},
+        }
+        rows = dict((row[0], row[1:]) for row in perf_tests.compare(results, baseline, 10))
+        assert set(rows) == {'series', 'seen', 'config'}
+        assert not rows['series'][3]
+        assert rows['seen'][3] and round(rows['seen'][2]) == 50
+        assert rows['config'][2] is None and not rows['config'][3]
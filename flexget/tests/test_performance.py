@@ -0,0 +1,61 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import json
+
+import pytest
+
+from flexget.plugins.cli import performance
+
+
+@pytest.mark.usefixtures('tmpdir')
+class TestProfile(object):
+    config = """
+        tasks:
+          test:
+            mock:
+              - {title: 'a'}
+              - {title: 'b'}
+            accept_all: yes
+            seen: local
+    """
+
+    def test_profile_history(self, manager, execute_task, tmpdir):
+        manager.config_base = tmpdir.strpath
+        execute_task('test', options={'debug_perf': True})
+        execute_task('test', options={'debug_perf': True})
+        history = json.loads(tmpdir.join(performance.HISTORY_FILE).read())
+        assert len(history) == 2
+        run = history[0]
+        assert run['task'] == 'test'
+        plugins = dict(((p['phase'], p['plugin']), p) for p in run['plugins'])
+        assert plugins[('input', 'mock')]['entries_out'] == 2
+        assert plugins[('filter', 'accept_all')]['entries_in'] == 2
+        assert plugins[('filter', 'seen')]['queries'] > 0
+        assert all(p['took'] >= 0 and p['calls'] == 1 for p in run['plugins'])
+        # Entries were seen on the second run
+        plugins = dict(((p['phase'], p['plugin']), p) for p in history[1]['plugins'])
+        assert plugins[('filter', 'seen')]['entries_out'] == 0
+        assert not performance._profiles
+
+    def test_no_profile(self, manager, execute_task, tmpdir):
+        manager.config_base = tmpdir.strpath
+        execute_task('test')
+        assert not tmpdir.join(performance.HISTORY_FILE).exists()
+
+    def test_format_table(self):
+        record = {
+            'task': 'test',
+            'plugins': [
+                dict(dict.fromkeys(performance.METRICS, 0), phase='input', plugin='rss', took=2.5),
+                dict(dict.fromkeys(performance.METRICS, 0), phase='filter', plugin='seen'),
+            ],
+            'series_parser_templates': {'hits': 3, 'misses': 1},
+        }
+        for p in record['plugins']:
+            p['calls'] = 1
+        previous = {'plugins': [{'phase': 'input', 'plugin': 'rss', 'took': 1.0}]}
+        lines = performance.format_table(record, previous)
+        assert len(lines) == 4, 'fast plugins should be left out'
+        assert 'rss' in lines[2] and '+1.50s' in lines[2]
+        assert lines[3] == 'Series parser templates: 3 of 4 reused (75.0%)'
@@ -6,6 +6,7 @@ from jinja2 import Template
 
 from flexget.components.parsing.parsers.parser_guessit import ParserGuessit
 from flexget.components.parsing.parsers.parser_internal import ParserInternal
+from flexget.utils import qualities
 from flexget.utils.qualities import Quality
 
 
@@ -19,6 +20,142 @@ class TestQualityModule(object):
             got_val = Quality(test_val).name
             assert got_val == '720p', got_val
 
+    @pytest.mark.parametrize(
+        'text',
+        [
+            'Test.File.1080p.bluray.rc',
+            'Test.File.dvd.rip.r5',
+            'Test.File.720p.webrip.webdl.hdtv',
+            'Test.File.1280x720.720p.1080i',
+            'Test.File.REPACK.1080p.WEBRip.DDP5.1.x264',
+            'Test.File.DTS.HD.MA.dts.truehd.flac',
+            'Test.File.HDTS.dvdscr.bdrip',
+            'Test.File.10bit.h265.x264.xvid',
+            'Tsar.Camera.720hd',
+        ],
+    )
+    def test_scanner_matches_sequential_search(self, text):
+        def find_best(qlist, text, strip_all=True):
+            # The original search, running the regexp of each component in turn
+            result = None
+            clean_text = search_in = text
+            for item in qlist:
+                matched, cleaned = item.matches(search_in)
+                if matched:
+                    result = item
+                    clean_text = cleaned
+                    if strip_all:
+                        search_in = clean_text
+                    if item.modifier is not None:
+                        break
+            return result, clean_text
+
+        for qlist, scanner, strip_all in [
+            (qualities._resolutions, qualities._resolution_scanner, False),
+            (qualities._sources, qualities._source_scanner, True),
+            (qualities._codecs, qualities._codec_scanner, True),
+            (qualities._audios, qualities._audio_scanner, True),
+        ]:
+            assert scanner.find_best(text, strip_all) == find_best(qlist, text, strip_all)
+
+    def test_parse_cache(self):
+        first = Quality('Test.File.720p.hdtv')
+        first.resolution = qualities.get('1080p')
+        second = Quality('Test.File.720p.hdtv')
+        assert second.name == '720p hdtv', 'changing a parsed quality should not affect others'
+        assert second.clean_text == first.clean_text
+
+    def test_parse_cache_bounded(self, monkeypatch):
+        monkeypatch.setattr(qualities, 'PARSE_CACHE_SIZE', 2)
+        monkeypatch.setattr(qualities, '_parse_cache', {})
+        for text in ('a.720p', 'b.720p', 'c.720p'):
+            Quality(text)
+        assert len(qualities._parse_cache) <= 2
+
+
+class TestRequirements(object):
+    @staticmethod
+    def component_allows(req, comp, loose=False):
+        # Evaluates the requirements by comparing components, as done before they were compiled to bitmasks
+        if comp in req.none_of:
+            return False
+        if loose:
+            return True
+        if comp in req.acceptable:
+            return True
+        if req.min or req.max:
+            if req.min and comp < req.min:
+                return False
+            if req.max and comp > req.max:
+                return False
+            return True
+        if not req.acceptable:
+            return True
+        return False
+
+    @pytest.mark.parametrize(
+        'text',
+        [
+            'any',
+            '720p',
+            '720p hdtv',
+            '<720p',
+            '<=720p',
+            '>720p',
+            '>=720p',
+            '720p+',
+            '480p-1080p',
+            '720p|1080p',
+            '!720p',
+            '720p|1080p !1080p',
+            'webrip+ !hdtv',
+            '<dvdrip >cam',
+            'hdtv-bluray !remux',
+            'h264|h265 10bit',
+            '>=dd5.1 !dts',
+            '1080p webdl|bluray h264 dtshd',
+            '!ts !cam !workprint',
+        ],
+    )
+    def test_allows_parity(self, text):
+        reqs = qualities.Requirements(text)
+        for loose in (False, True):
+            for req in reqs.components:
+                for comp in qualities._types[req.type]:
+                    assert req.allows(comp, loose) == self.component_allows(req, comp, loose), (
+                        '%s %s loose=%s' % (text, comp, loose)
+                    )
+
+    def test_allows_many(self):
+        reqs = qualities.Requirements('720p-1080p hdtv|webdl !h265')
+        quals = [
+            qualities.Quality(text)
+            for text in (
+                '720p hdtv',
+                '1080p webdl h264',
+                '1080p webdl h265',
+                '480p hdtv',
+                '720p bluray',
+                'unknown',
+            )
+        ]
+        expected = [
+            all(
+                self.component_allows(req, comp) for req, comp in zip(reqs.components, q.components)
+            )
+            for q in quals
+        ]
+        assert reqs.allows_many(quals) == expected == [True, True, False, False, False, False]
+        assert [reqs.allows(q) for q in quals] == expected
+        assert reqs.allows_many(['720p hdtv h265'], loose=True) == [False]
+        assert reqs.allows_many(['480p cam'], loose=True) == [True]
+
+    def test_mask_updated(self):
+        reqs = qualities.Requirements('720p')
+        assert not reqs.allows('1080p')
+        reqs.parse_requirements('1080p')
+        assert reqs.allows('1080p')
+
 
 class TestQualityParser(object):
     @pytest.fixture(
@@ -110,6 +110,19 @@ class TestRegexp(object):
                 - genre1
                 - genre2:
                     not: genre3
+
+          test_first_regexp_wins:
+            regexp:
+              accept:
+                - 'p1$':
+                    set: {hit: first}
+                - reg:
+                    set: {hit: second}
+                - exp:
+                    set: {hit: not}
+                    not: ssion
+                - '(s)\\1ion':
+                    set: {hit: backref}
     """
 
     def test_accept(self, execute_task):
@@ -199,3 +212,30 @@ class TestRegexp(object):
         assert (
             task.find_entry('entries', title='regular') not in task.accepted
         ), '\'regular\' should not have been accepted'
+
+    def test_first_regexp_wins(self, execute_task):
+        task = execute_task('test_first_regexp_wins')
+        assert task.find_entry('accepted', title='regexp1', hit='first')
+        assert task.find_entry('accepted', title='regexp2', hit='second')
+        assert task.find_entry('accepted', title='regular', hit='second')
+        assert task.find_entry('accepted', title='expression', hit='backref')
+
+
+class TestRegexpGroup(object):
+    def test_group_limit(self):
+        import re
+
+        from flexget.entry import Entry
+        from flexget.plugins.filter.regexp import MAX_GROUPS, EntryValues, RegexpGroup
+
+        regexps = [{re.compile(r'\bword%d\b' % i, re.I | re.U): {}} for i in range(300)]
+        # Groups of the regexps themselves count too
+        regexps.insert(150, {re.compile('(a)(b)(c)', re.I | re.U): {}})
+        groups = RegexpGroup.from_regexps(regexps)
+        assert len(groups) == 4
+        for group in groups:
+            assert group.group_count <= MAX_GROUPS
+            assert group.scanner(0, len(group.regexps)).groups <= MAX_GROUPS
+        values = EntryValues(Entry(title='has word250 and abc', url='mock://a'))
+        hits = [group.first_hit(values) for group in groups]
+        assert [hit[0].pattern for hit in hits if hit] == ['(a)(b)(c)', r'\bword250\b']
@@ -6,6 +6,7 @@ import pytest
 
 from flexget.components.parsing.parsers.parser_internal import ParserInternal
 from flexget.components.parsing.parsers.parser_guessit import ParserGuessit
+from flexget.utils.parsers.series import SeriesParser, get_template
 
 
 class TestSeriesParser(object):
@@ -648,3 +649,33 @@ class TestSeriesParser(object):
         assert not s.season_pack
         assert s.season == 1
         assert s.episode == 1
+
+
+class TestSeriesParserTemplate(object):
+    def test_template_reused(self):
+        first = get_template(name='Some Show', alternate_names=['Other Show'], identified_by='ep')
+        second = get_template(name='Some Show', alternate_names=['Other Show'], identified_by='ep')
+        assert first is second
+        assert get_template(name='Some Show') is not first
+
+    def test_template_parse(self):
+        template = get_template(name='Show (US)')
+        for data in ['Show.US.S01E02.720p.HDTV', 'Show.UK.S01E02', 'Show (US) 2015-03-04']:
+            s = template.parse(data)
+            fresh = SeriesParser(name='Show (US)')
+            fresh.parse(data)
+            assert (s.valid, s.id, s.quality, s.strict_name) == (
+                fresh.valid,
+                fresh.id,
+                fresh.quality,
+                fresh.strict_name,
+            )
+
+    def test_template_unchanged(self):
+        template = get_template()
+        assert template.parse('Some.Show.S01E02').name == 'Some Show'
+        s = template.parse('Other.Show.2015.03.04')
+        assert s.name == 'Other Show'
+        assert s.identified_by == 'date'
+        assert template.new_parser().name is None
+        assert template.new_parser().identified_by == 'auto'
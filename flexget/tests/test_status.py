@@ -0,0 +1,99 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+from datetime import datetime, timedelta
+
+from flexget.components.status import db
+from flexget.manager import Session
+
+
+def execution(start, seconds, succeeded=True, produced=0):
+    ex = db.TaskExecution()
+    ex.start = start
+    ex.end = start + timedelta(seconds=seconds)
+    ex.succeeded = succeeded
+    ex.produced = produced
+    return ex
+
+
+class TestStatusRollups(object):
+    config = """
+        tasks:
+          test:
+            mock:
+              - {title: 'entry 1'}
+              - {title: 'entry 2'}
+            accept_all: yes
+          aborting:
+            mock:
+              - {title: 'entry 1'}
+            abort_if_exists:
+              regexp: 'entry'
+              field: title
+    """
+
+    def test_task_exit_updates_rollups(self, execute_task):
+        execute_task('test')
+        execute_task('test')
+        execute_task('aborting', abort=True)
+        with Session() as session:
+            task = session.query(db.StatusTask).filter(db.StatusTask.name == 'test').one()
+            for period in db.PERIODS:
+                rollups = db.get_rollups(task.id, period, session=session)
+                assert len(rollups) == 1
+                summary = db.summarize(rollups)
+                assert summary['executions'] == 2
+                assert summary['produced'] == 2 * 2
+                # Seen entries are rejected the second time
+                assert summary['accepted'] == 2
+                assert summary['abort_rate'] == 0
+                assert summary['duration_p50'] <= summary['duration_max']
+            task = session.query(db.StatusTask).filter(db.StatusTask.name == 'aborting').one()
+            summary = db.summarize(db.get_rollups(task.id, 'hour', session=session))
+            assert summary['executions'] == 1
+            assert summary['abort_rate'] == 1
+
+    def test_percentiles(self):
+        start = datetime(2019, 1, 1, 10, 30)
+        rollup = db.TaskRollup(period='hour', start=start)
+        for seconds in range(1, 101):
+            rollup.add(execution(start, seconds))
+        summary = db.summarize([rollup])
+        assert summary['duration_max'] == 100
+        assert summary['duration_avg'] == 50.5
+        # Buckets are a quarter wide
+        assert 50 <= summary['duration_p50'] <= 50 * 1.25
+        assert 95 <= summary['duration_p95'] <= 100
+        # Very long executions end up in the overflow bucket
+        rollup.add(execution(start, 10 ** 6))
+        assert db.summarize([rollup])['duration_max'] == 10 ** 6
+
+    def test_cleanup_compacts_executions(self, manager):
+        now = datetime.now()
+        old = now - db.EXECUTION_HISTORY - timedelta(days=1)
+        with Session() as session:
+            task = db.StatusTask()
+            task.name = 'test'
+            session.add(task)
+            session.flush()
+            for start, succeeded in ((old, True), (old, False), (now, True)):
+                ex = execution(start, 10, succeeded, produced=1)
+                ex.task_id = task.id
+                session.add(ex)
+                session.flush()
+                db.add_execution(ex, session)
+            old_hour = db.TaskRollup(
+                task_id=task.id, period='hour', start=now - db.HOURLY_ROLLUP_HISTORY * 2
+            )
+            session.add(old_hour)
+        with Session() as session:
+            db.db_cleanup(manager, session)
+        with Session() as session:
+            task = session.query(db.StatusTask).one()
+            assert task.executions.count() == 1
+            rollups = db.get_rollups(task.id, 'day', session=session)
+            summary = db.summarize(rollups)
+            assert summary['executions'] == 3
+            assert summary['aborted'] == 1
+            assert summary['produced'] == 3
+            assert len(db.get_rollups(task.id, 'hour', session=session)) == 2
@@ -0,0 +1,41 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import io
+
+import mock
+import pytest
+
+
+class TestTail(object):
+    config = """
+        tasks:
+          test_tail:
+            tail:
+              file: __tmp__/log.txt
+              entry:
+                title: 'TITLE: (.*) URL:'
+                url: 'URL: (.*)'
+    """
+
+    @pytest.fixture(autouse=True)
+    def log_file(self, tmpdir):
+        # The file must exist before the config is validated
+        tmpdir.join('log.txt').write('')
+
+    def write(self, tmpdir, text):
+        with io.open(tmpdir.join('log.txt').strpath, 'a', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    @mock.patch('flexget.plugins.input.tail.CHUNK_SIZE', 7)
+    def test_continues_from_last_position(self, execute_task, tmpdir):
+        self.write(tmpdir, 'noise\r\nTITLE: foo URL: http://foo\nnoise\nTITLE: bär URL: http://bar\n')
+        task = execute_task('test_tail')
+        assert [e['title'] for e in task.all_entries] == ['foo', 'bär']
+        assert task.find_entry(title='foo')['url'] == 'http://foo'
+        task = execute_task('test_tail')
+        assert not task.all_entries, 'old lines should not be read again'
+        self.write(tmpdir, 'TITLE: baz URL: http://baz\r\n')
+        task = execute_task('test_tail')
+        assert [e['title'] for e in task.all_entries] == ['baz']
+        assert task.find_entry(title='baz')['url'] == 'http://baz'
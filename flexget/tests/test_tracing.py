@@ -0,0 +1,74 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+
+from flexget import logger
+from flexget.entry import Entry
+from flexget.utils import json, tracing
+
+
+class TestTracer(object):
+    def test_disabled(self):
+        assert tracing.span('anything') is tracing.NULL_SPAN
+
+    def test_collapsed_stacks(self, tmpdir):
+        tracer = tracing.Tracer(tmpdir.join('trace.json').strpath)
+        with tracer.span('task', 'task'):
+            with tracer.span('input', 'phase'):
+                with tracer.span('my plugin;1', 'plugin'):
+                    pass
+        stacks = [line.rsplit(' ', 1)[0] for line in tracer.collapsed_stacks()]
+        assert stacks == ['task', 'task;input', 'task;input;my_plugin_1']
+        tracer.save()
+        events = json.loads(tmpdir.join('trace.json').read())['traceEvents']
+        assert [e['name'] for e in events if e['ph'] == 'X'] == ['my plugin;1', 'input', 'task']
+        assert tmpdir.join('trace.folded').read().count('\n') == 3
+
+    def test_failed_query(self, tmpdir, monkeypatch):
+        tracer = tracing.Tracer(tmpdir.join('trace.json').strpath)
+        monkeypatch.setattr(tracing, '_active', 1)
+        monkeypatch.setattr(logger.local_context, 'tracer', tracer, raising=False)
+        tracing.listen_queries()
+        engine = create_engine('sqlite://')
+        with tracer.span('task', 'task'):
+            with pytest.raises(OperationalError):
+                engine.execute('SELECT * FROM missing')
+            engine.execute('SELECT 1')
+        stacks = [line.rsplit(' ', 1)[0] for line in tracer.collapsed_stacks()]
+        assert stacks == ['task', 'task;SELECT']
+
+
+class TestTraceTask(object):
+    config = """
+        tasks:
+          test:
+            mock:
+              - {title: 'a'}
+            accept_all: yes
+            seen: local
+    """
+
+    def test_trace_file(self, execute_task, tmpdir):
+        def lookup(entry):
+            entry['lazy_field'] = 'value'
+
+        trace_file = tmpdir.join('trace.json')
+        task = execute_task('test', options={'trace_file': trace_file.strpath})
+        # Lazy lookups done while the task runs are part of the trace
+        with tracing.trace_task(task):
+            entry = Entry(title='a', url='http://a')
+            entry.register_lazy_func(lookup, ['lazy_field'])
+            assert entry['lazy_field'] == 'value'
+        assert not tracing._active
+        events = json.loads(trace_file.read())['traceEvents']
+        spans = set((e['cat'], e['name']) for e in events if e['ph'] == 'X')
+        assert ('task', 'test') in spans
+        assert ('phase', 'filter') in spans
+        assert ('plugin', 'accept_all') in spans
+        assert ('lazy', 'test_tracing.lookup') in spans
+        assert any(category == 'db' for category, _ in spans)
+        stacks = [line.rsplit(' ', 1)[0] for line in tmpdir.join('trace.folded').readlines()]
+        assert 'test;filter;seen' in stacks
@@ -1,12 +1,26 @@
 from __future__ import unicode_literals, division, absolute_import
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import math
+import os
 
+import mock
 import pytest
 
 from flexget.utils import json
+from flexget.utils.cache import ResourceCache
+from flexget.utils.file_index import FileIndex
+from flexget.plugins.internal.limiter_state import DatabaseLimiterStateStore
+from flexget.utils.requests import (
+    CircuitBreaker,
+    LimiterStateStore,
+    RequestException,
+    Session,
+    TokenBucketLimiter,
+    WAIT_TIME,
+    MAX_WAIT_TIME,
+)
 from flexget.utils.tools import parse_filesize, split_title_year
 
 
@@ -109,3 +123,237 @@ class TestSplitYearTitle(object):
     )
     def test_split_year_title(self, title, expected_title, expected_year):
         assert split_title_year(title) == (expected_title, expected_year)
+
+
+class TestCircuitBreaker(object):
+    def test_closed(self):
+        breaker = CircuitBreaker('example.com')
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request()
+        assert breaker.allow_request()
+
+    def test_open_after_failure(self):
+        breaker = CircuitBreaker('example.com')
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.wait_time == WAIT_TIME
+        assert not breaker.allow_request()
+
+    def test_single_probe_when_half_open(self):
+        breaker = CircuitBreaker('example.com', failures=1, opened=datetime.now() - WAIT_TIME)
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request(), 'probe request should be allowed'
+        assert not breaker.allow_request(), 'only one probe request should be allowed'
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+        assert breaker.allow_request()
+
+    def test_failed_probe_backs_off(self):
+        breaker = CircuitBreaker('example.com', failures=1, opened=datetime.now() - WAIT_TIME)
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.wait_time == WAIT_TIME * 2
+
+    def test_released_probe(self):
+        breaker = CircuitBreaker('example.com', failures=1, opened=datetime.now() - WAIT_TIME)
+        assert breaker.allow_request()
+        breaker.release()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert breaker.allow_request(), 'a new probe should be allowed after release'
+
+    def test_in_flight_failures_ignored(self):
+        breaker = CircuitBreaker('example.com')
+        breaker.record_failure()
+        breaker.record_failure()
+        assert breaker.failures == 1
+
+    def test_max_wait_time(self):
+        breaker = CircuitBreaker('example.com', failures=100, opened=datetime.now())
+        assert breaker.wait_time == MAX_WAIT_TIME
+
+    def test_serialize(self):
+        opened = datetime.now() - timedelta(seconds=10)
+        breaker = CircuitBreaker('example.com', failures=3, opened=opened)
+        data = json.loads(json.dumps(breaker.to_dict(), encode_datetime=True), decode_datetime=True)
+        restored = CircuitBreaker.from_dict('example.com', data)
+        assert restored.failures == 3
+        assert restored.state == CircuitBreaker.OPEN
+
+
+class TestTokenBucketLimiter(object):
+    config = 'tasks: {}'
+
+    def test_try_acquire(self, monkeypatch):
+        monkeypatch.setattr(TokenBucketLimiter, 'state_store', LimiterStateStore())
+        limiter = TokenBucketLimiter('example.com', 2, '1 minute')
+        assert limiter.try_acquire() == 0
+        assert limiter.try_acquire() == 0
+        wait = limiter.try_acquire()
+        assert 59 < wait <= 60, 'should have to wait for the next token'
+
+    def test_shared_between_instances(self, monkeypatch):
+        monkeypatch.setattr(TokenBucketLimiter, 'state_store', LimiterStateStore())
+        TokenBucketLimiter('example.com', 1, '1 minute')()
+        with pytest.raises(RequestException):
+            TokenBucketLimiter('example.com', 1, '1 minute', wait=False)()
+
+    def test_database_store(self, manager, monkeypatch):
+        assert isinstance(TokenBucketLimiter.state_store, DatabaseLimiterStateStore)
+        assert TokenBucketLimiter('example.com', 1, '1 minute').try_acquire() == 0
+        # Taking tokens doesn't write to the database, the state is stored when tasks complete
+        assert DatabaseLimiterStateStore.load('example.com') is None
+        TokenBucketLimiter.state_store.flush()
+        # A fresh store, like the one in another process, must see the token was taken
+        monkeypatch.setattr(TokenBucketLimiter, 'state_store', DatabaseLimiterStateStore())
+        assert TokenBucketLimiter('example.com', 1, '1 minute').try_acquire() > 0
+
+
+class TestRequestMany(object):
+    def test_results_in_order(self, tmpdir):
+        urls = []
+        for i in range(10):
+            path = tmpdir.join('%d.txt' % i)
+            path.write('content %d' % i)
+            urls.append('file:///' + path.strpath.lstrip('/'))
+        results = Session().get_many(urls, max_workers=3)
+        assert [result.url for result in results] == urls
+        for i, result in enumerate(results):
+            assert result.result().content == ('content %d' % i).encode()
+
+    def test_errors(self, tmpdir):
+        url = 'file:///' + tmpdir.join('missing.txt').strpath.lstrip('/')
+        results = Session().get_many([url])
+        assert results[0].error is not None
+        with pytest.raises(RequestException):
+            results[0].result()
+
+
+class TestResourceCache(object):
+    @staticmethod
+    def response(content, status_code=200, headers=None):
+        return mock.Mock(content=content, status_code=status_code, headers=headers or {})
+
+    def test_hit(self, tmpdir, monkeypatch):
+        get = mock.Mock(return_value=self.response(b'data', headers={'content-type': 'image/png'}))
+        monkeypatch.setattr('flexget.utils.cache.requests.get', get)
+        cache = ResourceCache(tmpdir.strpath)
+        path, mime_type = cache.get('http://example.com/a')
+        assert mime_type == 'image/png'
+        assert cache.get('http://example.com/a') == (path, 'image/png')
+        assert get.call_count == 1
+        with open(path, 'rb') as f:
+            assert f.read() == b'data'
+
+    def test_lru_eviction(self, tmpdir, monkeypatch):
+        content = b'x' * 400 * 1024
+        monkeypatch.setattr(
+            'flexget.utils.cache.requests.get', mock.Mock(return_value=self.response(content))
+        )
+        cache = ResourceCache(tmpdir.strpath)
+        path_a, _ = cache.get('http://example.com/a', max_size=1)
+        path_b, _ = cache.get('http://example.com/b', max_size=1)
+        # Make `b` the least recently used one
+        cache.get('http://example.com/a', max_size=1)
+        path_c, _ = cache.get('http://example.com/c', max_size=1)
+        assert os.path.exists(path_a)
+        assert not os.path.exists(path_b)
+        assert os.path.exists(path_c)
+        assert cache.size == 2 * len(content)
+
+    def test_persisted_index(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(
+            'flexget.utils.cache.requests.get',
+            mock.Mock(return_value=self.response(b'data', headers={'content-type': 'text/plain'})),
+        )
+        ResourceCache(tmpdir.strpath).get('http://example.com/a')
+        cache = ResourceCache(tmpdir.strpath)
+        assert cache.size == 4
+        assert cache.get('http://example.com/a')[1] == 'text/plain'
+
+    def test_revalidate(self, tmpdir, monkeypatch):
+        get = mock.Mock(return_value=self.response(b'data', headers={'etag': '"1"'}))
+        monkeypatch.setattr('flexget.utils.cache.requests.get', get)
+        cache = ResourceCache(tmpdir.strpath)
+        cache.get('http://example.com/a')
+        for record in cache.index.values():
+            record['fetched'] = 0
+        get.return_value = self.response(b'', status_code=304)
+        path, _ = cache.get('http://example.com/a')
+        assert get.call_args[1]['headers'] == {'If-None-Match': '"1"'}
+        with open(path, 'rb') as f:
+            assert f.read() == b'data'
+
+    def test_stale_copy_on_error(self, tmpdir, monkeypatch):
+        import requests
+
+        get = mock.Mock(return_value=self.response(b'data', headers={'content-type': 'image/png'}))
+        monkeypatch.setattr('flexget.utils.cache.requests.get', get)
+        cache = ResourceCache(tmpdir.strpath)
+        path, _ = cache.get('http://example.com/a')
+        for record in cache.index.values():
+            record['fetched'] = 0
+        get.side_effect = requests.ConnectionError('offline')
+        assert cache.get('http://example.com/a') == (path, 'image/png')
+        # Uncached urls and forced fetches still fail
+        with pytest.raises(requests.ConnectionError):
+            cache.get('http://example.com/b')
+        with pytest.raises(requests.ConnectionError):
+            cache.get('http://example.com/a', force=True)
+
+
+class TestFileIndex(object):
+    def names(self, index):
+        return sorted(os.path.relpath(info.path, index.folder) for info in index.entries())
+
+    def test_refresh(self, tmpdir):
+        tmpdir.mkdir('show').join('show.s01e01.mkv').write('')
+        tmpdir.join('movie.mkv').write('')
+        index = FileIndex(tmpdir.strpath, watch=False)
+        index.refresh()
+        assert self.names(index) == ['movie.mkv', 'show', os.path.join('show', 'show.s01e01.mkv')]
+        assert [info.name for info in index.dirs()] == ['show']
+
+        tmpdir.join('show', 'show.s01e02.mkv').write('')
+        tmpdir.join('movie.mkv').remove()
+        index.refresh()
+        assert self.names(index) == [
+            'show',
+            os.path.join('show', 'show.s01e01.mkv'),
+            os.path.join('show', 'show.s01e02.mkv'),
+        ]
+
+        tmpdir.join('show').remove()
+        index.refresh()
+        assert self.names(index) == []
+        assert not index.directories.get(tmpdir.join('show').strpath)
+
+    def test_unchanged_directories_not_listed(self, tmpdir):
+        tmpdir.mkdir('show').join('show.s01e01.mkv').write('')
+        index = FileIndex(tmpdir.strpath, watch=False)
+        index.refresh()
+        # Pretend the listings were made long after the directories were modified
+        for path, (mtime, inode, listed_at, listing) in list(index.directories.items()):
+            index.directories[path] = (mtime, inode, mtime + 60, listing)
+        with mock.patch('flexget.utils.file_index.list_directory') as list_directory:
+            index.refresh()
+        assert not list_directory.called
+        assert self.names(index) == ['show', os.path.join('show', 'show.s01e01.mkv')]
+
+    def test_parse_cache(self, tmpdir):
+        tmpdir.join('a.mkv').write('')
+        index = FileIndex(tmpdir.strpath, watch=False)
+        index.refresh()
+        parse = mock.Mock(side_effect=lambda name: name.upper())
+        info = next(index.files())
+        assert index.parse(info, 'kind', parse) == 'A.MKV'
+        assert index.parse(info, 'kind', parse) == 'A.MKV'
+        assert parse.call_count == 1
+        assert index.parse(info, 'other kind', parse) == 'A.MKV'
+        assert parse.call_count == 2
+
+        tmpdir.join('a.mkv').write('changed')
+        index.refresh()
+        info = next(index.files())
+        index.parse(info, 'kind', parse)
+        assert parse.call_count == 3, 'changed file should be parsed again'
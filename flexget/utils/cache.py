@@ -4,10 +4,192 @@ from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 import hashlib
 import io
 import os
+import threading
+import time
+from collections import OrderedDict
 
 import requests
+from flexget.utils import json
 from flexget.utils.tools import log
 
+# Cached resources older than this are revalidated with the remote server before being served
+REVALIDATE_AFTER = 7 * 24 * 60 * 60
+INDEX_FILE = 'index.json'
+
+
+class ResourceCache(object):
+    """
+    Caches remote resources in a local directory, evicting the least recently used ones when it grows too big.
+
+    An index of the cached files with their size, mime type and validators is kept in memory, and persisted into the
+    directory when it changes. That way the directory doesn't need to be scanned to know its size.
+    Concurrent requests for the same url only fetch it once.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        # Maps hashed file names to their index records, least recently used first
+        self.index = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.fetching = {}
+        self.load_index()
+
+    @property
+    def index_path(self):
+        return os.path.join(self.directory, INDEX_FILE)
+
+    def load_index(self):
+        if not os.path.isdir(self.directory):
+            return
+        try:
+            with io.open(self.index_path, 'r', encoding='utf-8') as f:
+                records = json.load(f)
+        except (IOError, OSError, ValueError):
+            log.debug('no usable index for %s, rebuilding it', self.directory)
+            records = self.scan_directory()
+        for name, record in sorted(records.items(), key=lambda item: item[1]['accessed']):
+            if not os.path.exists(os.path.join(self.directory, name)):
+                continue
+            self.index[name] = record
+            self.size += record['size']
+
+    def scan_directory(self):
+        """Builds index records for files cached before there was an index."""
+        records = {}
+        for name in os.listdir(self.directory):
+            if name == INDEX_FILE:
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            records[name] = {
+                'size': stat.st_size,
+                'accessed': stat.st_atime,
+                'fetched': stat.st_mtime,
+                'mime_type': None,
+                'etag': None,
+                'last_modified': None,
+            }
+        return records
+
+    def save_index(self):
+        with io.open(self.index_path, 'w', encoding='utf-8') as f:
+            f.write(str(json.dumps(self.index)))
+
+    def get(self, url, force=False, max_size=250):
+        """
+        :param url: Resource URL
+        :param force: Fetch the remote URL even if it is cached, ignores directory size limit
+        :param max_size: Maximum allowed size of directory, in MB.
+        :return: Tuple of file path and mime type
+        """
+        name = hashlib.md5(url.encode('utf-8')).hexdigest()
+        file_path = os.path.join(self.directory, name)
+        while True:
+            with self.lock:
+                record = self.index.get(name)
+                if record and not os.path.exists(file_path):
+                    log.debug('cached file %s has gone missing', file_path)
+                    self.size -= self.index.pop(name)['size']
+                    record = None
+                if record and not force:
+                    if time.time() - record['fetched'] < REVALIDATE_AFTER:
+                        record['accessed'] = time.time()
+                        self.touch(name)
+                        return file_path, record['mime_type']
+                fetching = self.fetching.get(name)
+                if not fetching:
+                    self.fetching[name] = threading.Event()
+                    break
+            # Someone else is already fetching this url, use their result once they are done
+            fetching.wait()
+            force = False
+
+        try:
+            return file_path, self.fetch(url, name, record, force, max_size)
+        finally:
+            with self.lock:
+                self.fetching.pop(name).set()
+
+    def fetch(self, url, name, record, force, max_size):
+        headers = {}
+        if record and not force:
+            if record['etag']:
+                headers['If-None-Match'] = record['etag']
+            if record['last_modified']:
+                headers['If-Modified-Since'] = record['last_modified']
+
+        log.debug('caching %s', url)
+        try:
+            response = requests.get(url, headers=headers)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            if not record or force:
+                raise
+            with self.lock:
+                if name not in self.index:
+                    raise
+                # Better an old copy than none, it is revalidated again next time
+                log.warning('could not revalidate %s, serving the cached copy: %s', url, e)
+                record['accessed'] = time.time()
+                self.touch(name)
+                return record['mime_type']
+
+        if response.status_code == 304:
+            with self.lock:
+                if name in self.index:
+                    log.debug('cached copy of %s is still valid', url)
+                    record['fetched'] = record['accessed'] = time.time()
+                    self.touch(name)
+                    self.save_index()
+                    return record['mime_type']
+            # The cached copy was evicted in the meantime
+            return self.fetch(url, name, None, force, max_size)
+
+        with self.lock:
+            content = response.content
+            if not os.path.exists(self.directory):
+                os.makedirs(self.directory)
+
+            old = self.index.pop(name, None)
+            if old:
+                self.size -= old['size']
+            # Evict least recently used files until the new one fits
+            if not force:
+                while self.index and self.size + len(content) > max_size * 1024 * 1024:
+                    self.evict()
+
+            with io.open(os.path.join(self.directory, name), 'wb') as file:
+                file.write(content)
+            self.index[name] = {
+                'size': len(content),
+                'accessed': time.time(),
+                'fetched': time.time(),
+                'mime_type': response.headers.get('content-type'),
+                'etag': response.headers.get('etag'),
+                'last_modified': response.headers.get('last-modified'),
+            }
+            self.size += len(content)
+            self.save_index()
+            return self.index[name]['mime_type']
+
+    def touch(self, name):
+        """Marks `name` as the most recently used file."""
+        self.index[name] = self.index.pop(name)
+
+    def evict(self):
+        name, record = self.index.popitem(last=False)
+        self.size -= record['size']
+        file_name = os.path.join(self.directory, name)
+        log.debug('removing least recently used file: %s', file_name)
+        try:
+            os.remove(file_name)
+        except OSError as e:
+            log.debug('could not remove %s: %s', file_name, e)
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
 
 def cached_resource(url, base_dir, force=False, max_size=250, directory='cached_resources'):
     """
@@ -20,60 +202,9 @@ def cached_resource(url, base_dir, force=False, max_size=250, directory='cached_
     :param directory: Name of directory to use. Default is `cached_resources`
     :return: Tuple of file path and mime type
     """
-    mime_type = None
-    hashed_name = hashlib.md5(url.encode('utf-8')).hexdigest()
-    file_path = os.path.join(base_dir, directory, hashed_name)
-    directory = os.path.dirname(file_path)
-
-    if not os.path.exists(file_path) or force:
-        log.debug('caching %s', url)
-        response = requests.get(url)
-        response.raise_for_status()
-        mime_type = response.headers.get('content-type')
-        content = response.content
-        if not os.path.exists(directory):
-            os.makedirs(directory)
-
-        # Checks directory size and trims if necessary.
-        size = dir_size(directory) / (1024 * 1024.0)
-        if not force:
-            while size >= max_size:
-                log.debug(
-                    'directory %s size is over the allowed limit of %s, trimming', size, max_size
-                )
-                trim_dir(directory)
-                size = dir_size(directory) / (1024 * 1024.0)
-
-        with io.open(file_path, 'wb') as file:
-            file.write(content)
-    return file_path, mime_type
-
-
-def dir_size(directory):
-    """
-    Sums the size of all files in a given dir. Not recursive.
-
-    :param directory: Directory to check
-    :return: Summed size of all files in Bytes.
-    """
-    size = 0
-    for file in os.listdir(directory):
-        filename = os.path.join(directory, file)
-        size += os.path.getsize(filename)
-    return size
-
-
-def trim_dir(directory):
-    """
-    Removed the least accessed file on a given dir
-
-    :param directory: Directory to check
-    """
-
-    def access_time(f):
-        return os.stat(os.path.join(directory, f)).st_atime
-
-    files = sorted(os.listdir(directory), key=access_time)
-    file_name = os.path.join(directory, files[0])
-    log.debug('removing least accessed file: %s', file_name)
-    os.remove(file_name)
+    path = os.path.join(base_dir, directory)
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ResourceCache(path)
+    return cache.get(url, force=force, max_size=max_size)
@@ -0,0 +1,351 @@
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from flexget.event import event
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+log = logging.getLogger('file_index')
+
+# Directories modified this recently are listed again on refresh, as their mtime may not change on further changes
+MTIME_RESOLUTION = 2
+
+FileInfo = namedtuple(
+    'FileInfo',
+    ['path', 'name', 'is_dir', 'is_file', 'is_symlink', 'size', 'mtime', 'atime', 'ctime'],
+)
+
+
+def list_directory(path):
+    """
+    :param path: Directory to list
+    :return: List of :class:`FileInfo` for the directory contents, symlinks are followed
+    """
+    result = []
+    if scandir:
+        for entry in scandir(path):
+            try:
+                is_symlink = entry.is_symlink()
+                stat = entry.stat()
+                result.append(
+                    FileInfo(
+                        entry.path,
+                        entry.name,
+                        entry.is_dir(),
+                        entry.is_file(),
+                        is_symlink,
+                        stat.st_size,
+                        stat.st_mtime,
+                        stat.st_atime,
+                        stat.st_ctime,
+                    )
+                )
+            except OSError:
+                # Broken symlink
+                result.append(
+                    FileInfo(entry.path, entry.name, False, False, True, None, None, None, None)
+                )
+    else:
+        for name in os.listdir(path):
+            child = os.path.join(path, name)
+            try:
+                stat = os.stat(child)
+                result.append(
+                    FileInfo(
+                        child,
+                        name,
+                        os.path.isdir(child),
+                        os.path.isfile(child),
+                        os.path.islink(child),
+                        stat.st_size,
+                        stat.st_mtime,
+                        stat.st_atime,
+                        stat.st_ctime,
+                    )
+                )
+            except OSError:
+                result.append(FileInfo(child, name, False, False, True, None, None, None, None))
+    return result
+
+
+class Watcher(object):
+    """Collects the directories changed since the last check using inotify."""
+
+    def __init__(self):
+        flags = inotify_simple.flags
+        self.mask = (
+            flags.CREATE
+            | flags.DELETE
+            | flags.MOVED_FROM
+            | flags.MOVED_TO
+            | flags.DELETE_SELF
+            | flags.MOVE_SELF
+        )
+        self.inotify = inotify_simple.INotify()
+        # Watched directories by watch descriptor
+        self.directories = {}
+        self.watched = set()
+        self.failed = False
+
+    def watch(self, path):
+        if self.failed or path in self.watched:
+            return
+        try:
+            self.directories[self.inotify.add_watch(path, self.mask)] = path
+            self.watched.add(path)
+        except OSError as e:
+            # Most likely the limit of watches is reached, directory mtimes are checked instead
+            log.debug('Could not watch %s, disabling inotify: %s', path, e)
+            self.failed = True
+
+    def changed(self):
+        """
+        :return: Set of changed directories, or None if changes may have been missed
+        """
+        if self.failed:
+            return None
+        changed = set()
+        for change in self.inotify.read(timeout=0):
+            if change.mask & inotify_simple.flags.Q_OVERFLOW:
+                return None
+            path = self.directories.get(change.wd)
+            if path is None:
+                continue
+            if change.mask & inotify_simple.flags.IGNORED:
+                # Watched directory is gone
+                self.watched.discard(self.directories.pop(change.wd))
+            changed.add(path)
+        return changed
+
+    def close(self):
+        self.inotify.close()
+
+
+class FileIndex(object):
+    """
+    Index of all files and directories below a folder, kept in memory between task runs.
+
+    On refresh only directories which changed since the last one are listed again. Changes are detected by inotify
+    when available, otherwise by directory mtimes and inodes. Parse results of file names are cached as long as the
+    file is unchanged, so that each name is only parsed once.
+
+    Files changed in place don't change the mtime of their directory, their listed size and times may be outdated.
+    """
+
+    def __init__(self, folder, watch=True, max_depth=None):
+        """
+        :param folder: Path of the folder to index
+        :param bool watch: Whether to use inotify if available
+        :param int max_depth: Levels of subdirectories to index, 1 being only the contents of `folder`.
+            Unlimited by default.
+        """
+        self.folder = folder
+        self.max_depth = max_depth
+        # Listings of all directories by path, along with their mtime, inode and the time they were listed at
+        self.directories = {}
+        self.parsed = {}
+        self.lock = threading.RLock()
+        self.watcher = None
+        if watch and inotify_simple:
+            try:
+                self.watcher = Watcher()
+            except OSError as e:
+                log.debug('Could not use inotify: %s', e)
+
+    def refresh(self):
+        """
+        Updates the index with the changes in the folder.
+
+        :return: Dict of the directories which were listed again, with their previous listing
+        """
+        with self.lock:
+            changed = self.watcher.changed() if self.watcher and self.directories else None
+            previous = {}
+            if changed is None:
+                self._scan(self.folder, True, previous)
+            else:
+                for path in changed:
+                    if path in self.directories:
+                        self._scan(path, False, previous)
+            self._prune_parsed()
+            return previous
+
+    def _depth(self, path):
+        relative = os.path.relpath(path, self.folder)
+        return 0 if relative == os.curdir else len(relative.split(os.sep))
+
+    def _scan(self, root, check_mtime, previous):
+        """Lists `root` and its subdirectories again, as far as they changed."""
+        seen = set()
+        stack = [(root, self._depth(root))]
+        while stack:
+            path, depth = stack.pop()
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            # Guard against symlink loops
+            if (stat.st_dev, stat.st_ino) in seen:
+                continue
+            seen.add((stat.st_dev, stat.st_ino))
+            known = self.directories.get(path)
+            if known is None:
+                changed = True
+            elif check_mtime:
+                changed = (
+                    known[0] != stat.st_mtime
+                    or known[1] != stat.st_ino
+                    or known[2] - stat.st_mtime < MTIME_RESOLUTION
+                )
+            else:
+                changed = path == root
+            if changed:
+                if self.watcher:
+                    self.watcher.watch(path)
+                listed_at = time.time()
+                try:
+                    listing = list_directory(path)
+                except OSError as e:
+                    log.debug('Could not list %s: %s', path, e)
+                    listing = []
+                self.directories[path] = (stat.st_mtime, stat.st_ino, listed_at, listing)
+                previous[path] = known[3] if known else []
+                if known:
+                    # Forget about subdirectories which are gone
+                    current = set(info.path for info in listing if info.is_dir)
+                    for info in known[3]:
+                        if info.is_dir and info.path not in current:
+                            self._forget(info.path)
+            elif not check_mtime:
+                # Unchanged subdirectories of a changed directory keep their listing
+                continue
+            if self.max_depth is None or depth + 1 < self.max_depth:
+                stack.extend(
+                    (info.path, depth + 1) for info in self.directories[path][3] if info.is_dir
+                )
+
+    def _forget(self, path):
+        prefix = path + os.sep
+        for directory in list(self.directories):
+            if directory == path or directory.startswith(prefix):
+                del self.directories[directory]
+
+    def _prune_parsed(self):
+        if not self.parsed:
+            return
+        current = set((info.name, info.size, info.mtime) for info in self.entries())
+        for results in self.parsed.values():
+            for key in set(results) - current:
+                del results[key]
+
+    def walk(self):
+        """
+        Returns a list of all files and directories in the folder, each directory followed by its contents.
+
+        :return: List of tuples of :class:`FileInfo` and the depth below the folder, starting at 1
+        """
+        result = []
+        with self.lock:
+            root = self.directories.get(self.folder)
+            stack = [(iter(root[3]), 1)] if root else []
+            while stack:
+                listing, depth = stack[-1]
+                info = next(listing, None)
+                if info is None:
+                    stack.pop()
+                    continue
+                result.append((info, depth))
+                if info.is_dir and info.path in self.directories:
+                    stack.append((iter(self.directories[info.path][3]), depth + 1))
+        return result
+
+    def entries(self):
+        """Returns an iterator of :class:`FileInfo` for all files and directories in the folder, recursively."""
+        return (info for info, _ in self.walk())
+
+    def files(self):
+        return (info for info in self.entries() if not info.is_dir)
+
+    def dirs(self):
+        return (info for info in self.entries() if info.is_dir)
+
+    def parse(self, info, kind, func):
+        """
+        Returns the cached result of `func` for the name of a file, calling it if needed.
+
+        :param FileInfo info: File to get the parse result for
+        :param kind: Hashable identifying the kind of parse, results are cached separately for each kind
+        :param func: Function called with the file name to parse it
+        """
+        key = (info.name, info.size, info.mtime)
+        with self.lock:
+            results = self.parsed.setdefault(kind, {})
+            if key not in results:
+                results[key] = func(info.name)
+            return results[key]
+
+    def to_dict(self):
+        """Returns the directory listings in a JSON serializable form."""
+        with self.lock:
+            return {
+                path: [mtime, inode, listed_at, [list(info) for info in listing]]
+                for path, (mtime, inode, listed_at, listing) in self.directories.items()
+            }
+
+    def from_dict(self, data):
+        """Restores directory listings from :meth:`to_dict` output."""
+        with self.lock:
+            self.directories = {
+                path: (mtime, inode, listed_at, [FileInfo(*info) for info in listing])
+                for path, (mtime, inode, listed_at, listing) in data.items()
+            }
+
+    def close(self):
+        if self.watcher:
+            self.watcher.close()
+            self.watcher = None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(folder):
+    """
+    Returns the shared, refreshed index of `folder`.
+
+    :param folder: Path of the folder
+    :return: :class:`FileIndex`
+    """
+    folder = os.path.abspath(os.path.expanduser(folder))
+    with _indexes_lock:
+        index = _indexes.get(folder)
+        if index is None:
+            index = _indexes[folder] = FileIndex(folder)
+    index.refresh()
+    return index
+
+
+@event('manager.shutdown')
+def close_indexes(manager):
+    with _indexes_lock:
+        for index in _indexes.values():
+            index.close()
+        _indexes.clear()
@@ -4,6 +4,8 @@ from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 import logging
 from collections import MutableMapping
 
+from flexget.utils import tracing
+
 log = logging.getLogger('lazy_lookup')
 
 
@@ -35,7 +37,8 @@ class LazyLookup(object):
             func = self.func_list.pop(index)
             self.key_list.pop(index)
             try:
-                func(self.store)
+                with tracing.span(func, 'lazy'):
+                    func(self.store)
             except PluginError as e:
                 e.log.info(e)
             except Exception as e:
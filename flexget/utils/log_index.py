@@ -0,0 +1,436 @@
+"""
+Sidecar index of the log files, so that log searches only read the parts of the logs which can contain matches.
+
+Log files are split into blocks of about :data:`BLOCK_SIZE` bytes ending on line boundaries. For each block the index
+stores its byte range, the time range, the highest log level and the tasks, plugins and logging sessions of its lines,
+along with an optional bloom filter of the trigrams in the words of the lines for free-text searches.
+
+The index is kept in ``<logfile>.idx`` as JSON lines, one block per line, keyed by the inode of the log file along
+with a checksum of its first bytes, as the inodes of removed files get reused. Rotating the log renames the files,
+which keeps their inodes, so only compressed rotated files have to be indexed again. New lines are indexed by
+:class:`IndexingHandler` as the daemon writes them, searches read the lines which aren't indexed yet directly.
+"""
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import base64
+import gzip
+import io
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import zlib
+
+from flexget.logger import ENV_MAXCOUNT, get_level_no
+
+log = logging.getLogger('log_index')
+
+BLOCK_SIZE = 64 * 1024
+# Amount of bytes at the start of a log file which tell it apart from other files
+HEAD_SIZE = 1024
+# Size of the bloom filter of each block, in bits. Needs to be a power of 2.
+BLOOM_BITS = 16 * 1024
+
+# Same columns the search API parses from lines in the text format, a task column of 16+ spaces means no task
+TEXT_LINE = re.compile(r'(\d+-\d+-\d+ \d+:\d+) +(\S+) +(\S+)(?: {16,}|\s+(\S+))?')
+# Search terms only consist of ascii letters and digits, so they can only match within these words
+WORD = re.compile(r'[a-z0-9]{3,}')
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def parse_line(line):
+    """Returns the timestamp, log level, task, plugin, logger and session_id of a log line, or None."""
+    if line.lstrip().startswith('{'):
+        try:
+            record = json.loads(line)
+        except ValueError:
+            pass
+        else:
+            return record if isinstance(record, dict) else None
+    match = TEXT_LINE.match(line)
+    if not match:
+        return None
+    timestamp, level, name, task = match.groups()
+    return {'timestamp': timestamp, 'log_level': level, 'plugin': name, 'task': task or ''}
+
+
+def _bloom_positions(trigram):
+    value = zlib.crc32(trigram.encode('ascii')) & 0xFFFFFFFF
+    return value & (BLOOM_BITS - 1), (value >> 16) & (BLOOM_BITS - 1)
+
+
+def trigrams(word):
+    return set(word[i : i + 3] for i in range(len(word) - 2))
+
+
+def checksum(data):
+    return zlib.crc32(data[:HEAD_SIZE]) & 0xFFFFFFFF
+
+
+def file_head(path):
+    """Returns the checksum of the first bytes of a log file, files which had the same inode before have others."""
+    opener = gzip.open if path.endswith('.gz') else io.open
+    with opener(path, 'rb') as f:
+        return checksum(f.read(HEAD_SIZE))
+
+
+class Block(object):
+    """Summary of a range of complete lines in a log file."""
+
+    __slots__ = (
+        'inode',
+        'head',
+        'start',
+        'end',
+        'first',
+        'last',
+        'max_level',
+        'tasks',
+        'plugins',
+        'sessions',
+        'bloom',
+    )
+
+    def __init__(
+        self,
+        inode,
+        start,
+        end,
+        head=None,
+        first='',
+        last='',
+        max_level=0,
+        tasks=(),
+        plugins=(),
+        sessions=(),
+        bloom=None,
+    ):
+        self.inode = inode
+        self.head = head
+        self.start = start
+        self.end = end
+        self.first = first
+        self.last = last
+        self.max_level = max_level
+        self.tasks = set(tasks)
+        self.plugins = set(plugins)
+        self.sessions = set(sessions)
+        self.bloom = bloom
+
+    @classmethod
+    def build(cls, inode, start, data, terms=True, head=None):
+        """
+        Summarizes the lines in `data`, which was read from `start` of the log file.
+
+        :param head: Checksum of the first bytes of the log file, taken from `data` for the first block
+        """
+        if head is None:
+            head = checksum(data)
+        block = cls(inode, start, start + len(data), head)
+        text = data.decode(sys.getfilesystemencoding(), 'replace')
+        for line in text.split('\n'):
+            record = parse_line(line)
+            if record is None:
+                continue
+            timestamp = record.get('timestamp', '')
+            if timestamp:
+                block.first = block.first or timestamp
+                block.last = timestamp
+            try:
+                level = get_level_no(record.get('log_level', ''))
+            except (AttributeError, TypeError):
+                # Unknown level, never skip the block because of it
+                level = logging.CRITICAL
+            block.max_level = max(block.max_level, level)
+            block.tasks.add(record.get('task', '').lower())
+            block.plugins.add(record.get('plugin', '').lower())
+            block.plugins.add(record.get('logger', '').lower())
+            if record.get('session_id'):
+                block.sessions.add(record['session_id'])
+        if terms:
+            bloom = bytearray(BLOOM_BITS // 8)
+            grams = set()
+            for word in set(WORD.findall(text.lower())):
+                grams.update(trigrams(word))
+            for gram in grams:
+                for position in _bloom_positions(gram):
+                    bloom[position >> 3] |= 1 << (position & 7)
+            block.bloom = bytes(bloom)
+        return block
+
+    def may_contain(self, word):
+        """Whether a line of the block can contain `word`. False positives are possible, false negatives are not."""
+        if self.bloom is None:
+            return True
+        for gram in trigrams(word.lower()):
+            for position in _bloom_positions(gram):
+                if not self.bloom[position >> 3] & (1 << (position & 7)):
+                    return False
+        return True
+
+    def may_match(self, log_parser):
+        """Whether a line of the block can match the filters and search query of `log_parser`."""
+        if log_parser.task and log_parser.task not in self.tasks:
+            return False
+        if log_parser.plugin and log_parser.plugin not in self.plugins:
+            return False
+        if log_parser.level and self.max_level < log_parser.level:
+            return False
+        if log_parser.session_id and log_parser.session_id not in self.sessions:
+            return False
+        if log_parser.since and self.last and self.last < log_parser.since[: len(self.last)]:
+            return False
+        return log_parser.query_may_match(self.may_contain)
+
+    def to_dict(self):
+        return {
+            'inode': self.inode,
+            'head': self.head,
+            'start': self.start,
+            'end': self.end,
+            'first': self.first,
+            'last': self.last,
+            'max_level': self.max_level,
+            'tasks': sorted(self.tasks),
+            'plugins': sorted(self.plugins),
+            'sessions': sorted(self.sessions),
+            'bloom': base64.b64encode(self.bloom).decode('ascii') if self.bloom else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        data = dict(data)
+        if data.get('bloom'):
+            data['bloom'] = base64.b64decode(data['bloom'])
+        return cls(**data)
+
+
+class LogIndex(object):
+    """Index of a log file and its rotated files."""
+
+    def __init__(self, filename, terms=True):
+        """
+        :param filename: Path of the live log file
+        :param terms: Whether to index the words of the lines for free-text searches
+        """
+        self.filename = filename
+        self.index_file = filename + '.idx'
+        self.terms = terms
+        # Blocks by inode of the log file, in file order
+        self.blocks = {}
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with io.open(self.index_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        block = Block.from_dict(json.loads(line))
+                    except (ValueError, TypeError, KeyError):
+                        # Likely a line cut short by a crash, the lines after it are indexed again
+                        break
+                    self.blocks.setdefault(block.inode, []).append(block)
+        except (IOError, OSError):
+            pass
+
+    def _save(self, blocks, rewrite=False):
+        lines = [json.dumps(block.to_dict()) + '\n' for block in blocks]
+        try:
+            with io.open(self.index_file, 'w' if rewrite else 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+        except (IOError, OSError) as e:
+            log.debug('Could not write log index %s: %s', self.index_file, e)
+
+    def files(self):
+        """Returns the paths of the existing log files, newest first."""
+        paths = []
+        for number in range(int(os.environ.get(ENV_MAXCOUNT, 9)) + 1):
+            path = '%s.%d' % (self.filename, number) if number else self.filename
+            if os.path.isfile(path):
+                paths.append(path)
+            elif number and os.path.isfile(path + '.gz'):
+                paths.append(path + '.gz')
+            else:
+                break
+        return paths
+
+    def _update(self, inode, fh, final):
+        """
+        Indexes the lines of a log file after the ones already in the index.
+
+        :param final: Whether the file is rotated and won't grow anymore. Otherwise the lines at the end which don't
+            fill a block are left out, they are indexed once the block is complete.
+        :return: List of new blocks
+        """
+        blocks = self.blocks.setdefault(inode, [])
+        new_blocks = []
+        position = blocks[-1].end if blocks else 0
+        head = blocks[0].head if blocks else None
+        fh.seek(position)
+        while True:
+            data = fh.read(BLOCK_SIZE)
+            if not data:
+                break
+            data += fh.readline()
+            complete = len(data) >= BLOCK_SIZE and data.endswith(b'\n')
+            if not (complete or final):
+                break
+            block = Block.build(inode, position, data, self.terms, head)
+            head = block.head
+            blocks.append(block)
+            new_blocks.append(block)
+            position = block.end
+        return new_blocks
+
+    def update(self):
+        """Indexes the lines written to the log files since the last update, forgets the files which are gone."""
+        with self.lock:
+            inodes = set()
+            new_blocks = []
+            rewrite = False
+            for number, path in enumerate(self.files()):
+                try:
+                    inode = os.stat(path).st_ino
+                    blocks = self.blocks.get(inode)
+                    if blocks and blocks[0].head != file_head(path):
+                        # Another file had this inode before, it was removed
+                        del self.blocks[inode]
+                        blocks = None
+                        rewrite = True
+                    inodes.add(inode)
+                    if not path.endswith('.gz'):
+                        fh = open(path, 'rb')
+                    elif blocks:
+                        # Compressed files are rotated, they were indexed completely
+                        continue
+                    else:
+                        with gzip.open(path, 'rb') as f:
+                            fh = io.BytesIO(f.read())
+                except (IOError, OSError) as e:
+                    log.debug('Could not read log file %s: %s', path, e)
+                    break
+                with fh:
+                    fh.seek(0, os.SEEK_END)
+                    if blocks and blocks[-1].end > fh.tell():
+                        # The file was truncated, index it again
+                        del self.blocks[inode]
+                        rewrite = True
+                    new_blocks.extend(self._update(inode, fh, final=number > 0))
+            if rewrite or set(self.blocks) - inodes:
+                # Log files were removed, compressed or truncated since they were indexed
+                for inode in set(self.blocks) - inodes:
+                    del self.blocks[inode]
+                blocks = [block for inode in sorted(self.blocks) for block in self.blocks[inode]]
+                self._save(blocks, rewrite=True)
+            elif new_blocks:
+                self._save(new_blocks)
+
+    def search(self, log_parser, limit):
+        """
+        Finds the lines matching `log_parser`, reading only the blocks of the logs which can contain matches.
+
+        The lines which aren't indexed yet are all read.
+
+        :return: Tuple of a list of up to `limit` matching lines, newest first, and the size of the complete lines
+            of the live log file when it was searched, from which new lines can be followed.
+        """
+        with self.lock:
+            indexed = dict((inode, list(blocks)) for inode, blocks in self.blocks.items())
+        found = []
+        live_size = 0
+        for number, path in enumerate(self.files()):
+            if len(found) >= limit:
+                break
+            try:
+                inode = os.stat(path).st_ino
+                blocks = indexed.get(inode, [])
+                if blocks and blocks[0].head != file_head(path):
+                    blocks = []
+                # Compressed files are only decompressed when a block has to be read
+                fh = None if path.endswith('.gz') else open(path, 'rb')
+            except (IOError, OSError) as e:
+                log.debug('Could not read log file %s: %s', path, e)
+                break
+            try:
+                if fh is None:
+                    # Compressed files are indexed completely or not at all
+                    tail = None if blocks else (0, None)
+                else:
+                    fh.seek(0, os.SEEK_END)
+                    size = fh.tell()
+                    if blocks and blocks[-1].end > size:
+                        blocks = []
+                    start = blocks[-1].end if blocks else 0
+                    tail = (start, size)
+                    if number == 0:
+                        fh.seek(start)
+                        data = fh.read(size - start)
+                        # Leave out a line which is still being written
+                        live_size = start + data.rfind(b'\n') + 1
+                        tail = (start, live_size)
+                found.extend(
+                    self._search_file(path, fh, blocks, log_parser, limit - len(found), tail)
+                )
+            finally:
+                if fh is not None:
+                    fh.close()
+        return found, live_size
+
+    def _search_file(self, path, fh, blocks, log_parser, limit, tail=None):
+        found = []
+        ranges = [tail] if tail and tail[0] != tail[1] else []
+        ranges.extend(
+            (block.start, block.end) for block in reversed(blocks) if block.may_match(log_parser)
+        )
+        for start, end in ranges:
+            if fh is None:
+                with gzip.open(path, 'rb') as f:
+                    fh = io.BytesIO(f.read())
+            fh.seek(start)
+            data = fh.read() if end is None else fh.read(end - start)
+            text = data.decode(sys.getfilesystemencoding(), 'replace')
+            for line in reversed(text.split('\n')):
+                if log_parser.matches(line):
+                    found.append(line)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+
+class IndexingHandler(logging.Handler):
+    """Indexes the log file written by `file_handler` whenever a block was written since, or the log was rotated."""
+
+    def __init__(self, file_handler, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
+        self.file_handler = file_handler
+        self.index = get_index(file_handler.baseFilename)
+        # Size of the log file at the last update, None to index what was logged before on the first record
+        self.indexed = None
+
+    def emit(self, record):
+        try:
+            stream = self.file_handler.stream
+            if stream is None:
+                return
+            size = stream.tell()
+            if self.indexed is None or size < self.indexed or size - self.indexed >= BLOCK_SIZE:
+                self.indexed = size
+                self.index.update()
+        except Exception:
+            self.handleError(record)
+
+
+def get_index(filename):
+    """Returns the shared index of the log file `filename`."""
+    filename = os.path.abspath(filename)
+    with _indexes_lock:
+        index = _indexes.get(filename)
+        if index is None:
+            index = _indexes[filename] = LogIndex(filename)
+        return index
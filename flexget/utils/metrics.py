@@ -0,0 +1,281 @@
+"""
+Metrics of the running process, exposed in the Prometheus text exposition format.
+
+Metrics are updated as things happen, so that rendering them is cheap. Values which can be read at any time, like the
+memory usage, are collected when the metrics are rendered.
+"""
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+from future.moves.urllib.parse import urlparse
+
+import gc
+import os
+import sys
+import threading
+import time
+
+from sqlalchemy import event as sqlalchemy_event
+from sqlalchemy.engine import Engine
+
+from flexget.event import event
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Bucket upper bounds in seconds
+FAST_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30)
+SLOW_BUCKETS = (0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return '%d' % value
+    return repr(value)
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    pairs = []
+    for name, value in zip(names, values):
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append('%s="%s"' % (name, value))
+    return '{%s}' % ','.join(pairs)
+
+
+class Metric(object):
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # Values by tuple of label values
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(labels.get(name, '') for name in self.labels)
+
+    def clear(self):
+        with self.lock:
+            self.values.clear()
+
+    def samples(self):
+        """Returns a list of tuples of sample name suffix, label names, label values and value."""
+        with self.lock:
+            return [('', self.labels, key, value) for key, value in sorted(self.values.items())]
+
+    def render(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s %s' % (self.name, self.type)]
+        for suffix, names, values, value in self.samples():
+            lines.append(
+                '%s%s%s %s'
+                % (self.name, suffix, _format_labels(names, values), _format_value(value))
+            )
+        return lines
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set_total(self, value, **labels):
+        """Sets the count of a counter which is kept elsewhere, like the ones of the interpreter."""
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=FAST_BUCKETS):
+        super(Histogram, self).__init__(name, help, labels)
+        self.buckets = tuple(buckets) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                # Count per bucket, followed by the sum
+                counts = self.values[key] = [0] * len(self.buckets) + [0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            counts[-1] += value
+
+    def samples(self):
+        result = []
+        with self.lock:
+            items = sorted((key, list(counts)) for key, counts in self.values.items())
+        names = self.labels + ('le',)
+        for key, counts in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                result.append(('_bucket', names, key + (_format_value(float(bound)),), cumulative))
+            result.append(('_sum', self.labels, key, counts[-1]))
+            result.append(('_count', self.labels, key, cumulative))
+        return result
+
+
+class Registry(object):
+    def __init__(self):
+        self.metrics = []
+        # Functions updating metrics which are only read when rendering
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name, help, labels=()):
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=FAST_BUCKETS):
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def collector(self, func):
+        """Decorator registering a function called before the metrics are rendered."""
+        self.collectors.append(func)
+        return func
+
+    def render(self):
+        """Returns all metrics in the text exposition format."""
+        for collector in self.collectors:
+            collector()
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+task_queue_depth = registry.gauge('flexget_task_queue_depth', 'Tasks waiting in the task queue.')
+task_queue_wait = registry.histogram(
+    'flexget_task_queue_wait_seconds',
+    'Time tasks waited in the task queue before running.',
+    buckets=SLOW_BUCKETS,
+)
+task_duration = registry.histogram(
+    'flexget_task_duration_seconds',
+    'Duration of task executions.',
+    labels=['task', 'succeeded'],
+    buckets=SLOW_BUCKETS,
+)
+task_entries = registry.counter(
+    'flexget_task_entries_total',
+    'Entries produced, accepted, rejected and failed by task executions.',
+    labels=['task', 'state'],
+)
+plugin_seconds = registry.counter(
+    'flexget_plugin_seconds_total', 'Time spent in plugins.', labels=['phase', 'plugin']
+)
+plugin_calls = registry.counter(
+    'flexget_plugin_calls_total', 'Calls of plugins.', labels=['phase', 'plugin']
+)
+db_queries = registry.histogram('flexget_db_query_seconds', 'Duration of database queries.')
+http_requests = registry.histogram(
+    'flexget_http_request_seconds', 'Latency of http requests.', labels=['host']
+)
+scheduler_lag = registry.histogram(
+    'flexget_scheduler_lag_seconds',
+    'Delay between the scheduled and the actual start of scheduled runs.',
+    buckets=SLOW_BUCKETS,
+)
+process_memory = registry.gauge(
+    'process_resident_memory_bytes', 'Resident memory size of the process.'
+)
+process_peak_memory = registry.gauge(
+    'process_peak_memory_bytes', 'Peak resident memory size of the process.'
+)
+gc_pending = registry.gauge(
+    'python_gc_pending_objects',
+    'Objects added to a garbage collector generation since it was last collected.',
+    labels=['generation'],
+)
+gc_collections = registry.counter(
+    'python_gc_collections_total',
+    'Collections done by the garbage collector.',
+    labels=['generation'],
+)
+
+_local = threading.local()
+
+
+@registry.collector
+def collect_process():
+    try:
+        with open('/proc/self/statm') as f:
+            process_memory.set(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'))
+    except (IOError, OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports kilobytes, macOS bytes
+        process_peak_memory.set(peak if sys.platform == 'darwin' else peak * 1024)
+    for generation, count in enumerate(gc.get_count()):
+        gc_pending.set(count, generation=generation)
+    if hasattr(gc, 'get_stats'):
+        for generation, stats in enumerate(gc.get_stats()):
+            gc_collections.set_total(stats['collections'], generation=generation)
+
+
+@event('task.execute.before_plugin')
+def before_plugin(task, keyword):
+    if not hasattr(_local, 'started'):
+        _local.started = []
+    _local.started.append(time.time())
+
+
+@event('task.execute.after_plugin')
+def after_plugin(task, keyword):
+    started = getattr(_local, 'started', None)
+    if not started:
+        return
+    took = time.time() - started.pop()
+    plugin_seconds.inc(took, phase=task.current_phase, plugin=keyword)
+    plugin_calls.inc(phase=task.current_phase, plugin=keyword)
+
+
+@sqlalchemy_event.listens_for(Engine, 'before_cursor_execute')
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info['metrics_query_start'] = time.time()
+
+
+@sqlalchemy_event.listens_for(Engine, 'after_cursor_execute')
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.pop('metrics_query_start', None)
+    if started is not None:
+        db_queries.observe(time.time() - started)
+
+
+@event('requests.response')
+def observe_request(response):
+    http_requests.observe(
+        response.elapsed.total_seconds(), host=urlparse(response.url).hostname or ''
+    )
@@ -2,6 +2,7 @@ from __future__ import absolute_import, division, unicode_literals
 from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
 from past.builtins import cmp
 
+import copy
 import logging
 import re
 from datetime import datetime, timedelta
@@ -22,6 +23,11 @@ log.setLevel(logging.INFO)
 
 ID_TYPES = ['ep', 'date', 'sequence', 'id']  # may also be 'special'
 
+# Configured parser templates by their configuration, see :func:`get_template`
+_templates = {}
+TEMPLATE_CACHE_SIZE = 1000
+template_stats = {'hits': 0, 'misses': 0}
+
 
 class SeriesParser(TitleParser):
     """
@@ -203,6 +209,15 @@ class SeriesParser(TitleParser):
         """Replaces some characters with spaces"""
         return re.sub(r'[_.,\[\]\(\): ]+', ' ', data).strip().lower()
 
+    def build_name_regexps(self):
+        """Generates the regexps matching the series name from `name` and `alternate_names`."""
+        self.name_regexps = ReList(
+            name_to_re(name, self.ignore_prefixes, self)
+            for name in [self.name] + self.alternate_names
+        )
+        # With auto regex generation, the first regex group captures the name
+        self.re_from_name = True
+
     def guess_name(self):
         """This will attempt to guess a series name based on the provided data."""
         # We need to replace certain characters with spaces to make sure episode parsing works right
@@ -272,12 +287,7 @@ class SeriesParser(TitleParser):
         # regexp name matching
         if not self.name_regexps:
             # if we don't have name_regexps, generate one from the name
-            self.name_regexps = ReList(
-                name_to_re(name, self.ignore_prefixes, self)
-                for name in [self.name] + self.alternate_names
-            )
-            # With auto regex generation, the first regex group captures the name
-            self.re_from_name = True
+            self.build_name_regexps()
         # try all specified regexps on this data
         for name_re in self.name_regexps:
             match = re.search(name_re, self.data)
@@ -699,3 +709,73 @@ class SeriesParser(TitleParser):
 
     def __eq__(self, other):
         return self is other
+
+
+class SeriesParserTemplate(object):
+    """
+    A configured :class:`SeriesParser` with all of its regexps compiled, which can parse many titles.
+
+    The template itself is never changed, each title is parsed by a shallow copy of it sharing the compiled regexps.
+    """
+
+    regexp_lists = [
+        'name_regexps',
+        'unwanted_regexps',
+        'unwanted_sequence_regexps',
+        'clean_regexps',
+        'season_pack_regexps',
+    ] + [mode + '_regexps' for mode in ID_TYPES]
+
+    def __init__(self, **kwargs):
+        prototype = SeriesParser(**kwargs)
+        if prototype.name and not prototype.name_regexps:
+            prototype.build_name_regexps()
+        for listname in self.regexp_lists:
+            # ReList compiles its regexps when they are accessed
+            for _ in getattr(prototype, listname):
+                pass
+        self._prototype = prototype
+
+    def new_parser(self):
+        """Returns a :class:`SeriesParser` ready to parse a title."""
+        return copy.copy(self._prototype)
+
+    def parse(self, data, field=None, quality=None):
+        """
+        Parses `data` with a new parser.
+
+        :return: The :class:`SeriesParser` with the results
+        """
+        parser = self.new_parser()
+        parser.parse(data, field=field, quality=quality)
+        return parser
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    return value
+
+
+def get_template(**kwargs):
+    """
+    Returns a :class:`SeriesParserTemplate` for the given :class:`SeriesParser` arguments, reusing a cached one for
+    the same configuration.
+    """
+    try:
+        key = _freeze(kwargs)
+        template = _templates.get(key)
+    except TypeError:
+        # Unhashable arguments
+        return SeriesParserTemplate(**kwargs)
+    if template is None:
+        template_stats['misses'] += 1
+        template = SeriesParserTemplate(**kwargs)
+        if len(_templates) >= TEMPLATE_CACHE_SIZE:
+            _templates.clear()
+        _templates[key] = template
+    else:
+        template_stats['hits'] += 1
+    return template
@@ -33,6 +33,9 @@ class QualityComponent(object):
         # compile regexp
         if regexp is None:
             regexp = re.escape(name)
+        self.pattern = regexp
+        # Single bit identifying this component within its type, assigned once all components are defined
+        self.bit = 0
         self.regexp = re.compile('(?<![^\W_])(' + regexp + ')(?![^\W_])', re.IGNORECASE)
 
     def matches(self, text):
@@ -193,11 +196,107 @@ for items in (_resolutions, _sources, _codecs, _audios):
     for item in items:
         _registry[item.name] = item
 
+# All components of each type, including unknown, in order of value
+_types = {
+    'resolution': [_UNKNOWNS['resolution']] + _resolutions,
+    'source': [_UNKNOWNS['source']] + _sources,
+    'codec': [_UNKNOWNS['codec']] + _codecs,
+    'audio': [_UNKNOWNS['audio']] + _audios,
+}
+for items in _types.values():
+    for index, item in enumerate(items):
+        item.bit = 1 << index
+
 
 def all_components():
     return iter(_registry.values())
 
 
+class ComponentScanner(object):
+    """
+    Finds the best matching component from an ordered list of quality components.
+
+    Rather than searching with the regexp of each component in turn, the components are combined into alternations,
+    so that one search tells whether any of them match, and which one matches leftmost. The lowest indexed matching
+    component is narrowed down by searching again with only the components before that one.
+    """
+
+    def __init__(self, components):
+        self.components = components
+        self._scanners = {}
+
+    def scanner(self, start, end):
+        """Returns a compiled alternation of the components from index `start` up to `end`."""
+        key = (start, end)
+        if key not in self._scanners:
+            # Word boundaries are shared by all components, check them only once per position
+            alternatives = '|'.join(
+                '(?P<c%d>%s)' % (index, self.components[index].pattern)
+                for index in range(start, end)
+            )
+            self._scanners[key] = re.compile(
+                '(?<![^\W_])(?:' + alternatives + ')(?![^\W_])', re.IGNORECASE
+            )
+        return self._scanners[key]
+
+    def first_match(self, text, start):
+        """
+        Finds the lowest indexed component from `start` on which matches `text`.
+
+        :return: Tuple of component index and match span, or None
+        """
+        found = None
+        end = len(self.components)
+        while start < end:
+            match = self.scanner(start, end).search(text)
+            if not match:
+                break
+            # The leftmost match isn't necessarily the lowest indexed one, but later ones are ruled out
+            end = int(match.lastgroup[1:])
+            found = end, match.span()
+        return found
+
+    def find_best(self, text, strip_all=True):
+        """
+        Finds the highest matching component for `text`.
+
+        :param text: The text to search in
+        :param strip_all: Whether matches of all components should be removed from the text, instead of just the
+            match of the returned one
+        :return: Tuple of matched component (or None), and the text without the matched quality data
+        """
+        result = None
+        clean_text = text
+        search_in = text
+        start = 0
+        while True:
+            found = self.first_match(search_in, start)
+            if not found:
+                break
+            index, (begin, end) = found
+            result = self.components[index]
+            clean_text = search_in[:begin] + search_in[end:]
+            if result.modifier is not None:
+                # If this item has a modifier, do not proceed to check higher qualities in the list
+                break
+            if strip_all:
+                # In some cases we want to strip all found quality components,
+                # even though we're going to return only the last of them.
+                search_in = clean_text
+            start = index + 1
+        return result, clean_text
+
+
+_resolution_scanner = ComponentScanner(_resolutions)
+_source_scanner = ComponentScanner(_sources)
+_codec_scanner = ComponentScanner(_codecs)
+_audio_scanner = ComponentScanner(_audios)
+
+# Parse results by text, so that the same text is only parsed once
+_parse_cache = {}
+PARSE_CACHE_SIZE = 10000
+
+
 class Quality(object):
     """Parses and stores the quality of an entry in the four component categories."""
 
@@ -221,35 +320,41 @@ class Quality(object):
         :param text: The string to parse
         """
         self.text = text
-        self.clean_text = text
-        self.resolution = self._find_best(_resolutions, _UNKNOWNS['resolution'], False)
-        self.source = self._find_best(_sources, _UNKNOWNS['source'])
-        self.codec = self._find_best(_codecs, _UNKNOWNS['codec'])
-        self.audio = self._find_best(_audios, _UNKNOWNS['audio'])
+        cached = _parse_cache.get(text)
+        if cached is None:
+            cached = self._parse(text)
+            if len(_parse_cache) >= PARSE_CACHE_SIZE:
+                _parse_cache.clear()
+            _parse_cache[text] = cached
+        self.resolution, self.source, self.codec, self.audio, self.clean_text = cached
+
+    @staticmethod
+    def _parse(text):
+        """
+        :return: Tuple of resolution, source, codec and audio components, and the text with quality data removed
+        """
+        components = {}
+        resolution, clean_text = _resolution_scanner.find_best(text, False)
+        components['resolution'] = resolution or _UNKNOWNS['resolution']
+        source, clean_text = _source_scanner.find_best(clean_text)
+        components['source'] = source or _UNKNOWNS['source']
+        codec, clean_text = _codec_scanner.find_best(clean_text)
+        components['codec'] = codec or _UNKNOWNS['codec']
+        audio, clean_text = _audio_scanner.find_best(clean_text)
+        components['audio'] = audio or _UNKNOWNS['audio']
         # If any of the matched components have defaults, set them now.
-        for component in self.components:
-            for default in component.defaults:
+        for component in (resolution, source, codec, audio):
+            for default in getattr(component, 'defaults', []):
                 default = _registry[default]
-                if not getattr(self, default.type):
-                    setattr(self, default.type, default)
-
-    def _find_best(self, qlist, default=None, strip_all=True):
-        """Finds the highest matching quality component from `qlist`"""
-        result = None
-        search_in = self.clean_text
-        for item in qlist:
-            match = item.matches(search_in)
-            if match[0]:
-                result = item
-                self.clean_text = match[1]
-                if strip_all:
-                    # In some cases we want to strip all found quality components,
-                    # even though we're going to return only the last of them.
-                    search_in = self.clean_text
-                if item.modifier is not None:
-                    # If this item has a modifier, do not proceed to check higher qualities in the list
-                    break
-        return result or default
+                if not components[default.type]:
+                    components[default.type] = default
+        return (
+            components['resolution'],
+            components['source'],
+            components['codec'],
+            components['audio'],
+            clean_text,
+        )
 
     @property
     def name(self):
@@ -262,6 +367,11 @@ class Quality(object):
     def components(self):
         return [self.resolution, self.source, self.codec, self.audio]
 
+    @property
+    def bits(self):
+        """Tuple of the bits identifying the resolution, source, codec and audio of this quality."""
+        return self.resolution.bit, self.source.bit, self.codec.bit, self.audio.bit
+
     @property
     def _comparator(self):
         modifier = sum(c.modifier for c in self.components if c.modifier)
@@ -357,27 +467,47 @@ class RequirementComponent(object):
         self.max = None
         self.acceptable = set()
         self.none_of = set()
+        self._masks = {}
+
+    def mask(self, loose=False):
+        """
+        Compiles the requirements to a bitmask of the allowed components.
+
+        :param bool loose: If True, only ! (not) requirements will be enforced.
+        :returns: Bitmask with the `bit` of each allowed component set
+        """
+        if loose not in self._masks:
+            if loose or not (self.min or self.max or self.acceptable):
+                allowed = _types[self.type]
+            else:
+                allowed = [
+                    comp
+                    for comp in _types[self.type]
+                    if comp in self.acceptable or self._in_range(comp)
+                ]
+            mask = 0
+            for comp in allowed:
+                if comp not in self.none_of:
+                    mask |= comp.bit
+            self._masks[loose] = mask
+        return self._masks[loose]
+
+    def _in_range(self, comp):
+        if not (self.min or self.max):
+            return False
+        if self.min and comp < self.min:
+            return False
+        if self.max and comp > self.max:
+            return False
+        return True
 
     def allows(self, comp, loose=False):
         if comp.type != self.type:
             raise TypeError('Cannot compare %r against %s' % (comp, self.type))
-        if comp in self.none_of:
-            return False
-        if loose:
-            return True
-        if comp in self.acceptable:
-            return True
-        if self.min or self.max:
-            if self.min and comp < self.min:
-                return False
-            if self.max and comp > self.max:
-                return False
-            return True
-        if not self.acceptable:
-            return True
-        return False
+        return bool(self.mask(loose) & comp.bit)
 
     def add_requirement(self, text):
+        self._masks = {}
         if '-' in text:
             min, max = text.split('-')
             min, max = _registry[min], _registry[max]
@@ -479,12 +609,31 @@ class Requirements(object):
         :rtype: bool
         :returns: True if given quality passes all component requirements.
         """
-        if isinstance(qual, basestring):
-            qual = Quality(qual)
-        for r_component, q_component in zip(self.components, qual.components):
-            if not r_component.allows(q_component, loose=loose):
-                return False
-        return True
+        return self.allows_many([qual], loose=loose)[0]
+
+    def allows_many(self, quals, loose=False):
+        """Determine for each of a list of qualities whether this set of requirements allows it.
+
+        :param list quals: The qualities to evaluate.
+        :param bool loose: If True, only ! (not) requirements will be enforced.
+        :rtype: list
+        :returns: A boolean for each of the given qualities, True if it passes all component requirements.
+        """
+        res_mask, src_mask, codec_mask, audio_mask = [c.mask(loose) for c in self.components]
+        result = []
+        for qual in quals:
+            if isinstance(qual, basestring):
+                qual = Quality(qual)
+            res_bit, src_bit, codec_bit, audio_bit = qual.bits
+            result.append(
+                bool(
+                    res_mask & res_bit
+                    and src_mask & src_bit
+                    and codec_mask & codec_bit
+                    and audio_mask & audio_bit
+                )
+            )
+        return result
 
     def __eq__(self, other):
         if isinstance(other, basestring):
@@ -6,6 +6,8 @@ from future.utils import text_to_native_str
 
 import time
 import logging
+import queue
+import threading
 from datetime import timedelta, datetime
 
 import requests
@@ -15,7 +17,10 @@ import warnings
 from requests import RequestException
 
 from flexget import __version__ as version
-from flexget.utils.tools import parse_timedelta, TimedDict, timedelta_total_seconds
+from flexget import logger
+from flexget.event import event, fire_event
+from flexget.utils import tracing
+from flexget.utils.tools import parse_timedelta, timedelta_total_seconds
 
 # If we use just 'requests' here, we'll get the logger created by requests, rather than our own
 log = logging.getLogger('utils.requests')
@@ -27,20 +32,145 @@ logging.getLogger('urllib3').setLevel(logging.WARNING)
 
 # Time to wait before trying an unresponsive site again
 WAIT_TIME = timedelta(seconds=60)
-# Remembers sites that have timed out
-unresponsive_hosts = TimedDict(WAIT_TIME)
+# Upper bound for the wait time when a site keeps timing out
+MAX_WAIT_TIME = timedelta(hours=1)
+# Default amount of requests in flight at once for `Session.request_many`
+MAX_WORKERS = 4
+
+
+class CircuitBreaker(object):
+    """
+    Tracks the responsiveness of a single host.
+
+    A breaker starts `closed`, and all requests are let through. When a request times out, the breaker `opens`, and
+    requests fail immediately until the wait time has passed. The wait time starts at `WAIT_TIME` and doubles with
+    each consecutive failure, up to `MAX_WAIT_TIME`. After that the breaker is `half-open`, a single probe request is
+    let through, and all others keep failing until the probe finishes. A successful probe closes the breaker again.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, host, failures=0, opened=None):
+        self.host = host
+        self.failures = failures
+        self.opened = opened
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def wait_time(self):
+        """The amount of time to wait after the last failure before probing the host again."""
+        if not self.failures:
+            return timedelta()
+        # Cap the exponent so that it can't overflow before being clamped to MAX_WAIT_TIME
+        wait = WAIT_TIME * 2 ** min(self.failures - 1, 32)
+        return min(wait, MAX_WAIT_TIME)
+
+    @property
+    def retry_at(self):
+        if self.opened is None:
+            return None
+        return self.opened + self.wait_time
+
+    @property
+    def state(self):
+        if not self.failures:
+            return self.CLOSED
+        if datetime.now() < self.retry_at:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def allow_request(self):
+        """
+        Checks whether a request to the host may go through. When the breaker is half-open, this claims the single
+        probe request, so it must be followed by a call to `record_success`, `record_failure` or `release`.
+
+        :rtype: bool
+        """
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self.probing:
+                log.debug('Sending probe request to %s', self.host)
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.failures:
+                log.verbose('%s is responding again.', self.host)
+            self.failures = 0
+            self.opened = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            # Requests that were already in flight when the breaker opened don't count as new failures
+            if self.state == self.OPEN:
+                return
+            self.failures += 1
+            self.opened = datetime.now()
+            self.probing = False
+            log.verbose('%s timed out, not trying again for %s.', self.host, self.wait_time)
+
+    def release(self):
+        """Gives up the probe request without a verdict on the host, e.g. when the request failed for other reasons."""
+        with self._lock:
+            self.probing = False
+
+    def to_dict(self):
+        return {'failures': self.failures, 'opened': self.opened}
+
+    @classmethod
+    def from_dict(cls, host, data):
+        return cls(host, failures=data.get('failures', 0), opened=data.get('opened'))
+
+    def __repr__(self):
+        return '<CircuitBreaker(host=%s,state=%s,failures=%s)>' % (
+            self.host,
+            self.state,
+            self.failures,
+        )
+
+
+# Circuit breakers for hosts, shared by all sessions
+circuit_breakers = {}
+_circuit_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(url):
+    """
+    Get the `CircuitBreaker` for the host of given url, creating it if needed.
+
+    :param url: The url to get the breaker for
+    :rtype: CircuitBreaker
+    """
+    host = urlparse(url).hostname
+    with _circuit_breakers_lock:
+        breaker = circuit_breakers.get(host)
+        if breaker is None:
+            breaker = circuit_breakers[host] = CircuitBreaker(host)
+    return breaker
 
 
 def is_unresponsive(url):
     """
-    Checks if host of given url has timed out within WAIT_TIME
+    Checks if host of given url has timed out recently, and is not due to be tried again
 
     :param url: The url to check
-    :return: True if the host has timed out within WAIT_TIME
+    :return: True if requests to the host should not be attempted right now
     :rtype: bool
     """
-    host = urlparse(url).hostname
-    return host in unresponsive_hosts
+    breaker = circuit_breakers.get(urlparse(url).hostname)
+    if breaker is None:
+        return False
+    return breaker.state == CircuitBreaker.OPEN or (
+        breaker.state == CircuitBreaker.HALF_OPEN and breaker.probing
+    )
 
 
 def set_unresponsive(url):
@@ -49,11 +179,44 @@ def set_unresponsive(url):
 
     :param url: The url that timed out
     """
-    host = urlparse(url).hostname
-    if host in unresponsive_hosts:
-        # If somehow this is called again before previous timer clears, don't refresh
-        return
-    unresponsive_hosts[host] = True
+    get_circuit_breaker(url).record_failure()
+
+
+def set_responsive(url):
+    """
+    Marks the host of a given url as responsive again
+
+    :param url: The url that responded
+    """
+    breaker = circuit_breakers.get(urlparse(url).hostname)
+    if breaker is not None:
+        breaker.record_success()
+
+
+@event('manager.startup', priority=64)
+def load_circuit_breakers(manager):
+    """Restores the state of circuit breakers from previous executions."""
+    # Cannot be imported at module level because of circular references
+    from flexget.utils.simple_persistence import SimplePersistence
+
+    persisted = SimplePersistence('circuit_breakers').get('hosts', {})
+    with _circuit_breakers_lock:
+        for host, data in persisted.items():
+            if host not in circuit_breakers:
+                circuit_breakers[host] = CircuitBreaker.from_dict(host, data)
+
+
+@event('task.execute.completed', priority=255)
+@event('manager.shutdown', priority=255)
+def save_circuit_breakers(manager_or_task):
+    """Stores the state of circuit breakers, so that it is shared with other executions via cron."""
+    from flexget.utils.simple_persistence import SimplePersistence
+
+    with _circuit_breakers_lock:
+        hosts = {
+            host: breaker.to_dict() for host, breaker in circuit_breakers.items() if breaker.failures
+        }
+    SimplePersistence('circuit_breakers')['hosts'] = hosts
 
 
 class DomainLimiter(object):
@@ -65,6 +228,32 @@ class DomainLimiter(object):
         raise NotImplementedError
 
 
+class LimiterStateStore(object):
+    """
+    Stores the state of `TokenBucketLimiter` buckets.
+
+    This keeps the state in memory, which works for the daemon, and across tasks in a single execution, but not for
+    multiple executions via cron. Once the database is available, it is replaced by a persistent store.
+    """
+
+    def __init__(self):
+        self.states = {}
+        self._lock = threading.Lock()
+
+    def update(self, domain, default, func):
+        """
+        Atomically runs `func` on the bucket state of `domain`.
+
+        :param domain: The domain of the bucket
+        :param dict default: State to start with if there is no stored state for `domain`
+        :param func: Called with the state dict, which it may modify in place
+        :return: The return value of `func`
+        """
+        with self._lock:
+            state = self.states.setdefault(domain, default)
+            return func(state)
+
+
 class TokenBucketLimiter(DomainLimiter):
     """
     A token bucket rate limiter for domains.
@@ -72,9 +261,8 @@ class TokenBucketLimiter(DomainLimiter):
     New instances for the same domain will restore previous values.
     """
 
-    # This is just an in memory cache right now, it works for the daemon, and across tasks in a single execution
-    # but not for multiple executions via cron. Do we need to store this to db?
-    state_cache = {}
+    # Shared by all limiters, replaced with a persistent store when the database becomes available
+    state_store = LimiterStateStore()
 
     def __init__(self, domain, tokens, rate, wait=True):
         """
@@ -86,47 +274,43 @@ class TokenBucketLimiter(DomainLimiter):
         self.max_tokens = tokens
         self.rate = parse_timedelta(rate)
         self.wait = wait
-        # Restore previous state for this domain, or establish new state cache
-        self.state = self.state_cache.setdefault(
-            domain, {'tokens': self.max_tokens, 'last_update': datetime.now()}
-        )
 
-    @property
-    def tokens(self):
-        return min(self.max_tokens, self.state['tokens'])
-
-    @tokens.setter
-    def tokens(self, value):
-        self.state['tokens'] = value
-
-    @property
-    def last_update(self):
-        return self.state['last_update']
+    def _take_token(self, state):
+        now = datetime.now()
+        if state['tokens'] < self.max_tokens:
+            regen = timedelta_total_seconds(now - state['last_update']) / timedelta_total_seconds(
+                self.rate
+            )
+            state['tokens'] = min(self.max_tokens, state['tokens'] + regen)
+        state['last_update'] = now
+        if state['tokens'] >= 1:
+            state['tokens'] -= 1
+            return 0
+        return timedelta_total_seconds(self.rate) * (1 - state['tokens'])
+
+    def try_acquire(self):
+        """
+        Takes a token if one is available, without waiting for it.
 
-    @last_update.setter
-    def last_update(self, value):
-        self.state['last_update'] = value
+        :return: 0 if a token was taken, otherwise the number of seconds until the next token will be available.
+        """
+        default = {'tokens': self.max_tokens, 'last_update': datetime.now()}
+        return self.state_store.update(self.domain, default, self._take_token)
 
     def __call__(self):
-        if self.tokens < self.max_tokens:
-            regen = timedelta_total_seconds(
-                datetime.now() - self.last_update
-            ) / timedelta_total_seconds(self.rate)
-            self.tokens += regen
-        self.last_update = datetime.now()
-        if self.tokens < 1:
+        wait = self.try_acquire()
+        while wait:
             if not self.wait:
                 raise RequestException('Requests to %s have exceeded their limit.' % self.domain)
-            wait = timedelta_total_seconds(self.rate) * (1 - self.tokens)
             # Don't spam console if wait is low
             if wait < 4:
                 level = log.debug
             else:
                 level = log.verbose
             level('Waiting %.2f seconds until next request to %s', wait, self.domain)
-            # Sleep until it is time for the next request
+            # Sleep until it is time for the next request, another process might still beat us to the token
             time.sleep(wait)
-        self.tokens -= 1
+            wait = self.try_acquire()
 
 
 class TimedLimiter(TokenBucketLimiter):
@@ -172,6 +356,27 @@ def limit_domains(url, limit_dict):
             break
 
 
+class FetchResult(object):
+    """The outcome of a single request done by `Session.request_many`."""
+
+    def __init__(self, url):
+        self.url = url
+        self.response = None
+        self.error = None
+
+    def result(self):
+        """
+        :return: The response for this request
+        :raises RequestException: If the request failed
+        """
+        if self.error is not None:
+            raise self.error
+        return self.response
+
+    def __repr__(self):
+        return '<FetchResult(url=%s,response=%s,error=%r)>' % (self.url, self.response, self.error)
+
+
 class Session(requests.Session):
     """
     Subclass of requests Session class which defines some of our own defaults, records unresponsive sites,
@@ -230,36 +435,95 @@ class Session(requests.Session):
         """
 
         # Raise Timeout right away if site is known to timeout
-        if is_unresponsive(url):
+        breaker = get_circuit_breaker(url)
+        if not breaker.allow_request():
             raise requests.Timeout(
                 'Requests to this site (%s) have timed out recently. Waiting before trying again.'
-                % urlparse(url).hostname
+                % breaker.host
             )
 
-        # Run domain limiters for this url
-        limit_domains(url, self.domain_limiters)
+        try:
+            # Run domain limiters for this url
+            limit_domains(url, self.domain_limiters)
 
-        kwargs.setdefault('timeout', self.timeout)
-        raise_status = kwargs.pop('raise_status', True)
+            kwargs.setdefault('timeout', self.timeout)
+            raise_status = kwargs.pop('raise_status', True)
 
-        # If we do not have an adapter for this url, pass it off to urllib
-        if not any(url.startswith(adapter) for adapter in self.adapters):
-            log.debug('No adaptor, passing off to urllib')
-            return _wrap_urlopen(url, timeout=kwargs['timeout'])
+            # If we do not have an adapter for this url, pass it off to urllib
+            if not any(url.startswith(adapter) for adapter in self.adapters):
+                log.debug('No adaptor, passing off to urllib')
+                result = _wrap_urlopen(url, timeout=kwargs['timeout'])
+                breaker.release()
+                return result
 
-        try:
             log.debug('%sing URL %s with args %s and kwargs %s', method.upper(), url, args, kwargs)
-            result = super(Session, self).request(method, url, *args, **kwargs)
+            with tracing.span(url, 'http', method=method.upper()):
+                result = super(Session, self).request(method, url, *args, **kwargs)
         except requests.Timeout:
-            # Mark this site in known unresponsive list
-            set_unresponsive(url)
+            # Open the circuit breaker for this site
+            breaker.record_failure()
+            raise
+        except Exception:
+            # The site didn't time out, but we didn't learn whether it is responsive either
+            breaker.release()
             raise
+        # We got a response, so the site is responsive
+        breaker.record_success()
+        fire_event('requests.response', result)
 
         if raise_status:
             result.raise_for_status()
 
         return result
 
+    def request_many(self, method, urls, max_workers=MAX_WORKERS, **kwargs):
+        """
+        Does requests to many urls at once, using helper threads. Domain limiters, unresponsive site tracking,
+        cookies and auth of this session apply to each request just like they do with `request`.
+
+        :param urls: Urls to request
+        :param int max_workers: Maximum amount of requests in flight at once
+        :param kwargs: Passed on to `request` for each url
+        :return: A list of :class:`FetchResult`, in the same order as `urls`
+        """
+        results = [FetchResult(url) for url in urls]
+        if not results:
+            return results
+        work = queue.Queue()
+        for result in results:
+            work.put(result)
+        # Make log messages from helper threads look like they came from the calling task
+        context = dict(vars(logger.local_context))
+
+        def worker():
+            vars(logger.local_context).update(context)
+            while True:
+                try:
+                    result = work.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    result.response = self.request(method, result.url, **kwargs)
+                except Exception as e:
+                    # Hand the error over to the caller, it will be raised from `FetchResult.result`
+                    result.error = e
+
+        threads = [
+            threading.Thread(target=worker, name='request_many-%d' % i)
+            for i in range(min(max_workers, len(results)))
+        ]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def get_many(self, urls, max_workers=MAX_WORKERS, **kwargs):
+        """Sends GET requests to many urls at once. See `request_many`."""
+        kwargs.setdefault('allow_redirects', True)
+        return self.request_many('get', urls, max_workers=max_workers, **kwargs)
+
 
 # Define some module level functions that use our Session, so this module can be used like main requests module
 def request(method, url, **kwargs):
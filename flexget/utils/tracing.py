@@ -0,0 +1,251 @@
+"""
+Tracing of task executions as nested spans: task, phase, plugin, lazy lookup, http request and database query.
+
+Spans are only recorded for tasks executed with the ``--trace-file`` option. Otherwise :func:`span` returns a shared
+no-op context manager after checking a single global, so the hooks cost next to nothing.
+
+Traces are written in the Chrome trace event format, which chrome://tracing, Perfetto and speedscope can open, along
+with the time spent in each stack of spans in the collapsed stack format used by flamegraph.pl.
+"""
+from __future__ import unicode_literals, division, absolute_import
+from builtins import *  # noqa pylint: disable=unused-import, redefined-builtin
+
+import io
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from sqlalchemy import event as sqlalchemy_event
+from sqlalchemy.engine import Engine
+
+from flexget import logger
+
+log = logging.getLogger('tracing')
+
+try:
+    wall_clock = time.perf_counter
+except AttributeError:
+    wall_clock = time.time
+
+# Amount of tasks being traced at the moment
+_active = 0
+_lock = threading.Lock()
+_listening = False
+
+
+class NullSpan(object):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span(object):
+    __slots__ = ('tracer', 'name', 'category', 'args')
+
+    def __init__(self, tracer, name, category, args):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+
+    def __enter__(self):
+        self.tracer.begin(self.name, self.category, self.args)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.tracer.end()
+        return False
+
+
+def describe(func):
+    """Returns a readable name for a function or bound method."""
+    name = getattr(func, '__name__', None) or type(func).__name__
+    owner = getattr(func, '__self__', None)
+    if owner is not None:
+        return '%s.%s' % (type(owner).__name__, name)
+    module = getattr(func, '__module__', None)
+    return '%s.%s' % (module.rsplit('.', 1)[-1], name) if module else name
+
+
+class Tracer(object):
+    """Collects the spans of one or more task executions written to the same trace file."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.started = wall_clock()
+        self.pid = os.getpid()
+        self.events = []
+        # Seconds spent in each stack of span names, excluding the time spent in nested spans
+        self.stacks = {}
+        # Open spans by thread ident, as lists of name, category, args, start time and time spent in nested spans
+        self.frames = {}
+        # Names of the open spans of the thread which started a span on a new thread, by thread ident
+        self.prefixes = {}
+        self.owner = threading.current_thread().ident
+        self.lock = threading.Lock()
+
+    def begin(self, name, category, args):
+        ident = threading.current_thread().ident
+        frames = self.frames.get(ident)
+        if frames is None:
+            frames = self.frames[ident] = []
+            with self.lock:
+                self.events.append(
+                    {
+                        'name': 'thread_name',
+                        'ph': 'M',
+                        'pid': self.pid,
+                        'tid': ident,
+                        'args': {'name': threading.current_thread().name},
+                    }
+                )
+        if not frames and ident != self.owner:
+            # Helper threads work on behalf of the spans open on the thread which started tracing
+            self.prefixes[ident] = tuple(frame[0] for frame in self.frames.get(self.owner, ()))
+        if not isinstance(name, str):
+            name = describe(name)
+        frames.append([name, category, args, wall_clock(), 0])
+
+    def end(self):
+        ident = threading.current_thread().ident
+        frames = self.frames[ident]
+        name, category, args, started, nested = frames.pop()
+        took = wall_clock() - started
+        stack = self.prefixes.get(ident, ()) + tuple(frame[0] for frame in frames) + (name,)
+        if frames:
+            frames[-1][4] += took
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': (started - self.started) * 1000000,
+            'dur': took * 1000000,
+            'pid': self.pid,
+            'tid': ident,
+        }
+        if args:
+            event['args'] = args
+        with self.lock:
+            self.events.append(event)
+            self.stacks[stack] = self.stacks.get(stack, 0) + took - nested
+
+    def span(self, name, category='function', **args):
+        return Span(self, name, category, args)
+
+    def chrome_trace(self):
+        with self.lock:
+            return {'traceEvents': list(self.events), 'displayTimeUnit': 'ms'}
+
+    def collapsed_stacks(self):
+        """Returns lines of span names separated by semicolons, followed by the microseconds spent in them."""
+        lines = []
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+        for stack, took in stacks:
+            names = ';'.join(re.sub(r'[;\s]+', '_', name) for name in stack)
+            lines.append('%s %d' % (names, max(took, 0) * 1000000))
+        return lines
+
+    def save(self):
+        # Imported here, flexget.utils.json imports the plugin module which is still loading when this one is
+        from flexget.utils import json
+
+        folded = os.path.splitext(self.filename)[0] + '.folded'
+        try:
+            with io.open(self.filename, 'w', encoding='utf-8') as f:
+                f.write(str(json.dumps(self.chrome_trace())))
+            with io.open(folded, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(self.collapsed_stacks()) + '\n')
+        except (IOError, OSError) as e:
+            log.error('Could not write trace to %s: %s', self.filename, e)
+            return
+        log.verbose('Trace written to %s, collapsed stacks to %s', self.filename, folded)
+
+
+def current_tracer():
+    if not _active:
+        return None
+    # Stored in the logging context, which helper threads doing requests for a task inherit
+    return getattr(logger.local_context, 'tracer', None)
+
+
+def span(name, category='function', **args):
+    """
+    Returns a context manager recording a span while a task is traced.
+
+    :param name: Name of the span, functions are named after their (qualified) name
+    :param category: Kind of the span
+    :param args: Details shown with the span in trace viewers
+    """
+    if not _active:
+        return NULL_SPAN
+    tracer = current_tracer()
+    if tracer is None:
+        return NULL_SPAN
+    return Span(tracer, name, category, args)
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tracer = current_tracer()
+    if tracer:
+        tracer.begin(statement.split(None, 1)[0].upper(), 'db', {'statement': statement})
+        conn.info.setdefault('trace_spans', []).append(tracer)
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('trace_spans')
+    if spans:
+        spans.pop().end()
+
+
+def handle_error(context):
+    # after_cursor_execute is not called for statements which raised
+    if context.connection is not None:
+        after_cursor_execute(context.connection, None, None, None, None, None)
+
+
+def listen_queries():
+    global _listening
+    if not _listening:
+        sqlalchemy_event.listen(Engine, 'before_cursor_execute', before_cursor_execute)
+        sqlalchemy_event.listen(Engine, 'after_cursor_execute', after_cursor_execute)
+        sqlalchemy_event.listen(Engine, 'handle_error', handle_error)
+        _listening = True
+
+
+@contextmanager
+def trace_task(task):
+    """
+    Traces the execution of `task` if the ``--trace-file`` option was given.
+
+    All tasks of an execution share the trace, the file is written again after each of them.
+    """
+    global _active
+    filename = getattr(task.options, 'trace_file', None)
+    if not filename:
+        yield
+        return
+    tracer = getattr(task.options, 'tracer', None)
+    if tracer is None:
+        tracer = task.options.tracer = Tracer(os.path.abspath(os.path.expanduser(filename)))
+    old_tracer = getattr(logger.local_context, 'tracer', None)
+    logger.local_context.tracer = tracer
+    with _lock:
+        listen_queries()
+        _active += 1
+    try:
+        with tracer.span(task.name, 'task'):
+            yield
+    finally:
+        with _lock:
+            _active -= 1
+        logger.local_context.tracer = old_tracer
+        tracer.save()